@@ -0,0 +1,262 @@
+"""
+Banc d'essai reproductible du pipeline météo.
+
+Génère un jeu de données synthétique (graine fixe) dans un AIRFLOW_HOME temporaire, mesure les étapes
+principales du pipeline et du chargement du tableau de bord, puis écrit un rapport JSON.
+
+    python3 benchmarks/run_benchmarks.py --cities 200 --days 365 --repeat 3
+    python3 benchmarks/run_benchmarks.py --baseline benchmarks/results/reference.json --tolerance 0.25
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCHMARKS_DIR)
+DEFAULT_REPORT_PATH = os.path.join(BENCHMARKS_DIR, 'results', 'latest.json')
+
+# Villes affichées par défaut dans le tableau de bord (5 premières) et nombre de graphiques tracés
+DASHBOARD_DEFAULT_CITIES = 5
+DASHBOARD_SORTED_CHARTS = 5
+
+
+# --- Serveur OpenWeather simulé ---
+
+def start_mock_openweather(responses: dict) -> tuple:
+    """
+    Démarre un serveur HTTP local qui répond comme l'endpoint OpenWeather « météo actuelle ».
+    :param responses: Dictionnaire {'lat,lon': réponse JSON} (synthetic_data.generate_openweather_responses).
+    :return: Tuple (URL de l'endpoint, serveur).
+    """
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            response = responses.get(f"{query['lat'][0]},{query['lon'][0]}")
+            body = json.dumps(response).encode() if response else b'{}'
+            self.send_response(200 if response else 404)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/data/2.5/weather", server
+
+
+# --- Mesure ---
+
+def _peak_rss_mb() -> float:
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:
+        return None
+
+
+def measure(name: str, func, repeat: int, quiet: bool = True) -> tuple:
+    """
+    Exécute `func` `repeat` fois et retourne les statistiques de durée et le dernier résultat.
+    Les sorties console des étapes mesurées sont masquées par défaut.
+    """
+    timings = []
+    result = None
+    for _ in range(repeat):
+        output = io.StringIO() if quiet else sys.stdout
+        with contextlib.redirect_stdout(output):
+            start = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - start)
+    stats = {
+        'runs_s': [round(t, 6) for t in timings],
+        'min_s': round(min(timings), 6),
+        'median_s': round(statistics.median(timings), 6),
+        'mean_s': round(statistics.fmean(timings), 6),
+        'rows_out': len(result) if hasattr(result, '__len__') else None,
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+    print(f"  {name:<40} médiane {stats['median_s']:.4f} s  (min {stats['min_s']:.4f} s, {repeat} exécutions)")
+    return stats, result
+
+
+def compare_with_baseline(report: dict, baseline_path: str, tolerance: float) -> list:
+    """
+    Compare les médianes du rapport avec celles d'un rapport de référence.
+    :return: Liste des régressions (étape, médiane de référence, médiane actuelle, ratio).
+    """
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)
+    if baseline.get('params', {}).get('cities') != report['params']['cities'] or \
+       baseline.get('params', {}).get('days') != report['params']['days']:
+        print("AVERTISSEMENT : la référence a été mesurée à une autre échelle, la comparaison est indicative.")
+    regressions = []
+    for name, stats in report['results'].items():
+        reference = baseline.get('results', {}).get(name)
+        if not reference:
+            continue
+        ratio = stats['median_s'] / reference['median_s'] if reference['median_s'] else float('inf')
+        if ratio > 1 + tolerance:
+            regressions.append({'stage': name, 'baseline_median_s': reference['median_s'],
+                                'median_s': stats['median_s'], 'ratio': round(ratio, 3)})
+    return regressions
+
+
+def run(n_cities: int, n_days: int, seed: int, repeat: int, workdir: str) -> dict:
+    """
+    Génère les données synthétiques dans `workdir` puis mesure chaque étape.
+    :return: Rapport (dictionnaire sérialisable en JSON).
+    """
+    # Les scripts ETL lisent AIRFLOW_HOME à l'import : il doit pointer vers le dossier de test avant l'import
+    os.environ['AIRFLOW_HOME'] = workdir
+    os.environ.setdefault('WEATHER_METRICS', '0')
+    sys.path.insert(0, os.path.join(PROJECT_ROOT, 'etl_scripts'))
+    sys.path.insert(0, BENCHMARKS_DIR)
+    sys.path.insert(0, PROJECT_ROOT)
+
+    import numpy as np
+    import pandas as pd
+    from synthetic_data import HISTORICAL_FILE_NAME, JSON_FILE_NAME, write_synthetic_dataset
+    from extract_data import extract_historical_data, extract_json_data, extract_openweather_data
+    from transform_data import clean_and_transform_data
+    from data_modeling import MODELED_SORT_COLUMNS, create_monthly_weather_summary
+    from parquet_writer import write_parquet
+    from backends import compare_backends, resolve_backend
+    from dashboard_data import CHART_COLUMNS, ModeledDataLoader
+
+    print(f"Génération des données synthétiques : {n_cities} villes x {n_days} jours (graine {seed})...")
+    dataset = write_synthetic_dataset(os.path.join(workdir, 'data', 'raw'), n_cities, n_days, seed)
+    with open(dataset['openweather_path'], 'r') as f:
+        responses = json.load(f)
+    city_coords = {
+        city.city: {'lat': city.latitude, 'lon': city.longitude}
+        for city in dataset['cities'].itertuples(index=False)
+    }
+    base_url, server = start_mock_openweather(responses)
+
+    results = {}
+    print("Mesures :")
+    results['extract_json'], df_json = measure(
+        'extract_json', lambda: extract_json_data(JSON_FILE_NAME), repeat)
+    results['extract_historical_csv'], df_historical = measure(
+        'extract_historical_csv', lambda: extract_historical_data(HISTORICAL_FILE_NAME, use_cache=False), repeat)
+    results['extract_openweather_mocked'], df_openweather = measure(
+        'extract_openweather_mocked',
+        lambda: extract_openweather_data(city_coords, 'benchmark', base_url=base_url,
+                                         rate_limit_per_second=10_000, api_key_calls_per_minute=1_000_000,
+                                         use_cache=False),
+        repeat)
+    server.shutdown()
+
+    results['clean_and_transform_data'], df_transformed = measure(
+        'clean_and_transform_data',
+        lambda: clean_and_transform_data(df_json, df_openweather, df_historical, backend='pandas'), repeat)
+    results['create_monthly_weather_summary'], df_monthly = measure(
+        'create_monthly_weather_summary',
+        lambda: create_monthly_weather_summary(df_transformed.copy(), backend='pandas'), repeat)
+
+    # Moteur DuckDB (optionnel) : durées et équivalence avec le moteur pandas
+    backend_equivalence = None
+    if resolve_backend('duckdb') == 'duckdb':
+        results['clean_and_transform_data[duckdb]'], _ = measure(
+            'clean_and_transform_data[duckdb]',
+            lambda: clean_and_transform_data(df_json, df_openweather, df_historical, backend='duckdb'), repeat)
+        results['create_monthly_weather_summary[duckdb]'], _ = measure(
+            'create_monthly_weather_summary[duckdb]',
+            lambda: create_monthly_weather_summary(df_transformed.copy(), backend='duckdb'), repeat)
+        with contextlib.redirect_stdout(io.StringIO()):
+            backend_equivalence = compare_backends(df_json, df_openweather, df_historical)
+        if backend_equivalence is not None:
+            print(f"  Équivalence pandas/DuckDB : transformation {backend_equivalence['transform']}, "
+                  f"résumé mensuel {backend_equivalence['monthly_summary']}")
+
+    # Chemin de chargement et de filtrage du tableau de bord (dashboard_app.py, hors rendu Streamlit)
+    modeled_path = os.path.join(workdir, 'data', 'processed', 'modeled_weather_data.parquet')
+    write_parquet(df_monthly, modeled_path, sort_by=MODELED_SORT_COLUMNS)
+    warm_loader = ModeledDataLoader(modeled_path)
+
+    def dashboard_load_filter(loader=None):
+        # Premier affichage : chargeur neuf (cache vide), sauf pour la mesure du cache
+        loader = loader or ModeledDataLoader(modeled_path)
+        all_cities, all_years = loader.options()
+        df_filtered = loader.load(all_cities[:DASHBOARD_DEFAULT_CITIES], all_years[:1], columns=CHART_COLUMNS)
+        series = loader.chart_series(all_cities[:DASHBOARD_DEFAULT_CITIES], all_years[:1])
+        for _ in range(DASHBOARD_SORTED_CHARTS):
+            series.line('avg_temp_celsius')
+        return df_filtered
+
+    results['dashboard_load_filter'], _ = measure('dashboard_load_filter', dashboard_load_filter, repeat)
+    results['dashboard_load_filter[cached]'], _ = measure(
+        'dashboard_load_filter[cached]', lambda: dashboard_load_filter(warm_loader), repeat)
+
+    def dashboard_chart_series():
+        # Sélection large (toutes les villes, toutes les années) : séries des quatre graphiques
+        loader = ModeledDataLoader(modeled_path)
+        all_cities, all_years = loader.options()
+        series = loader.chart_series(all_cities, all_years)
+        frames = [series.line('avg_temp_celsius'), series.bars('total_precipitation_mm'),
+                  series.bars('num_rainy_days'), series.line('avg_humidity_percent')]
+        return pd.concat(frames)
+
+    results['dashboard_chart_series'], _ = measure('dashboard_chart_series', dashboard_chart_series, repeat)
+
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'params': {'cities': n_cities, 'days': n_days, 'seed': seed, 'repeat': repeat},
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+        },
+        'data_rows': dataset['rows'],
+        'results': results,
+        'backend_equivalence': backend_equivalence,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Banc d'essai du pipeline météo sur données synthétiques.")
+    parser.add_argument('--cities', type=int, default=200, help="Nombre de villes")
+    parser.add_argument('--days', type=int, default=365, help="Nombre de jours")
+    parser.add_argument('--seed', type=int, default=42, help="Graine du générateur")
+    parser.add_argument('--repeat', type=int, default=3, help="Exécutions par étape")
+    parser.add_argument('--output', default=DEFAULT_REPORT_PATH, help="Chemin du rapport JSON")
+    parser.add_argument('--workdir', default=None, help="AIRFLOW_HOME de test (temporaire par défaut)")
+    parser.add_argument('--baseline', default=None, help="Rapport de référence à comparer")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Ralentissement toléré (0.25 = +25 %%)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='weather_bench_') as tmp_dir:
+        report = run(args.cities, args.days, args.seed, args.repeat, args.workdir or tmp_dir)
+
+    exit_code = 0
+    if args.baseline:
+        report['baseline'] = args.baseline
+        report['regressions'] = compare_with_baseline(report, args.baseline, args.tolerance)
+        for regression in report['regressions']:
+            print(f"RÉGRESSION : {regression['stage']} x{regression['ratio']} "
+                  f"({regression['baseline_median_s']:.4f} s -> {regression['median_s']:.4f} s)")
+        exit_code = 1 if report['regressions'] else 0
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Rapport écrit dans : {args.output}")
+    sys.exit(exit_code)
@@ -0,0 +1,193 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Conditions météo tirées au hasard (libellés du JSON des capitales)
+CONDITIONS = ['Sunny', 'Partly cloudy', 'Overcast', 'Light rain', 'Moderate rain', 'Mist', 'Clear', 'Patchy rain possible']
+
+DEFAULT_START_DATE = '2024-01-01'
+DEFAULT_MISSING_RATE = 0.01  # Part des mesures laissées vides (pour exercer l'imputation)
+
+JSON_FILE_NAME = "all_capitals_weather.json"
+HISTORICAL_FILE_NAME = "historical_synthetic.csv"
+OPENWEATHER_FILE_NAME = "openweather_responses.json"
+
+
+def generate_cities(n_cities: int, rng: np.random.Generator) -> pd.DataFrame:
+    """
+    Génère des villes fictives (nom, pays, coordonnées), environ quatre villes par pays.
+    :param n_cities: Nombre de villes.
+    :param rng: Générateur aléatoire initialisé.
+    :return: DataFrame city, country, latitude, longitude.
+    """
+    n_countries = max(1, n_cities // 4)
+    return pd.DataFrame({
+        'city': [f"City {i:05d}" for i in range(n_cities)],
+        'country': [f"Country {i:04d}" for i in rng.integers(0, n_countries, n_cities)],
+        'latitude': rng.uniform(-60, 70, n_cities).round(4),
+        'longitude': rng.uniform(-180, 180, n_cities).round(4),
+    })
+
+
+def _daily_measures(cities: pd.DataFrame, dates: pd.DatetimeIndex, rng: np.random.Generator) -> pd.DataFrame:
+    """
+    Mesures quotidiennes plausibles (cycle saisonnier selon la latitude, pluie intermittente)
+    pour chaque couple (ville, jour).
+    """
+    n_cities, n_days = len(cities), len(dates)
+    city_idx = np.repeat(np.arange(n_cities), n_days)
+    day_idx = np.tile(np.arange(n_days), n_cities)
+    latitude = cities['latitude'].to_numpy()[city_idx]
+
+    day_of_year = dates.dayofyear.to_numpy()[day_idx]
+    seasonal = np.cos(2 * np.pi * (day_of_year - 200) / 365.25) * np.sign(latitude) * np.abs(latitude) / 4
+    temperature = 28 - np.abs(latitude) * 0.4 + seasonal + rng.normal(0, 3, len(city_idx))
+    is_rainy = rng.random(len(city_idx)) < 0.3
+    return pd.DataFrame({
+        'city_idx': city_idx,
+        'day_idx': day_idx,
+        'temperature': temperature.round(1),
+        'feels_like': (temperature + rng.normal(-1, 1.5, len(city_idx))).round(1),
+        'humidity': rng.integers(20, 100, len(city_idx)),
+        'pressure': rng.normal(1013, 8, len(city_idx)).round(0),
+        'wind_kph': rng.gamma(2.0, 6.0, len(city_idx)).round(1),
+        'precip_mm': np.where(is_rainy, rng.exponential(4.0, len(city_idx)), 0.0).round(2),
+        'cloud': rng.integers(0, 101, len(city_idx)),
+        'visibility_km': rng.choice([10.0, 10.0, 10.0, 8.0, 5.0, 2.0], len(city_idx)),
+        'uv_index': rng.uniform(0, 11, len(city_idx)).round(1),
+        'condition': rng.choice(CONDITIONS, len(city_idx)),
+        'hour': rng.integers(0, 24, len(city_idx)),
+    })
+
+
+def generate_json_snapshots(cities: pd.DataFrame, n_days: int, rng: np.random.Generator,
+                            start_date: str = DEFAULT_START_DATE,
+                            missing_rate: float = DEFAULT_MISSING_RATE) -> list:
+    """
+    Génère les relevés du JSON des capitales : un relevé par ville et par jour.
+    :param cities: Villes (generate_cities).
+    :param n_days: Nombre de jours.
+    :param rng: Générateur aléatoire initialisé.
+    :param start_date: Premier jour.
+    :param missing_rate: Part des mesures laissées vides.
+    :return: Liste d'enregistrements au format de all_capitals_weather.json.
+    """
+    dates = pd.date_range(start_date, periods=n_days, freq='D')
+    measures = _daily_measures(cities, dates, rng)
+    timestamps = (dates[measures['day_idx'].to_numpy()] + pd.to_timedelta(measures['hour'].to_numpy(), unit='h'))
+
+    records = pd.DataFrame({
+        'location_name': cities['city'].to_numpy()[measures['city_idx']],
+        'country': cities['country'].to_numpy()[measures['city_idx']],
+        'latitude': cities['latitude'].to_numpy()[measures['city_idx']],
+        'longitude': cities['longitude'].to_numpy()[measures['city_idx']],
+        'last_updated': timestamps.strftime('%Y-%m-%d %H:%M'),
+        'temperature_celsius': measures['temperature'],
+        'feels_like_celsius': measures['feels_like'],
+        'humidity': measures['humidity'].astype(float),
+        'pressure_mb': measures['pressure'],
+        'wind_kph': measures['wind_kph'],
+        'precip_mm': measures['precip_mm'],
+        'cloud': measures['cloud'].astype(float),
+        'visibility_km': measures['visibility_km'],
+        'uv_index': measures['uv_index'],
+        'condition_text': measures['condition'],
+    })
+    for col in ['temperature_celsius', 'humidity', 'pressure_mb', 'wind_kph', 'cloud', 'visibility_km']:
+        records.loc[rng.random(len(records)) < missing_rate, col] = np.nan
+    # NaN -> null dans le JSON
+    return [{key: (None if isinstance(value, float) and np.isnan(value) else value) for key, value in record.items()}
+            for record in records.to_dict(orient='records')]
+
+
+def generate_historical_csv(cities: pd.DataFrame, n_days: int, rng: np.random.Generator,
+                            start_date: str = DEFAULT_START_DATE) -> pd.DataFrame:
+    """
+    Génère l'historique quotidien (les `n_days` jours précédant `start_date`) au format du CSV historique.
+    :return: DataFrame Date, City, Temperature_Celsius, Precipitation_mm.
+    """
+    dates = pd.date_range(end=pd.Timestamp(start_date) - pd.Timedelta(days=1), periods=n_days, freq='D')
+    measures = _daily_measures(cities, dates, rng)
+    return pd.DataFrame({
+        'Date': dates[measures['day_idx'].to_numpy()].strftime('%Y-%m-%d'),
+        'City': cities['city'].to_numpy()[measures['city_idx']],
+        'Temperature_Celsius': measures['temperature'],
+        'Precipitation_mm': measures['precip_mm'],
+    })
+
+
+def generate_openweather_responses(cities: pd.DataFrame, rng: np.random.Generator,
+                                   observed_at: str = DEFAULT_START_DATE) -> dict:
+    """
+    Génère des réponses simulées de l'endpoint OpenWeather « météo actuelle », une par ville.
+    :return: Dictionnaire {'lat,lon': réponse JSON}.
+    """
+    dt = int(pd.Timestamp(observed_at, tz='UTC').timestamp())
+    responses = {}
+    for city in cities.itertuples(index=False):
+        rain = float(rng.exponential(1.0)) if rng.random() < 0.3 else None
+        response = {
+            'coord': {'lat': city.latitude, 'lon': city.longitude},
+            'dt': dt,
+            'timezone': int(rng.integers(-12, 13)) * 3600,
+            'main': {
+                'temp': round(float(rng.normal(15, 8)), 2),
+                'feels_like': round(float(rng.normal(14, 8)), 2),
+                'humidity': int(rng.integers(20, 100)),
+                'pressure': int(rng.normal(1013, 8)),
+            },
+            'wind': {'speed': round(float(rng.gamma(2.0, 2.0)), 2)},
+            'weather': [{'description': str(rng.choice(CONDITIONS)).lower()}],
+            'clouds': {'all': int(rng.integers(0, 101))},
+            'visibility': int(rng.choice([10000, 8000, 5000])),
+            'name': city.city,
+        }
+        if rain is not None:
+            response['rain'] = {'1h': round(rain, 2)}
+        responses[f"{city.latitude},{city.longitude}"] = response
+    return responses
+
+
+def write_synthetic_dataset(raw_data_path: str, n_cities: int, n_days: int, seed: int = 42,
+                            start_date: str = DEFAULT_START_DATE) -> dict:
+    """
+    Écrit un jeu de données synthétique complet et reproductible (même graine = mêmes fichiers)
+    dans le dossier data/raw d'un AIRFLOW_HOME de test.
+    :param raw_data_path: Dossier de destination (data/raw).
+    :param n_cities: Nombre de villes.
+    :param n_days: Nombre de jours (relevés JSON et, en amont, historique CSV).
+    :param seed: Graine du générateur.
+    :param start_date: Premier jour des relevés JSON.
+    :return: Dictionnaire des chemins écrits et du nombre de lignes par source.
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(raw_data_path, exist_ok=True)
+    cities = generate_cities(n_cities, rng)
+
+    snapshots = generate_json_snapshots(cities, n_days, rng, start_date)
+    json_path = os.path.join(raw_data_path, JSON_FILE_NAME)
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(snapshots, f)
+
+    historical = generate_historical_csv(cities, n_days, rng, start_date)
+    historical_path = os.path.join(raw_data_path, HISTORICAL_FILE_NAME)
+    historical.to_csv(historical_path, index=False)
+
+    responses = generate_openweather_responses(cities, rng, start_date)
+    openweather_path = os.path.join(raw_data_path, OPENWEATHER_FILE_NAME)
+    with open(openweather_path, 'w', encoding='utf-8') as f:
+        json.dump(responses, f)
+
+    return {
+        'cities': cities,
+        'json_path': json_path,
+        'historical_path': historical_path,
+        'openweather_path': openweather_path,
+        'rows': {
+            'json_initial': len(snapshots),
+            'historical_csv': len(historical),
+            'openweather_api': len(responses),
+        },
+    }
@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+
+# Au-delà de ce nombre de points par graphique, les séries sont réduites et les courbes tracées en WebGL
+DEFAULT_MAX_POINTS = 4000
+MIN_POINTS_PER_SERIES = 24  # Deux ans de mois : en dessous, une série n'est jamais réduite
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Sous-échantillonnage « Largest-Triangle-Three-Buckets » : choisit `n_out` points qui conservent
+    la forme de la courbe (pics et creux), en gardant le premier et le dernier point.
+    :param x: Abscisses triées (numériques).
+    :param y: Ordonnées, sans valeurs manquantes.
+    :param n_out: Nombre de points à conserver.
+    :return: Positions des points conservés, croissantes.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+    # Découpage des points intérieurs en n_out - 2 tranches
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # Point moyen de la tranche suivante (dernier point pour la dernière tranche)
+        next_start, next_end = end, edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x, next_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+class ChartSeries:
+    """
+    Séries de graphiques d'une sélection du tableau de bord : les lignes sont triées une seule fois
+    par (ville, mois) et partagées par tous les onglets. Quand le nombre de points d'un graphique
+    dépasse `max_points`, les courbes sont réduites par LTTB (et tracées en WebGL) et les barres
+    regroupées par trimestre.
+    """
+
+    def __init__(self, df: pd.DataFrame, x: str = 'month_year', group: str = 'city',
+                 max_points: int = DEFAULT_MAX_POINTS):
+        """
+        :param df: Données filtrées (une ligne par ville et par mois).
+        :param x: Colonne des abscisses.
+        :param group: Colonne des séries (une couleur par valeur).
+        :param max_points: Nombre de points par graphique au-delà duquel les séries sont réduites.
+        """
+        self.x = x
+        self.group = group
+        self.max_points = max_points
+        self.df = df.sort_values([group, x], kind='stable', ignore_index=True)
+        self._frames = {}
+
+    @property
+    def point_count(self) -> int:
+        return len(self.df)
+
+    @property
+    def reduced(self) -> bool:
+        return self.point_count > self.max_points
+
+    @property
+    def render_mode(self) -> str:
+        """
+        Mode de rendu Plotly des courbes : WebGL pour les sélections volumineuses.
+        """
+        return 'webgl' if self.reduced else 'auto'
+
+    @property
+    def x_dtick(self) -> str:
+        """
+        Pas des graduations de l'axe des mois : trimestriel pour les sélections volumineuses.
+        """
+        return 'M3' if self.reduced else 'M1'
+
+    @property
+    def bar_period_label(self) -> str:
+        """
+        Libellé de la période d'une barre (titres et axe des graphiques en barres) : trimestre si les barres
+        sont regroupées (voir bars), mois sinon.
+        """
+        return 'Trimestre' if self.reduced else 'Mois'
+
+    def line(self, metric: str) -> pd.DataFrame:
+        """
+        Points d'une courbe par ville, réduits par LTTB si la sélection est volumineuse.
+        :param metric: Colonne de la mesure.
+        :return: DataFrame (x, groupe, mesure) trié par groupe puis par x.
+        """
+        key = ('line', metric)
+        if key not in self._frames:
+            frame = self.df[[self.x, self.group, metric]]
+            if self.reduced:
+                frame = frame.dropna(subset=[metric])
+                n_groups = max(1, frame[self.group].nunique())
+                n_out = max(MIN_POINTS_PER_SERIES, self.max_points // n_groups)
+                x_values = frame[self.x].to_numpy().astype('datetime64[ns]').astype(np.int64)
+                y_values = frame[metric].to_numpy(dtype=np.float64)
+                keep = []
+                for positions in frame.groupby(self.group, sort=False).indices.values():
+                    keep.append(positions[lttb_indices(x_values[positions], y_values[positions], n_out)])
+                frame = frame.iloc[np.concatenate(keep)] if keep else frame
+            self._frames[key] = frame
+        return self._frames[key]
+
+    def bars(self, metric: str, agg: str = 'sum') -> pd.DataFrame:
+        """
+        Barres par ville et par mois, regroupées par trimestre si la sélection est volumineuse
+        (un sous-échantillonnage ferait disparaître des barres).
+        :param metric: Colonne de la mesure.
+        :param agg: Agrégation utilisée pour le regroupement trimestriel.
+        :return: DataFrame (x, groupe, mesure).
+        """
+        key = ('bars', metric, agg)
+        if key not in self._frames:
+            frame = self.df[[self.x, self.group, metric]]
+            if self.reduced:
+                quarter_start = frame[self.x].dt.to_period('Q').dt.start_time
+                frame = (frame.groupby([frame[self.group], quarter_start.rename(self.x)], sort=True, observed=True)
+                         [metric].agg(agg).reset_index())
+            self._frames[key] = frame
+        return self._frames[key]
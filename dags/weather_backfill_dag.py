@@ -0,0 +1,48 @@
+from airflow import DAG
+from airflow.models.param import Param
+from airflow.operators.python import PythonOperator
+from datetime import datetime
+import sys
+import os
+
+# Même configuration du PYTHONPATH que weather_etl_dag.py
+project_root = os.environ.get('AIRFLOW_HOME') or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+etl_scripts_path = os.path.join(project_root, 'etl_scripts')
+if etl_scripts_path not in sys.path:
+    sys.path.append(etl_scripts_path)
+
+# Même valeur par défaut que backfill.DEFAULT_BACKFILL_WORKERS : l'ETL n'est importé que dans la tâche
+DEFAULT_BACKFILL_WORKERS = os.cpu_count() or 1
+
+
+def _run_backfill(start_date, end_date, workers=DEFAULT_BACKFILL_WORKERS):
+    from backfill import run_backfill
+    return run_backfill(start_date, end_date, workers=workers)
+
+
+# DAG déclenché manuellement : la plage de dates et le nombre de processus sont passés en paramètres
+# (formulaire "Trigger DAG w/ config" ou `airflow dags trigger -c '{"start": "...", "end": "..."}'`).
+with DAG(
+    dag_id='weather_etl_backfill',
+    description='Rattrapage du pipeline météo sur une plage de dates (un jour = une partition)',
+    schedule_interval=None,
+    start_date=datetime(2023, 1, 1),
+    catchup=False,
+    params={
+        'start': Param('2024-01-01', type='string', format='date', description="Premier jour (inclus)"),
+        'end': Param('2024-01-31', type='string', format='date', description="Dernier jour (inclus)"),
+        'workers': Param(DEFAULT_BACKFILL_WORKERS, type='integer', minimum=1, description="Nombre de processus"),
+    },
+    tags=['weather', 'etl', 'backfill'],
+) as dag:
+    backfill_task = PythonOperator(
+        task_id='backfill_weather_data',
+        python_callable=_run_backfill,
+        op_kwargs={
+            'start_date': '{{ params.start }}',
+            'end_date': '{{ params.end }}',
+            'workers': '{{ params.workers }}',
+        },
+    )
@@ -6,45 +6,57 @@ import os
 
 # Ajoutez le répertoire racine du projet au PYTHONPATH pour que les imports fonctionnent
 # Assurez-vous que AIRFLOW_HOME pointe vers le répertoire racine de votre projet
-project_root = os.environ.get('AIRFLOW_HOME')
+# (à défaut, le dossier parent de dags/ est utilisé)
+project_root = os.environ.get('AIRFLOW_HOME') or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if project_root not in sys.path:
     sys.path.append(project_root)
 
-# Importez vos fonctions ETL
-# Assurez-vous que ces imports fonctionnent depuis la perspective d'Airflow
-# C'est-à-dire que etl_scripts/ doit être accessible dans le PYTHONPATH
-# ou que les chemins des fonctions soient directs.
-# Pour simplifier, nous allons appeler les scripts via os.system ou subprocess.
-# Dans un environnement de production, il serait préférable d'importer les fonctions directement.
+# Les scripts ETL s'importent entre eux par nom de module (ex. `from extract_data import ...`) :
+# le dossier etl_scripts/ doit donc aussi être dans le PYTHONPATH.
+etl_scripts_path = os.path.join(project_root, 'etl_scripts')
+if etl_scripts_path not in sys.path:
+    sys.path.append(etl_scripts_path)
+
+# Les fonctions ETL sont appelées directement dans le processus du worker (pas de sous-processus).
+# Chaque étape écrit ses résultats dans data/artifacts/<ds>/ (Arrow IPC) ; l'étape suivante les lit
+# par projection mémoire au lieu de ré-extraire les sources (une seule série d'appels API par exécution).
+# N'oubliez pas que les variables d'environnement (AIRFLOW_HOME, OPENWEATHER_API_KEY)
+# doivent être définies dans l'environnement du worker Airflow.
+# L'extraction est découpée en lots (une tâche mappée par source locale et par tranche de villes
+# OpenWeather) répartis entre les workers, puis regroupés avant la transformation.
+# Le module pipeline (pandas, pyarrow, lecture de AIRFLOW_HOME...) n'est importé que dans les tâches :
+# l'analyse du DAG par le scheduler reste légère et n'échoue pas si l'environnement ETL est incomplet.
 
 # Fonctions wrapper pour les opérateurs Python
-def _run_extract_data():
-    """Exécute le script d'extraction des données."""
-    # Nous utilisons os.system ici pour la simplicité.
-    # Dans un DAG plus robuste, on importerait et appellerait les fonctions directement.
-    # N'oubliez pas que les variables d'environnement (AIRFLOW_HOME, OPENWEATHER_API_KEY)
-    # doivent être définies dans l'environnement du worker Airflow.
-    cmd = f"python {project_root}/etl_scripts/extract_data.py"
-    print(f"Exécution de : {cmd}")
-    result = os.system(cmd)
-    if result != 0:
-        raise Exception(f"Le script extract_data.py a échoué avec le code de sortie {result}")
-
-def _run_transform_data():
-    """Exécute le script de transformation des données."""
-    cmd = f"python {project_root}/etl_scripts/transform_data.py"
-    print(f"Exécution de : {cmd}")
-    result = os.system(cmd)
-    if result != 0:
-        raise Exception(f"Le script transform_data.py a échoué avec le code de sortie {result}")
-
-def _run_data_modeling():
-    """Exécute le script de modélisation des données."""
-    cmd = f"python {project_root}/etl_scripts/data_modeling.py"
-    print(f"Exécution de : {cmd}")
-    result = os.system(cmd)
-    if result != 0:
-        raise Exception(f"Le script data_modeling.py a échoué avec le code de sortie {result}")
+def _plan_extract_shards(run_date):
+    from pipeline import plan_extract_shards
+    return plan_extract_shards(run_date)
+
+
+def _run_extract_shard(run_date, source, shard_id, city_coords=None, shard_count=1):
+    from pipeline import run_extract_shard
+    return run_extract_shard(run_date, source, shard_id, city_coords=city_coords, shard_count=shard_count)
+
+
+def _combine_extract_shards(run_date):
+    from pipeline import combine_extract_shards
+    return combine_extract_shards(run_date)
+
+
+def _run_transform(run_date):
+    from pipeline import run_transform
+    return run_transform(run_date)
+
+
+def _run_modeling(run_date):
+    from pipeline import run_modeling
+    return run_modeling(run_date)
+
+
+def _prune_artifacts(run_date):
+    from pipeline import prune_artifacts
+    return prune_artifacts(run_date)
+
 
 default_args = {
     'owner': 'airflow',
@@ -64,20 +76,42 @@ with DAG(
     catchup=False, # Ne pas exécuter les DAGs pour les dates passées
     tags=['weather', 'etl', 'dashboard'],
 ) as dag:
-    extract_task = PythonOperator(
+    plan_task = PythonOperator(
+        task_id='plan_extract_shards',
+        python_callable=_plan_extract_shards,
+        op_kwargs={'run_date': '{{ ds }}'},
+    )
+
+    # Une instance de tâche par lot du plan (dynamic task mapping, Airflow >= 2.3)
+    extract_task = PythonOperator.partial(
         task_id='extract_weather_data',
-        python_callable=_run_extract_data,
+        python_callable=_run_extract_shard,
+    ).expand(op_kwargs=plan_task.output)
+
+    combine_task = PythonOperator(
+        task_id='combine_extract_shards',
+        python_callable=_combine_extract_shards,
+        op_kwargs={'run_date': '{{ ds }}'},
     )
 
     transform_task = PythonOperator(
         task_id='transform_weather_data',
-        python_callable=_run_transform_data,
+        python_callable=_run_transform,
+        op_kwargs={'run_date': '{{ ds }}'},
     )
 
     model_task = PythonOperator(
         task_id='model_weather_data',
-        python_callable=_run_data_modeling,
+        python_callable=_run_modeling,
+        op_kwargs={'run_date': '{{ ds }}'},
+    )
+
+    # Supprime les artefacts des exécutions plus anciennes que WEATHER_ARTIFACTS_RETENTION_DAYS jours
+    prune_task = PythonOperator(
+        task_id='prune_artifacts',
+        python_callable=_prune_artifacts,
+        op_kwargs={'run_date': '{{ ds }}'},
     )
 
     # Définition de l'ordre des tâches
-    extract_task >> transform_task >> model_task
\ No newline at end of file
+    plan_task >> extract_task >> combine_task >> transform_task >> model_task >> prune_task
\ No newline at end of file
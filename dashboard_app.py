@@ -4,6 +4,9 @@ import os
 import plotly.express as px
 import plotly.graph_objects as go
 
+from dashboard_data import CHART_COLUMNS, ModeledDataLoader
+from data_export import EXPORT_FORMATS, export_selection, resolve_export_source
+
 # --- Configuration des chemins ---
 AIRFLOW_HOME = os.environ.get('AIRFLOW_HOME')
 if not AIRFLOW_HOME:
@@ -14,25 +17,36 @@ PROCESSED_DATA_PATH = os.path.join(AIRFLOW_HOME, 'data', 'processed')
 MODELED_DATA_FILENAME = "modeled_weather_data.parquet"
 MODELED_DATA_FILEPATH = os.path.join(PROCESSED_DATA_PATH, MODELED_DATA_FILENAME)
 
-# --- Fonction de chargement des données (avec cache pour performance) ---
-@st.cache_data
-def load_modeled_data():
+# --- Accès aux données (un seul chargeur par processus, cache LRU par sélection) ---
+@st.cache_resource
+def get_data_loader():
+    """
+    Chargeur des données modélisées partagé entre les sessions : les filtres de ville et d'année
+    et les colonnes utiles sont transmis à la lecture Parquet, et chaque sélection est mise en cache.
+    Le thread de surveillance recharge en arrière-plan les sélections récentes dès qu'une nouvelle
+    version est sauvegardée par le pipeline (manifeste de save_modeled_data).
+    """
+    loader = ModeledDataLoader(MODELED_DATA_FILEPATH)
+    loader.start_watcher()
+    return loader
+
+
+def load_filter_options():
     """
-    Charge les données météorologiques modélisées depuis le fichier Parquet.
-    Utilise st.cache_data pour éviter de recharger les données à chaque interaction.
+    Charge les villes et années disponibles (colonnes city et year uniquement).
+    :return: Tuple (villes, années), ou (None, None) si les données ne sont pas disponibles.
     """
-    if not os.path.exists(MODELED_DATA_FILEPATH):
+    loader = get_data_loader()
+    if not loader.exists():
         st.error(f"Erreur : Le fichier de données modélisées n'a pas été trouvé à : {MODELED_DATA_FILEPATH}")
         st.warning("Veuillez vous assurer d'avoir exécuté les scripts ETL ('transform_data.py' et 'data_modeling.py') avant de lancer le tableau de bord.")
-        return pd.DataFrame() # Retourne un DataFrame vide
+        return None, None
 
     try:
-        df = pd.read_parquet(MODELED_DATA_FILEPATH)
-        df['month_year'] = pd.to_datetime(df['year'].astype(str) + '-' + df['month'].astype(str) + '-01')
-        return df
+        return loader.options()
     except Exception as e:
         st.error(f"Erreur lors du chargement ou du traitement du fichier de données modélisées : {e}")
-        return pd.DataFrame()
+        return None, None
 
 # --- Titre du tableau de bord ---
 st.set_page_config(layout="wide", page_title="Tableau de Bord Météo")
@@ -40,9 +54,9 @@ st.title("☀️ Tableau de Bord Météo des Capitales Mondiales")
 st.markdown("Explorez les tendances météorologiques mensuelles agrégées pour différentes villes.")
 
 # --- Chargement des données ---
-df_modeled = load_modeled_data()
+all_cities, all_years = load_filter_options()
 
-if df_modeled.empty:
+if not all_cities:
     st.info("Aucune donnée disponible à afficher. Vérifiez les messages d'erreur ci-dessus.")
     st.stop() # Arrête l'application si les données ne sont pas chargées
 
@@ -51,7 +65,6 @@ if df_modeled.empty:
 st.sidebar.header("Filtres d'Analyse")
 
 # Sélecteur de ville
-all_cities = sorted(df_modeled['city'].unique().tolist())
 selected_cities = st.sidebar.multiselect(
     "Sélectionnez les villes :",
     options=all_cities,
@@ -59,18 +72,16 @@ selected_cities = st.sidebar.multiselect(
 )
 
 # Sélecteur d'année
-all_years = sorted(df_modeled['year'].unique().tolist(), reverse=True)
 selected_years = st.sidebar.multiselect(
     "Sélectionnez les années :",
     options=all_years,
     default=all_years[0] if all_years else [] # Sélectionne la dernière année disponible par défaut
 )
 
-# Filtrer le DataFrame en fonction des sélections
-df_filtered = df_modeled[
-    (df_modeled['city'].isin(selected_cities)) &
-    (df_modeled['year'].isin(selected_years))
-]
+# Lecture des seules lignes et colonnes de la sélection (filtres appliqués pendant la lecture Parquet)
+df_filtered = get_data_loader().load(selected_cities, selected_years, columns=CHART_COLUMNS)
+# Séries triées une seule fois par sélection et partagées par les onglets (réduites si la sélection est volumineuse)
+series = get_data_loader().chart_series(selected_cities, selected_years)
 
 if df_filtered.empty:
     st.warning("Aucune donnée disponible pour la sélection actuelle. Veuillez ajuster vos filtres.")
@@ -88,39 +99,40 @@ with tab1:
     with col1:
         st.subheader("Température Moyenne Mensuelle (°C)")
         fig_temp = px.line(
-            df_filtered.sort_values(by=['month_year']),
+            series.line('avg_temp_celsius'),
             x='month_year',
             y='avg_temp_celsius',
             color='city',
             title='Température Moyenne par Mois et Ville',
-            labels={'avg_temp_celsius': 'Température Moyenne (°C)', 'month_year': 'Mois'}
+            labels={'avg_temp_celsius': 'Température Moyenne (°C)', 'month_year': 'Mois'},
+            render_mode=series.render_mode
         )
-        fig_temp.update_xaxes(dtick="M1", tickformat="%b\n%Y") # Format de l'axe X pour le mois et l'année
+        fig_temp.update_xaxes(dtick=series.x_dtick, tickformat="%b\n%Y") # Format de l'axe X pour le mois et l'année
         st.plotly_chart(fig_temp, use_container_width=True)
 
     with col2:
-        st.subheader("Précipitations Totales Mensuelles (mm)")
+        st.subheader(f"Précipitations Totales par {series.bar_period_label} (mm)")
         fig_precip = px.bar(
-            df_filtered.sort_values(by=['month_year']),
+            series.bars('total_precipitation_mm'),
             x='month_year',
             y='total_precipitation_mm',
             color='city',
-            title='Précipitations Totales par Mois et Ville',
-            labels={'total_precipitation_mm': 'Précipitations (mm)', 'month_year': 'Mois'}
+            title=f'Précipitations Totales par {series.bar_period_label} et Ville',
+            labels={'total_precipitation_mm': 'Précipitations (mm)', 'month_year': series.bar_period_label}
         )
-        fig_precip.update_xaxes(dtick="M1", tickformat="%b\n%Y")
+        fig_precip.update_xaxes(dtick=series.x_dtick, tickformat="%b\n%Y")
         st.plotly_chart(fig_precip, use_container_width=True)
 
-    st.subheader("Nombre de Jours Pluvieux par Mois")
+    st.subheader(f"Nombre de Jours Pluvieux par {series.bar_period_label}")
     fig_rainy = px.bar(
-        df_filtered.sort_values(by=['month_year']),
+        series.bars('num_rainy_days'),
         x='month_year',
         y='num_rainy_days',
         color='city',
-        title='Nombre de Jours Pluvieux par Mois et Ville',
-        labels={'num_rainy_days': 'Jours Pluvieux', 'month_year': 'Mois'}
+        title=f'Nombre de Jours Pluvieux par {series.bar_period_label} et Ville',
+        labels={'num_rainy_days': 'Jours Pluvieux', 'month_year': series.bar_period_label}
     )
-    fig_rainy.update_xaxes(dtick="M1", tickformat="%b\n%Y")
+    fig_rainy.update_xaxes(dtick=series.x_dtick, tickformat="%b\n%Y")
     st.plotly_chart(fig_rainy, use_container_width=True)
 
 
@@ -142,28 +154,54 @@ with tab2:
     selected_metric_column = metric_options[selected_metric_name]
 
     fig_trend = px.line(
-        df_filtered.sort_values(by=['month_year']),
+        series.line(selected_metric_column),
         x='month_year',
         y=selected_metric_column,
         color='city',
         title=f'Tendance Mensuelle pour {selected_metric_name}',
-        labels={selected_metric_column: selected_metric_name, 'month_year': 'Mois'}
+        labels={selected_metric_column: selected_metric_name, 'month_year': 'Mois'},
+        render_mode=series.render_mode
     )
-    fig_trend.update_xaxes(dtick="M1", tickformat="%b\n%Y")
+    fig_trend.update_xaxes(dtick=series.x_dtick, tickformat="%b\n%Y")
     st.plotly_chart(fig_trend, use_container_width=True)
 
 
 with tab3:
     st.header("Données Modélisées Brutes")
     st.write("Voici un aperçu des données modélisées utilisées pour les visualisations.")
-    st.dataframe(df_filtered) # Affiche le DataFrame filtré
-    st.download_button(
-        label="Télécharger les données filtrées",
-        data=df_filtered.to_csv(index=False).encode('utf-8'),
-        file_name='modeled_weather_data_filtered.csv',
-        mime='text/csv',
-    )
+    df_raw = get_data_loader().load(selected_cities, selected_years) # Toutes les colonnes de la sélection
+    st.dataframe(df_raw) # Affiche le DataFrame filtré
+
+    # Export : le fichier n'est produit que sur demande, lu et écrit par lots dans un fichier temporaire
+    st.subheader("Exporter la sélection")
+    export_grains = {"Mensuelle (données modélisées)": 'monthly', "Quotidienne (données transformées)": 'daily'}
+    export_col1, export_col2 = st.columns(2)
+    export_grain = export_grains[export_col1.radio("Granularité :", options=list(export_grains))]
+    export_format = export_col2.radio("Format :", options=list(EXPORT_FORMATS))
+    export_key = (tuple(sorted(selected_cities)), tuple(sorted(selected_years)), export_grain, export_format)
+
+    if st.button("Préparer l'export"):
+        export_source = resolve_export_source(PROCESSED_DATA_PATH, export_grain)
+        if export_source is None:
+            st.error("Aucune donnée disponible pour cette granularité. Exécutez d'abord le pipeline ETL.")
+        else:
+            previous_export = st.session_state.get('export')
+            if previous_export and os.path.exists(previous_export['path']):
+                os.remove(previous_export['path'])
+            with st.spinner("Préparation de l'export..."):
+                export_path, export_rows = export_selection(export_source, export_format, selected_cities, selected_years)
+            st.session_state['export'] = {'key': export_key, 'path': export_path, 'rows': export_rows}
+
+    export = st.session_state.get('export')
+    if export and export['key'] == export_key and os.path.exists(export['path']):
+        with open(export['path'], 'rb') as export_file:
+            st.download_button(
+                label=f"Télécharger les données filtrées ({export['rows']} lignes)",
+                data=export_file,
+                file_name=f"weather_data_{export_grain}{EXPORT_FORMATS[export_format]['suffix']}",
+                mime=EXPORT_FORMATS[export_format]['mime'],
+            )
     st.subheader("Informations sur le DataFrame")
     buffer = pd.io.common.StringIO()
-    df_filtered.info(buf=buffer)
+    df_raw.info(buf=buffer)
     st.text(buffer.getvalue())
\ No newline at end of file
@@ -0,0 +1,281 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from chart_series import ChartSeries
+
+# Colonnes nécessaires aux graphiques du tableau de bord (projection de la lecture Parquet)
+CHART_COLUMNS = [
+    'city', 'year', 'month', 'month_start',
+    'avg_temp_celsius', 'total_precipitation_mm', 'num_rainy_days', 'avg_humidity_percent', 'max_wind_kph',
+]
+# Colonnes lues pour construire les listes de villes et d'années des filtres
+OPTION_COLUMNS = ['city', 'year']
+
+DEFAULT_CACHE_ENTRIES = 32  # Nombre de sélections (villes, années, colonnes) conservées en cache
+DEFAULT_WATCH_INTERVAL_S = 5  # Intervalle de surveillance du fichier modélisé par le thread de préchargement
+DEFAULT_PREWARM_SELECTIONS = 8  # Sélections récentes rechargées en arrière-plan après une mise à jour
+
+# Manifeste écrit par data_modeling.save_modeled_data à côté du fichier modélisé
+MANIFEST_SUFFIX = '.manifest.json'
+
+
+def _month_year(df: pd.DataFrame) -> pd.Series:
+    """
+    Début de mois de chaque ligne : colonne month_start précalculée par data_modeling.py, sinon année et mois.
+    """
+    if 'month_start' in df.columns:
+        return df['month_start']
+    return pd.to_datetime(pd.DataFrame({'year': df['year'], 'month': df['month'], 'day': 1}))
+
+
+def _stat_token(path: str) -> str:
+    """
+    Jeton de version d'un fichier (date de modification et taille) ou d'un dossier (ensemble de ses fichiers).
+    """
+    if os.path.isdir(path):
+        entries = []
+        for root, _, files in os.walk(path):
+            for name in sorted(files):
+                stat = os.stat(os.path.join(root, name))
+                entries.append(f"{os.path.relpath(os.path.join(root, name), path)}:{stat.st_mtime_ns}:{stat.st_size}")
+        return str(hash(tuple(sorted(entries))))
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def isin_filter(dataset: ds.Dataset, column: str, values) -> ds.Expression:
+    """
+    Filtre `column IN values`, avec un ensemble de valeurs typé comme la colonne (y compris vide).
+    Pour une colonne encodée en dictionnaire (catégories pandas, sorties compactes), l'ensemble est typé
+    comme les valeurs du dictionnaire : Arrow compare alors les valeurs décodées.
+    """
+    value_type = dataset.schema.field(column).type
+    if pa.types.is_dictionary(value_type):
+        value_type = value_type.value_type
+    return ds.field(column).isin(pa.array(list(values), type=value_type))
+
+
+def read_manifest(path: str) -> dict:
+    """
+    Manifeste du fichier modélisé (version et empreinte de chaque année), ou None s'il n'existe pas.
+    """
+    manifest_path = path + MANIFEST_SUFFIX
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, 'r') as f:
+        return json.load(f)
+
+
+class ModeledDataLoader:
+    """
+    Accès aux données modélisées pour le tableau de bord.
+    Les filtres de ville et d'année ainsi que la liste des colonnes sont transmis à la lecture Parquet
+    (statistiques des row groups, partitions hive si le chemin est un dossier) : seules les lignes et
+    colonnes sélectionnées sont lues. Chaque sélection est mise en cache, avec éviction LRU.
+
+    La clé de cache d'une sélection inclut la version des données : l'empreinte des années sélectionnées
+    lue dans le manifeste, ou à défaut la date de modification et la taille du fichier. Après une
+    sauvegarde, seules les sélections touchant une année modifiée sont relues ; un thread de surveillance
+    peut recharger ces sélections en arrière-plan dès que le nouveau manifeste apparaît.
+    """
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_CACHE_ENTRIES):
+        """
+        :param path: Fichier Parquet modélisé, ou dossier d'un dataset Parquet partitionné (hive).
+        :param max_entries: Nombre maximal de sélections gardées en cache.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._dataset = None
+        self._signature = None  # (version, empreintes par partition ou None)
+        self._manifest_stat = None
+        self._watcher = None
+        self._stop_event = threading.Event()
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def dataset(self) -> ds.Dataset:
+        if self._dataset is None:
+            self._dataset = ds.dataset(self.path, format='parquet', partitioning='hive')
+        return self._dataset
+
+    # --- Cache LRU ---
+
+    def _cache_get(self, key):
+        with self._lock:
+            if key not in self._cache:
+                return None
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+    def _cache_put(self, key, value):
+        with self._lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._dataset = None
+            self._signature = None
+            self._manifest_stat = None
+
+    # --- Version des données ---
+
+    def _current_signature(self) -> tuple:
+        manifest_path = self.path + MANIFEST_SUFFIX
+        if os.path.exists(manifest_path):
+            stat = os.stat(manifest_path)
+            manifest_stat = (stat.st_mtime_ns, stat.st_size)
+            # Le manifeste n'est relu que s'il a été réécrit
+            if manifest_stat == self._manifest_stat and self._signature is not None:
+                return self._signature
+            manifest = read_manifest(self.path)
+            self._manifest_stat = manifest_stat
+            return f"manifest:{manifest['version']}", manifest.get('partitions')
+        self._manifest_stat = None
+        return (f"stat:{_stat_token(self.path)}", None) if self.exists() else (None, None)
+
+    def refresh(self) -> bool:
+        """
+        Compare la version des données avec celle de la dernière lecture.
+        :return: True si les données ont changé depuis la dernière vérification.
+        """
+        signature = self._current_signature()
+        with self._lock:
+            changed = signature != self._signature
+            if changed:
+                self._signature = signature
+                self._dataset = None
+        return changed
+
+    def _version_token(self, years: tuple = None):
+        """
+        Version des données pour une sélection : empreintes des années sélectionnées si le manifeste
+        les fournit (une sauvegarde qui ne touche pas ces années ne les invalide pas), sinon version globale.
+        """
+        version, partitions = self._signature
+        if partitions is None or years is None:
+            return version
+        return tuple(partitions.get(str(year)) for year in years)
+
+    # --- Lectures ---
+
+    def _read(self, columns: list = None, filter_expression=None) -> pd.DataFrame:
+        dataset = self.dataset()
+        if columns is not None:
+            columns = [col for col in columns if col in dataset.schema.names]
+        return dataset.to_table(columns=columns, filter=filter_expression).to_pandas()
+
+    def options(self) -> tuple:
+        """
+        Villes et années disponibles, lues sur les seules colonnes city et year.
+        :return: Tuple (villes triées, années triées de la plus récente à la plus ancienne).
+        """
+        self.refresh()
+        key = ('options', self._version_token())
+        cached = self._cache_get(key)
+        if cached is None:
+            df = self._read(OPTION_COLUMNS)
+            cached = (sorted(df['city'].dropna().unique().tolist()),
+                      sorted(df['year'].dropna().unique().tolist(), reverse=True))
+            self._cache_put(key, cached)
+        return cached
+
+    def load(self, cities, years, columns: list = None) -> pd.DataFrame:
+        """
+        Lignes des villes et années sélectionnées, avec la colonne month_year utilisée par les graphiques.
+        :param cities: Villes sélectionnées.
+        :param years: Années sélectionnées.
+        :param columns: Colonnes à lire (toutes par défaut).
+        :return: DataFrame filtré (partagé par le cache : à ne pas modifier sur place).
+        """
+        cities = tuple(sorted(str(city) for city in cities))
+        years = tuple(sorted(int(year) for year in years))
+        self.refresh()
+        key = ('rows', cities, years, tuple(columns) if columns is not None else None, self._version_token(years))
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
+        filter_expression = isin_filter(self.dataset(), 'city', cities) & isin_filter(self.dataset(), 'year', years)
+        df = self._read(columns, filter_expression)
+        df['month_year'] = _month_year(df)
+        self._cache_put(key, df)
+        return df
+
+    def chart_series(self, cities, years) -> ChartSeries:
+        """
+        Séries triées des graphiques pour une sélection, construites une fois et partagées par les onglets.
+        :param cities: Villes sélectionnées.
+        :param years: Années sélectionnées.
+        :return: ChartSeries de la sélection (mise en cache avec la même version que les lignes).
+        """
+        df = self.load(cities, years, columns=CHART_COLUMNS)
+        cities = tuple(sorted(str(city) for city in cities))
+        years = tuple(sorted(int(year) for year in years))
+        key = ('series', cities, years, self._version_token(years))
+        cached = self._cache_get(key)
+        if cached is None:
+            cached = ChartSeries(df)
+            self._cache_put(key, cached)
+        return cached
+
+    # --- Préchargement en arrière-plan ---
+
+    def prewarm(self, max_selections: int = DEFAULT_PREWARM_SELECTIONS) -> int:
+        """
+        Recharge les listes de filtres et les sélections les plus récemment consultées
+        (sans effet pour celles dont la version n'a pas changé).
+        :param max_selections: Nombre maximal de sélections rechargées.
+        :return: Nombre de sélections rechargées.
+        """
+        with self._lock:
+            recent = []
+            for key in reversed(self._cache):
+                if key[0] == 'rows' and key[1:4] not in recent:
+                    recent.append(key[1:4])
+        self.options()
+        for cities, years, columns in recent[:max_selections]:
+            self.load(cities, years, list(columns) if columns is not None else None)
+        return len(recent[:max_selections])
+
+    def start_watcher(self, interval_s: float = DEFAULT_WATCH_INTERVAL_S):
+        """
+        Démarre un thread qui surveille le fichier modélisé (et son manifeste) et précharge le cache
+        dès qu'une nouvelle version est sauvegardée. Sans effet si le thread est déjà démarré.
+        :param interval_s: Intervalle de vérification en secondes.
+        """
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop_event.clear()
+
+        def watch():
+            while not self._stop_event.wait(interval_s):
+                try:
+                    if self.exists() and self.refresh():
+                        reloaded = self.prewarm()
+                        print(f"Données modélisées mises à jour ({self._signature[0]}), "
+                              f"{reloaded} sélection(s) préchargée(s).")
+                except Exception as e:
+                    print(f"Erreur lors du préchargement des données modélisées : {e}")
+
+        self._watcher = threading.Thread(target=watch, name='modeled-data-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        self._stop_event.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
@@ -0,0 +1,151 @@
+import argparse
+import gzip
+import os
+import tempfile
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from dashboard_data import isin_filter
+
+# Formats d'export : extension du fichier et type MIME du téléchargement
+EXPORT_FORMATS = {
+    'csv': {'suffix': '.csv', 'mime': 'text/csv'},
+    'csv.gz': {'suffix': '.csv.gz', 'mime': 'application/gzip'},
+    'parquet': {'suffix': '.parquet', 'mime': 'application/vnd.apache.parquet'},
+}
+# Granularités exportables : chemins relatifs à data/processed (le premier existant est utilisé)
+EXPORT_GRAINS = {
+    'monthly': ['modeled_weather_data.parquet'],
+    'daily': ['transformed_weather_dataset', 'transformed_weather_data.parquet'],
+}
+
+DEFAULT_BATCH_ROWS = 64_000  # Lignes lues et écrites à la fois
+
+
+def resolve_export_source(processed_path: str, grain: str) -> str:
+    """
+    Chemin des données d'une granularité : résumé mensuel, ou données quotidiennes
+    (dataset partitionné s'il existe, sinon fichier transformé complet).
+    :param processed_path: Dossier data/processed.
+    :param grain: 'monthly' ou 'daily'.
+    :return: Chemin du fichier ou du dossier, ou None si aucune donnée n'existe.
+    """
+    for relative_path in EXPORT_GRAINS[grain]:
+        path = os.path.join(processed_path, relative_path)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _year_filter(dataset: ds.Dataset, years) -> ds.Expression:
+    """
+    Filtre sur les années : colonne year (résumé mensuel) ou plages de la colonne date (données quotidiennes).
+    Sur le dataset partitionné, les plages de date s'appliquent aux partitions date=AAAA-MM-JJ.
+    """
+    if 'year' in dataset.schema.names:
+        return isin_filter(dataset, 'year', years)
+    date_type = dataset.schema.field('date').type
+    is_text = pa.types.is_string(date_type) or pa.types.is_large_string(date_type)
+    expression = ds.scalar(False)
+    for year in years:
+        start, end = datetime(int(year), 1, 1), datetime(int(year) + 1, 1, 1)
+        if is_text:
+            start, end = start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')
+        else:
+            start, end = pa.scalar(start).cast(date_type), pa.scalar(end).cast(date_type)
+        expression = expression | ((ds.field('date') >= start) & (ds.field('date') < end))
+    return expression
+
+
+def iter_selection_batches(source_path: str, cities, years, columns: list = None,
+                           batch_rows: int = DEFAULT_BATCH_ROWS):
+    """
+    Lit la sélection (villes, années) par lots, sans charger l'ensemble des données.
+    :param source_path: Fichier Parquet ou dataset partitionné (hive).
+    :param cities: Villes sélectionnées (toutes si None).
+    :param years: Années sélectionnées.
+    :param columns: Colonnes à lire (toutes par défaut).
+    :param batch_rows: Nombre maximal de lignes par lot.
+    :return: Tuple (schéma, générateur de RecordBatch).
+    """
+    dataset = ds.dataset(source_path, format='parquet', partitioning='hive')
+    filter_expression = _year_filter(dataset, years)
+    if cities is not None:
+        filter_expression = isin_filter(dataset, 'city', [str(city) for city in cities]) & filter_expression
+    scanner = dataset.scanner(columns=columns, filter=filter_expression, batch_size=batch_rows)
+    return scanner.projected_schema, (batch for batch in scanner.to_batches() if batch.num_rows)
+
+
+def write_export(schema: pa.Schema, batches, output_path: str, fmt: str) -> int:
+    """
+    Écrit les lots dans le fichier d'export, lot par lot (CSV, CSV compressé gzip ou Parquet).
+    :param schema: Schéma des lots.
+    :param batches: Itérable de RecordBatch.
+    :param output_path: Fichier de destination.
+    :param fmt: Format (clé de EXPORT_FORMATS).
+    :return: Nombre de lignes écrites.
+    """
+    rows = 0
+    if fmt == 'parquet':
+        with pq.ParquetWriter(output_path, schema, compression='zstd') as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+                rows += batch.num_rows
+        return rows
+
+    opener = gzip.open if fmt == 'csv.gz' else open
+    with opener(output_path, 'wt', encoding='utf-8', newline='') as f:
+        header = True
+        for batch in batches:
+            # Même rendu que l'export pandas précédent (df.to_csv(index=False))
+            batch.to_pandas().to_csv(f, index=False, header=header)
+            header = False
+            rows += batch.num_rows
+        if header:
+            f.write(','.join(schema.names) + '\n')
+    return rows
+
+
+def export_selection(source_path: str, fmt: str, cities, years, output_dir: str = None) -> tuple:
+    """
+    Exporte une sélection dans un fichier temporaire, en flux (la mémoire utilisée est celle d'un lot).
+    :param source_path: Fichier Parquet ou dataset partitionné (resolve_export_source).
+    :param fmt: Format (clé de EXPORT_FORMATS).
+    :param cities: Villes sélectionnées.
+    :param years: Années sélectionnées.
+    :param output_dir: Dossier du fichier temporaire (dossier temporaire du système par défaut).
+    :return: Tuple (chemin du fichier exporté, nombre de lignes).
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Format d'export inconnu : {fmt} (formats : {', '.join(EXPORT_FORMATS)})")
+    fd, output_path = tempfile.mkstemp(prefix='weather_export_', suffix=EXPORT_FORMATS[fmt]['suffix'], dir=output_dir)
+    os.close(fd)
+    try:
+        schema, batches = iter_selection_batches(source_path, cities, years)
+        rows = write_export(schema, batches, output_path, fmt)
+    except Exception:
+        os.remove(output_path)
+        raise
+    return output_path, rows
+
+
+# --- Export en ligne de commande : `python data_export.py --grain daily --format csv.gz --years 2024 --output export.csv.gz` ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export en flux des données météo d'une sélection.")
+    parser.add_argument('--grain', choices=list(EXPORT_GRAINS), default='monthly', help="Granularité")
+    parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='csv', help="Format du fichier")
+    parser.add_argument('--cities', nargs='*', default=None, help="Villes (toutes par défaut)")
+    parser.add_argument('--years', nargs='+', type=int, required=True, help="Années")
+    parser.add_argument('--output', required=True, help="Fichier de destination")
+    args = parser.parse_args()
+
+    processed_path = os.path.join(os.environ.get('AIRFLOW_HOME', '.'), 'data', 'processed')
+    source = resolve_export_source(processed_path, args.grain)
+    if source is None:
+        raise SystemExit(f"Aucune donnée {args.grain} trouvée dans : {processed_path}")
+    schema, batches = iter_selection_batches(source, args.cities, args.years)
+    rows = write_export(schema, batches, args.output, args.format)
+    print(f"{rows} ligne(s) exportée(s) dans : {args.output}")
@@ -0,0 +1,267 @@
+import importlib.util
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from city_index import normalize_city_names
+from imputation import DEFAULT_FALLBACK_HIERARCHY, IMPUTED_COLUMNS, save_climatology
+from instrumentation import instrumented
+from schemas import NUMERIC_COLUMNS, UNIFIED_COLUMNS
+
+# --- Configuration du moteur d'exécution ---
+# WEATHER_BACKEND=pandas (par défaut) ou duckdb. DuckDB est une dépendance optionnelle :
+# s'il n'est pas installé, le moteur pandas est utilisé.
+BACKEND_ENV = 'WEATHER_BACKEND'
+DUCKDB_MEMORY_LIMIT_ENV = 'WEATHER_DUCKDB_MEMORY_LIMIT'  # ex. '4GB' ; au-delà, DuckDB déborde sur disque
+DUCKDB_THREADS_ENV = 'WEATHER_DUCKDB_THREADS'
+AVAILABLE_BACKENDS = ('pandas', 'duckdb')
+DEFAULT_BACKEND = 'pandas'
+
+DUCKDB_SPILL_PATH = os.path.join(os.environ.get('AIRFLOW_HOME', '.'), 'data', 'cache', 'duckdb')
+
+# Tolérance relative de la comparaison des moteurs (ordre de sommation des flottants différent)
+EQUIVALENCE_RTOL = 1e-9
+
+
+def resolve_backend(backend: str = None) -> str:
+    """
+    Détermine le moteur d'exécution : argument explicite, sinon variable WEATHER_BACKEND, sinon pandas.
+    :param backend: 'pandas', 'duckdb' ou None.
+    :return: Nom du moteur effectivement utilisable.
+    """
+    backend = (backend or os.environ.get(BACKEND_ENV) or DEFAULT_BACKEND).lower()
+    if backend not in AVAILABLE_BACKENDS:
+        raise ValueError(f"Moteur d'exécution inconnu : {backend} (attendu : {AVAILABLE_BACKENDS})")
+    if backend == 'duckdb' and importlib.util.find_spec('duckdb') is None:
+        print("AVERTISSEMENT : DuckDB n'est pas installé (pip install duckdb), utilisation du moteur pandas.")
+        return 'pandas'
+    return backend
+
+
+def duckdb_connect(memory_limit: str = None, threads: int = None, spill_path: str = DUCKDB_SPILL_PATH):
+    """
+    Ouvre une connexion DuckDB en mémoire, multithreadée, qui déborde sur disque au-delà de la limite mémoire.
+    :param memory_limit: Limite mémoire (ex. '4GB'), par défaut WEATHER_DUCKDB_MEMORY_LIMIT ou celle de DuckDB.
+    :param threads: Nombre de threads, par défaut WEATHER_DUCKDB_THREADS ou tous les cœurs.
+    :param spill_path: Dossier des fichiers temporaires de débordement.
+    :return: Connexion DuckDB.
+    """
+    import duckdb
+
+    os.makedirs(spill_path, exist_ok=True)
+    con = duckdb.connect(database=':memory:')
+    con.execute(f"SET temp_directory = '{spill_path}'")
+    con.execute(f"SET threads = {int(threads or os.environ.get(DUCKDB_THREADS_ENV) or os.cpu_count() or 1)}")
+    memory_limit = memory_limit or os.environ.get(DUCKDB_MEMORY_LIMIT_ENV)
+    if memory_limit:
+        con.execute(f"SET memory_limit = '{memory_limit}'")
+    return con
+
+
+def _register(con, name: str, df: pd.DataFrame):
+    """
+    Expose un DataFrame à DuckDB via Arrow (les NaN des colonnes numériques deviennent des NULL).
+    """
+    con.register(name, pa.Table.from_pandas(df, preserve_index=False))
+
+
+def _level_name(keys: tuple) -> str:
+    return '_'.join(keys) if keys else 'global'
+
+
+# --- Transformation (équivalent de transform_data._unify_sources sur un DataFrame projeté) ---
+
+@instrumented('transform.duckdb')
+def unify_with_duckdb(df_projected: pd.DataFrame, climatology_path: str,
+                      imputation_hierarchy: list = None, con=None) -> pd.DataFrame:
+    """
+    Enrichissement, nettoyage, imputation par climatologie et indicateurs exécutés en SQL par DuckDB.
+    Produit le même résultat que le moteur pandas (mêmes lignes, même ordre, même index, mêmes types) ;
+    les tables de climatologie sont calculées par DuckDB et sauvegardées au même format.
+    :param df_projected: DataFrame issu de schemas.project_sources.
+    :param climatology_path: Dossier où sauvegarder les tables de climatologie.
+    :param imputation_hierarchy: Hiérarchie de repli (par défaut DEFAULT_FALLBACK_HIERARCHY).
+    :param con: Connexion DuckDB à réutiliser (sinon duckdb_connect()).
+    :return: DataFrame unifié et nettoyé.
+    """
+    hierarchy = imputation_hierarchy if imputation_hierarchy is not None else DEFAULT_FALLBACK_HIERARCHY
+    con = con or duckdb_connect()
+    imputed = [col for col in IMPUTED_COLUMNS if col in df_projected.columns]
+    zero_filled = [col for col in NUMERIC_COLUMNS if col not in imputed]
+
+    # Clé de ville normalisée calculée comme dans CityIndex (valeurs distinctes uniquement)
+    codes, uniques = pd.factorize(df_projected['city'])
+    name_keys = np.append(normalize_city_names(uniques).to_numpy(), None)[codes]
+    _register(con, 'projected', df_projected.assign(_row=df_projected.index.to_numpy(), name_key=name_keys))
+
+    # Référence d'enrichissement : première ligne JSON de chaque ville (même règle que CityIndex)
+    con.execute("""
+        CREATE OR REPLACE TEMP TABLE city_reference AS
+        SELECT name_key, country, latitude, longitude FROM (
+            SELECT name_key, country, latitude, longitude,
+                   row_number() OVER (PARTITION BY name_key ORDER BY _row) AS rank
+            FROM projected WHERE source = 'json_initial' AND name_key IS NOT NULL
+        ) WHERE rank = 1
+    """)
+    value_columns = ', '.join(f"p.{col}" for col in UNIFIED_COLUMNS if col not in ('city', 'date', 'source',
+                                                                                    'country', 'latitude', 'longitude'))
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE enriched AS
+        SELECT p._row, p.city, p.date, p.source,
+               coalesce(p.country, r.country) AS country,
+               coalesce(p.latitude, r.latitude) AS latitude,
+               coalesce(p.longitude, r.longitude) AS longitude,
+               {value_columns},
+               CAST(month(p.date) AS INTEGER) AS month
+        FROM projected p LEFT JOIN city_reference r ON p.name_key = r.name_key
+        WHERE p.city IS NOT NULL AND p.date IS NOT NULL
+    """)
+
+    # Tables de climatologie (médianes par niveau de la hiérarchie)
+    medians = ', '.join(f"median({col}) AS {col}" for col in imputed)
+    tables = {}
+    joins = []
+    for level, keys in enumerate(hierarchy):
+        name = _level_name(keys)
+        if keys:
+            key_list = ', '.join(keys)
+            not_null = ' AND '.join(f"{key} IS NOT NULL" for key in keys)
+            con.execute(f"CREATE OR REPLACE TEMP TABLE clim_{level} AS "
+                        f"SELECT {key_list}, {medians} FROM enriched WHERE {not_null} GROUP BY {key_list}")
+            joins.append(f"LEFT JOIN clim_{level} c{level} ON " +
+                         ' AND '.join(f"e.{key} = c{level}.{key}" for key in keys))
+        else:
+            con.execute(f"CREATE OR REPLACE TEMP TABLE clim_{level} AS SELECT {medians} FROM enriched")
+            joins.append(f"CROSS JOIN clim_{level} c{level}")
+        table = con.execute(f"SELECT * FROM clim_{level} ORDER BY ALL").df()
+        if 'month' in table.columns:
+            table['month'] = table['month'].astype('int32')
+        tables[name] = table.set_index(list(keys)) if keys else table
+    save_climatology(tables, climatology_path, hierarchy)
+    print(f"Tables de climatologie recalculées (DuckDB) et sauvegardées dans : {climatology_path}")
+
+    # Imputation : première valeur non nulle en descendant la hiérarchie, puis 0 comme le moteur pandas
+    select = []
+    for col in UNIFIED_COLUMNS:
+        if col in imputed:
+            fallbacks = ', '.join(f"c{level}.{col}" for level in range(len(hierarchy)))
+            select.append(f"coalesce(e.{col}, {fallbacks}, 0) AS {col}")
+        elif col in zero_filled:
+            select.append(f"coalesce(e.{col}, 0) AS {col}")
+        elif col in ('country', 'weather_condition'):
+            select.append(f"coalesce(e.{col}, 'unknown') AS {col}")
+        else:
+            select.append(f"e.{col}")
+    df = con.execute(f"""
+        SELECT e._row, {', '.join(select)},
+               CAST(coalesce(e.precipitation_mm, 0) > 0.1 AS BIGINT) AS is_rainy_day
+        FROM enriched e {' '.join(joins)}
+        ORDER BY e._row
+    """).df()
+
+    df = df.set_index('_row')
+    df.index.name = None
+    df['date'] = df['date'].astype('datetime64[ns]')
+    for col in ['weather_condition', 'city', 'country', 'source']:
+        df[col] = df[col].astype(str)
+    for col in NUMERIC_COLUMNS:
+        df[col] = df[col].astype('float64')
+    df['is_rainy_day'] = df['is_rainy_day'].astype(int)
+    return df
+
+
+# --- Modélisation (équivalent de data_modeling.compute_monthly_partials) ---
+
+@instrumented('aggregate.duckdb_monthly_partials')
+def monthly_partials_with_duckdb(source, con=None) -> pd.DataFrame:
+    """
+    Calcule les agrégats partiels mensuels (mêmes colonnes que data_modeling.compute_monthly_partials)
+    avec DuckDB, directement sur un DataFrame ou sur des fichiers Parquet (lus en flux, hors mémoire).
+    :param source: DataFrame unifié, fichier Parquet, ou dossier du dataset partitionné (date=/source=).
+    :param con: Connexion DuckDB à réutiliser (sinon duckdb_connect()).
+    :return: Agrégats partiels par (ville, pays, latitude, longitude, année, mois), triés par clés.
+    """
+    con = con or duckdb_connect()
+    if isinstance(source, pd.DataFrame):
+        _register(con, 'unified', source)
+        relation = 'unified'
+    elif os.path.isdir(source):
+        relation = f"read_parquet('{os.path.join(source, '**', '*.parquet')}', hive_partitioning = true)"
+    else:
+        relation = f"read_parquet('{source}')"
+
+    # Sommes compensées (Kahan), comme les sommes groupées de pandas
+    return con.execute(f"""
+        WITH rows AS (
+            SELECT city, country, latitude, longitude, CAST(date AS TIMESTAMP) AS date,
+                   temp_celsius, precipitation_mm, is_rainy_day, wind_kph, humidity_percent
+            FROM {relation}
+        )
+        SELECT city, country, latitude, longitude,
+               CAST(year(date) AS INTEGER) AS year, CAST(month(date) AS INTEGER) AS month,
+               coalesce(fsum(temp_celsius), 0) AS temp_sum,
+               count(temp_celsius) AS temp_count,
+               coalesce(fsum(precipitation_mm), 0) AS precipitation_sum,
+               coalesce(sum(is_rainy_day), 0)::BIGINT AS rainy_days_sum,
+               max(wind_kph) AS wind_max,
+               coalesce(fsum(humidity_percent), 0) AS humidity_sum,
+               count(humidity_percent) AS humidity_count
+        FROM rows
+        WHERE date IS NOT NULL AND city IS NOT NULL AND country IS NOT NULL
+          AND latitude IS NOT NULL AND longitude IS NOT NULL
+        GROUP BY ALL
+        ORDER BY city, country, latitude, longitude, year, month
+    """).df()
+
+
+# --- Vérification d'équivalence des moteurs ---
+
+def compare_backends(df_json: pd.DataFrame, df_openweather: pd.DataFrame, df_historical: pd.DataFrame,
+                     rtol: float = EQUIVALENCE_RTOL) -> dict:
+    """
+    Exécute la transformation et le résumé mensuel avec les deux moteurs et compare les résultats
+    (valeurs exactes pour les clés et les textes, tolérance relative `rtol` pour les flottants).
+    :return: Dictionnaire {'transform': bool, 'monthly_summary': bool, 'errors': [...]},
+             ou None si DuckDB n'est pas installé (aucune comparaison possible).
+    """
+    from transform_data import clean_and_transform_data
+    from data_modeling import create_monthly_weather_summary
+
+    # Sans DuckDB, les deux exécutions passeraient par pandas et seraient trivialement identiques
+    if resolve_backend('duckdb') != 'duckdb':
+        return None
+
+    report = {'errors': []}
+    results = {}
+    for backend in AVAILABLE_BACKENDS:
+        df_transformed = clean_and_transform_data(df_json, df_openweather, df_historical, backend=backend)
+        df_monthly = create_monthly_weather_summary(df_transformed.copy(), backend=backend)
+        results[backend] = (df_transformed, df_monthly)
+
+    for position, name in enumerate(['transform', 'monthly_summary']):
+        try:
+            pd.testing.assert_frame_equal(results['pandas'][position], results['duckdb'][position],
+                                          check_exact=False, rtol=rtol)
+            report[name] = True
+        except AssertionError as e:
+            report[name] = False
+            report['errors'].append(f"{name} : {e}")
+    return report
+
+
+# --- Vérification locale : `python backends.py` (données de data/raw) ---
+if __name__ == "__main__":
+    from extract_data import extract_historical_data, extract_json_data
+
+    print("--- Comparaison des moteurs pandas et DuckDB ---")
+    equivalence = compare_backends(extract_json_data("all_capitals_weather.json"), pd.DataFrame(),
+                                   extract_historical_data("historical_test.csv"))
+    if equivalence is None:
+        raise SystemExit(1)
+    print(f"\nTransformation identique : {equivalence['transform']}")
+    print(f"Résumé mensuel identique : {equivalence['monthly_summary']}")
+    for error in equivalence['errors']:
+        print(error)
+    raise SystemExit(0 if not equivalence['errors'] else 1)
@@ -0,0 +1,164 @@
+import argparse
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from city_index import CityIndex
+from extract_data import extract_historical_data, extract_json_data
+from imputation import DEFAULT_FALLBACK_HIERARCHY, build_climatology, load_climatology, save_climatology
+from transform_data import (
+    CLIMATOLOGY_PATH,
+    TRANSFORMED_DATASET_PATH,
+    _load_dataset_state,
+    _project_sources,
+    _save_dataset_state,
+    _slice_fingerprints,
+    _unify_sources,
+    write_partitions,
+)
+from data_modeling import MONTHLY_PARTIALS_PATH, save_modeled_data, update_monthly_summary_incremental
+from pipeline import HISTORICAL_SOURCE_FILE, JSON_SOURCE_FILE
+from instrumentation import set_run_id
+
+DEFAULT_BACKFILL_WORKERS = os.cpu_count() or 1
+# Sources re-dérivées par un rattrapage (les observations OpenWeather d'un jour passé ne peuvent pas être réextraites)
+BACKFILL_SOURCES = ['json_initial', 'historical_csv']
+
+
+def _clear_day_partitions(day: str, dataset_path: str, sources: list = BACKFILL_SOURCES):
+    """
+    Supprime les partitions d'un jour pour les sources re-dérivées, pour que leur réécriture remplace
+    entièrement l'état précédent. Les partitions des autres sources (openweather_api) sont conservées.
+    """
+    day_dir = os.path.join(dataset_path, f"date={day}")
+    for source in sources:
+        source_dir = os.path.join(day_dir, f"source={source}")
+        if os.path.isdir(source_dir):
+            shutil.rmtree(source_dir)
+    if os.path.isdir(day_dir) and not os.listdir(day_dir):
+        os.rmdir(day_dir)
+
+
+def process_day(day: str, df_day: pd.DataFrame, df_city_reference: pd.DataFrame, climatology: tuple,
+                dataset_path: str = TRANSFORMED_DATASET_PATH) -> list:
+    """
+    Transforme et écrit un jour du dataset partitionné (exécuté dans un processus du pool).
+    Le traitement est idempotent : les partitions du jour des sources re-dérivées (BACKFILL_SOURCES)
+    sont supprimées puis réécrites, quel que soit leur état précédent.
+    :param day: Jour traité ('AAAA-MM-JJ').
+    :param df_day: Lignes projetées du jour (toutes sources).
+    :param df_city_reference: Lignes de référence pour l'enrichissement (pays, coordonnées).
+    :param climatology: Tuple (tables, hiérarchie) utilisé pour l'imputation.
+    :param dataset_path: Dossier racine du dataset partitionné.
+    :return: Liste des clés de tranches écrites.
+    """
+    _clear_day_partitions(day, dataset_path)
+    if df_day.empty:
+        return []
+    df_transformed = _unify_sources(df_day.copy(), df_city_reference=df_city_reference, climatology=climatology)
+    if df_transformed.empty:
+        return []
+    return write_partitions(df_transformed, dataset_path)
+
+
+def backfill(start_date: str, end_date: str, workers: int = DEFAULT_BACKFILL_WORKERS,
+             dataset_path: str = TRANSFORMED_DATASET_PATH,
+             partials_path: str = MONTHLY_PARTIALS_PATH) -> pd.DataFrame:
+    """
+    Retraite une plage de dates : chaque jour est une partition indépendante, traitée en parallèle
+    par un pool de processus, puis seuls les agrégats mensuels des mois touchés sont réécrits.
+    Les sources locales (JSON des capitales, CSV historique) sont extraites et projetées une seule fois ;
+    l'API OpenWeather ne fournit que la météo actuelle et n'intervient donc pas dans un rattrapage.
+    :param start_date: Premier jour de la plage (inclus).
+    :param end_date: Dernier jour de la plage (inclus).
+    :param workers: Nombre de processus du pool.
+    :param dataset_path: Dossier racine du dataset partitionné.
+    :param partials_path: Dossier des agrégats partiels mensuels.
+    :return: Résumé mensuel complet après mise à jour.
+    """
+    days = pd.date_range(start_date, end_date, freq='D')
+    if days.empty:
+        raise ValueError(f"Plage de dates vide : {start_date} -> {end_date}")
+    set_run_id(f"backfill_{days[0]:%Y-%m-%d}_{days[-1]:%Y-%m-%d}")
+    print(f"\n--- Rattrapage du {days[0]:%Y-%m-%d} au {days[-1]:%Y-%m-%d} ({len(days)} jours, {workers} processus) ---")
+
+    df_projected = _project_sources(
+        extract_json_data(JSON_SOURCE_FILE),
+        pd.DataFrame(),
+        extract_historical_data(HISTORICAL_SOURCE_FILE),
+    )
+    if df_projected.empty:
+        print("Aucune donnée source, rattrapage interrompu.")
+        return pd.DataFrame()
+
+    # Référence d'enrichissement réduite à la première ligne de chaque ville (même résultat que la référence complète)
+    df_city_reference = df_projected[df_projected['source'] == 'json_initial'].drop_duplicates(subset=['city'])
+
+    # Tables de climatologie figées pour tout le rattrapage (calculées ici si elles n'existent pas encore),
+    # sur les lignes enrichies comme dans transform_data (pays et coordonnées complétés, sans ville/date manquante)
+    climatology = load_climatology(CLIMATOLOGY_PATH)
+    if climatology[0] is None:
+        df_enriched = df_projected.copy()
+        CityIndex.from_frame(df_city_reference, name_col='city').fill_missing(df_enriched, name_col='city')
+        tables = build_climatology(df_enriched.dropna(subset=['city', 'date']))
+        save_climatology(tables, CLIMATOLOGY_PATH, DEFAULT_FALLBACK_HIERARCHY)
+        climatology = (tables, DEFAULT_FALLBACK_HIERARCHY)
+
+    df_range = df_projected[df_projected['date'].between(days[0], days[-1])]
+    day_keys = df_range['date'].dt.strftime('%Y-%m-%d')
+    frames_by_day = {day: df_day for day, df_day in df_range.groupby(day_keys.to_numpy(), sort=True)}
+    day_names = [day.strftime('%Y-%m-%d') for day in days]
+
+    os.makedirs(dataset_path, exist_ok=True)
+    written = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(process_day, day, frames_by_day.get(day, df_range.iloc[0:0]),
+                            df_city_reference, climatology, dataset_path)
+            for day in day_names
+        ]
+        for future in futures:
+            written.extend(future.result())
+    print(f"{len(written)} partition(s) réécrite(s) pour {len(day_names)} jour(s).")
+
+    # État du dataset : les tranches re-dérivées de la plage sont remplacées par celles qui viennent d'être écrites,
+    # celles des autres sources sont conservées
+    state = _load_dataset_state(dataset_path)
+    day_set = set(day_names)
+    state = {key: fp for key, fp in state.items()
+             if not (key.split('|', 1)[0] in BACKFILL_SOURCES and key.split('|', 1)[1] in day_set)}
+    fingerprints = _slice_fingerprints(df_range)
+    state.update({key: fingerprints[key] for key in written})
+    _save_dataset_state(dataset_path, state)
+
+    # Seuls les mois de la plage sont recalculés et réécrits dans les agrégats partiels
+    periods = {day[:7] for day in day_names}
+    return update_monthly_summary_incremental(dataset_path, partials_path, force_periods=periods)
+
+
+def run_backfill(start_date: str, end_date: str, workers: int = DEFAULT_BACKFILL_WORKERS) -> int:
+    """
+    Rattrapage complet (dataset partitionné et résumé mensuel sauvegardé), appelé par le DAG de rattrapage.
+    :param start_date: Premier jour de la plage (inclus).
+    :param end_date: Dernier jour de la plage (inclus).
+    :param workers: Nombre de processus du pool.
+    :return: Nombre de lignes du résumé mensuel sauvegardé.
+    """
+    df_monthly_summary = backfill(start_date, end_date, workers=int(workers))
+    if not df_monthly_summary.empty:
+        save_modeled_data(df_monthly_summary)
+    return len(df_monthly_summary)
+
+
+# --- Exécution en ligne de commande : `python backfill.py --start 2024-01-01 --end 2024-03-31 --workers 4` ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rattrapage du pipeline météo sur une plage de dates.")
+    parser.add_argument('--start', required=True, help="Premier jour (AAAA-MM-JJ, inclus)")
+    parser.add_argument('--end', required=True, help="Dernier jour (AAAA-MM-JJ, inclus)")
+    parser.add_argument('--workers', type=int, default=DEFAULT_BACKFILL_WORKERS, help="Nombre de processus")
+    args = parser.parse_args()
+
+    run_backfill(args.start, args.end, workers=args.workers)
+    print("\n--- Fin du rattrapage ---")
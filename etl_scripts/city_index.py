@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+
+from parquet_writer import write_parquet
+
+# Colonnes de l'index : nom normalisé -> coordonnées et pays
+INDEX_COLUMNS = ['name_key', 'city', 'latitude', 'longitude', 'country']
+# Colonnes complétées par l'enrichissement (colonne du DataFrame -> colonne de l'index)
+ENRICHED_COLUMNS = {'country': 'country', 'latitude': 'latitude', 'longitude': 'longitude'}
+
+
+def normalize_city_names(names) -> pd.Series:
+    """
+    Normalise des noms de villes pour la recherche (insensible à la casse et aux espaces superflus).
+    :param names: Série ou liste de noms.
+    :return: Série de chaînes normalisées.
+    """
+    return pd.Series(names, dtype='object').astype(str).str.strip().str.lower()
+
+
+class CityIndex:
+    """
+    Index des villes : nom normalisé -> (latitude, longitude, pays).
+    Construit une seule fois à partir d'un DataFrame source, il peut être sauvegardé sur disque
+    et répond aux recherches par lot avec une seule jointure vectorisée.
+    En cas d'homonymes, la première occurrence dans l'ordre de la source est retenue
+    (même règle que l'ancienne recherche ville par ville).
+    """
+
+    def __init__(self, table: pd.DataFrame):
+        """
+        :param table: DataFrame aux colonnes INDEX_COLUMNS, une ligne par nom normalisé.
+        """
+        self.table = table.set_index('name_key')
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, name_col: str = 'location_name', lat_col: str = 'latitude',
+                   lon_col: str = 'longitude', country_col: str = 'country') -> 'CityIndex':
+        """
+        Construit l'index à partir d'un DataFrame (ex. données JSON brutes ou transformées).
+        :param df: DataFrame source.
+        :param name_col: Colonne du nom de ville.
+        :param lat_col: Colonne de latitude.
+        :param lon_col: Colonne de longitude.
+        :param country_col: Colonne du pays (optionnelle dans la source).
+        :return: Instance de CityIndex.
+        """
+        if df.empty or name_col not in df.columns:
+            return cls(pd.DataFrame(columns=INDEX_COLUMNS))
+
+        table = pd.DataFrame({
+            'name_key': normalize_city_names(df[name_col]).to_numpy(),
+            'city': df[name_col].astype(str).str.strip().to_numpy(),
+            'latitude': pd.to_numeric(df[lat_col], errors='coerce').to_numpy() if lat_col in df.columns else float('nan'),
+            'longitude': pd.to_numeric(df[lon_col], errors='coerce').to_numpy() if lon_col in df.columns else float('nan'),
+            'country': df[country_col].astype(object).to_numpy() if country_col in df.columns else None,
+        })
+        # Résolution déterministe des doublons : première occurrence dans l'ordre de la source
+        table = table.drop_duplicates(subset=['name_key'], keep='first')
+        return cls(table[INDEX_COLUMNS].reset_index(drop=True))
+
+    @classmethod
+    def load(cls, path: str) -> 'CityIndex':
+        """
+        Charge un index sauvegardé au format Parquet.
+        :param path: Chemin du fichier Parquet.
+        :return: Instance de CityIndex.
+        """
+        return cls(pd.read_parquet(path))
+
+    def save(self, path: str, source_fingerprint: str = None):
+        """
+        Sauvegarde l'index au format Parquet, avec son manifeste.
+        :param path: Chemin du fichier Parquet de destination.
+        :param source_fingerprint: Empreinte de la source de l'index, conservée dans le manifeste
+            (voir read_manifest) pour savoir si l'index sauvegardé est encore à jour.
+        """
+        write_parquet(self.table.reset_index(), path, sort_by=None,
+                      manifest_fields={'source_fingerprint': source_fingerprint})
+
+    def __len__(self):
+        return len(self.table)
+
+    def lookup(self, names) -> pd.DataFrame:
+        """
+        Recherche un lot de noms en une seule jointure.
+        :param names: Liste ou série de noms de villes.
+        :return: DataFrame aligné sur `names` avec les colonnes query, city, latitude, longitude, country, found.
+        """
+        queries = pd.Series(names, dtype='object')
+        # Normalisation des seules valeurs distinctes, puis report sur toutes les lignes via les codes
+        codes, uniques = pd.factorize(queries)
+        # Une dernière clé vide reçoit les noms manquants (code -1 de factorize)
+        keys = np.append(normalize_city_names(uniques).to_numpy(), None)
+        result = self.table.reindex(keys).iloc[codes].reset_index(drop=True)
+        result.insert(0, 'query', queries.to_numpy())
+        result['found'] = result['city'].notna().to_numpy()
+        return result
+
+    def fill_missing(self, df: pd.DataFrame, name_col: str = 'city', columns: dict = None) -> dict:
+        """
+        Complète sur place les valeurs manquantes de `df` (pays, coordonnées) à partir de l'index.
+        Seuls les noms distincts sont recherchés ; les valeurs trouvées sont ensuite reportées par code
+        de ville sur les seules lignes manquantes, sans fusion ni copie du DataFrame.
+        :param df: DataFrame à compléter.
+        :param name_col: Colonne du nom de ville.
+        :param columns: {colonne de df: colonne de l'index} (par défaut ENRICHED_COLUMNS).
+        :return: Dictionnaire {colonne: nombre de valeurs complétées}.
+        """
+        columns = columns or ENRICHED_COLUMNS
+        codes, uniques = pd.factorize(df[name_col])
+        filled = {col: 0 for col in columns}
+        if not len(uniques):
+            return filled
+        matches = self.lookup(uniques)
+
+        for col, index_col in columns.items():
+            missing = df[col].isna().to_numpy() & (codes >= 0)
+            if not missing.any():
+                continue
+            positions = np.flatnonzero(missing)
+            fill_values = matches[index_col].to_numpy()[codes[positions]]
+            found = pd.notna(fill_values)
+            if not found.any():
+                continue
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                new_categories = pd.Index(pd.unique(fill_values[found])).difference(df[col].cat.categories)
+                if len(new_categories):
+                    df[col] = df[col].cat.add_categories(new_categories)
+            df.iloc[positions[found], df.columns.get_loc(col)] = fill_values[found]
+            filled[col] = int(found.sum())
+        return filled
+
+    def coords_for(self, names) -> tuple:
+        """
+        Retourne les coordonnées des villes trouvées au format attendu par l'extracteur OpenWeather,
+        ainsi que la liste des noms introuvables.
+        :param names: Liste de noms de villes.
+        :return: Tuple ({nom: {'lat': lat, 'lon': lon}}, [noms non trouvés]).
+        """
+        result = self.lookup(names)
+        result['found'] &= result['latitude'].notna() & result['longitude'].notna()
+        found = result[result['found']]
+        city_coords = {
+            query: {'lat': float(lat), 'lon': float(lon)}
+            for query, lat, lon in zip(found['query'], found['latitude'], found['longitude'])
+        }
+        unmatched = result.loc[~result['found'], 'query'].tolist()
+        return city_coords, unmatched
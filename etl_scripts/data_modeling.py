@@ -1,5 +1,13 @@
 import pandas as pd
+import numpy as np
+import json
 import os
+import sys
+
+from backends import monthly_partials_with_duckdb, resolve_backend
+from instrumentation import instrumented, preview
+from parquet_writer import write_parquet
+from transform_data import DATASET_STATE_FILENAME, TRANSFORMED_DATASET_PATH, read_transformed_dataset
 
 # --- Configuration des chemins ---
 AIRFLOW_HOME = os.environ.get('AIRFLOW_HOME')
@@ -7,7 +15,33 @@ if not AIRFLOW_HOME:
     raise EnvironmentError("La variable d'environnement AIRFLOW_HOME n'est pas définie.")
 
 PROCESSED_DATA_PATH = os.path.join(AIRFLOW_HOME, 'data', 'processed')
+MONTHLY_PARTIALS_PATH = os.path.join(PROCESSED_DATA_PATH, 'monthly_partials')
+MODELING_STATE_FILENAME = '_folded_slices.json'
+# Empreinte par année ajoutée au manifeste du fichier modélisé (lue par le tableau de bord)
+MANIFEST_PARTITION_COLUMN = 'year'
+MODELED_SORT_COLUMNS = ['city', 'year', 'month']
+
+# Clés du résumé mensuel et règles de fusion des agrégats partiels
+MONTHLY_GROUP_KEYS = ['city', 'country', 'latitude', 'longitude', 'year', 'month']
+PARTIALS_MERGE_AGG = {
+    'temp_sum': 'sum',
+    'temp_count': 'sum',
+    'precipitation_sum': 'sum',
+    'rainy_days_sum': 'sum',
+    'wind_max': 'max',
+    'humidity_sum': 'sum',
+    'humidity_count': 'sum',
+}
+
+# Dimension calendrier (noms de mois anglais, comme strftime('%B') précédemment ;
+# saisons météorologiques de l'hémisphère nord)
+MONTH_NAMES = np.array(['January', 'February', 'March', 'April', 'May', 'June',
+                        'July', 'August', 'September', 'October', 'November', 'December'])
+SEASONS_BY_MONTH = np.array(['Winter', 'Winter', 'Spring', 'Spring', 'Spring', 'Summer',
+                             'Summer', 'Summer', 'Autumn', 'Autumn', 'Autumn', 'Winter'])
+CALENDAR_ATTRIBUTES = ['month_name', 'month_start', 'quarter', 'season']
 
+@instrumented('load.transformed')
 def load_transformed_data(filename: str = "transformed_weather_data.parquet") -> pd.DataFrame:
     """
     Charge le DataFrame des données météorologiques transformées.
@@ -28,10 +62,127 @@ def load_transformed_data(filename: str = "transformed_weather_data.parquet") ->
         print(f"Erreur lors du chargement du fichier Parquet : {e}")
         return pd.DataFrame()
 
-def create_monthly_weather_summary(df: pd.DataFrame) -> pd.DataFrame:
+def build_calendar_dimension(years) -> pd.DataFrame:
+    """
+    Construit la dimension calendrier mensuelle pour les années données, sans traitement ligne par ligne.
+    :param years: Années à couvrir (itérable d'entiers).
+    :return: DataFrame (year, month, month_name, month_start, quarter, season), une ligne par mois.
+    """
+    years = sorted({int(year) for year in years})
+    if not years:
+        return pd.DataFrame(columns=['year', 'month'] + CALENDAR_ATTRIBUTES)
+    month_start = pd.date_range(f"{years[0]}-01-01", f"{years[-1]}-12-01", freq='MS')
+    month_start = month_start[month_start.year.isin(years)]
+    month = month_start.month.to_numpy()
+    return pd.DataFrame({
+        'year': month_start.year.to_numpy(dtype='int32'),
+        'month': month.astype('int32'),
+        'month_name': MONTH_NAMES[month - 1],
+        'month_start': month_start,
+        'quarter': month_start.quarter.to_numpy(dtype='int8'),
+        'season': SEASONS_BY_MONTH[month - 1],
+    })
+
+
+def add_calendar_attributes(monthly_summary: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ajoute les attributs de la dimension calendrier au résumé mensuel par une jointure sur (year, month).
+    :param monthly_summary: DataFrame avec les colonnes 'year' et 'month'.
+    :return: DataFrame enrichi de month_name, month_start, quarter et season.
+    """
+    calendar = build_calendar_dimension(monthly_summary['year'].unique())
+    monthly_summary = monthly_summary.drop(columns=CALENDAR_ATTRIBUTES, errors='ignore')
+    monthly_summary['year'] = monthly_summary['year'].astype('int32')
+    monthly_summary['month'] = monthly_summary['month'].astype('int32')
+    return monthly_summary.merge(calendar, on=['year', 'month'], how='left', validate='many_to_one')
+
+
+def partial_measures(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Colonnes d'agrégats partiels ligne à ligne (à sommer ou maximiser selon PARTIALS_MERGE_AGG).
+    :param df: DataFrame des données météorologiques unifiées.
+    :return: DataFrame des mesures partielles, aligné sur `df`.
+    """
+    return pd.DataFrame({
+        'temp_sum': df['temp_celsius'],
+        'temp_count': df['temp_celsius'].notna(),
+        'precipitation_sum': df['precipitation_mm'],
+        'rainy_days_sum': df['is_rainy_day'],
+        'wind_max': df['wind_kph'],
+        'humidity_sum': df['humidity_percent'],
+        'humidity_count': df['humidity_percent'].notna(),
+    }, index=df.index)
+
+
+def compute_monthly_partials(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Calcule les agrégats partiels fusionnables (sommes, effectifs, maximum) par ville et par mois.
+    :param df: DataFrame des données météorologiques unifiées (quotidiennes).
+    :return: DataFrame des agrégats partiels, une ligne par (ville, mois).
+    """
+    df = df.dropna(subset=['date'])
+    keys = pd.DataFrame({
+        'city': df['city'],
+        'country': df['country'],
+        'latitude': df['latitude'],
+        'longitude': df['longitude'],
+        'year': df['date'].dt.year,
+        'month': df['date'].dt.month,
+    })
+    partials = pd.concat([keys, partial_measures(df)], axis=1).groupby(MONTHLY_GROUP_KEYS, observed=True).agg(PARTIALS_MERGE_AGG)
+    return partials.reset_index()
+
+
+def merge_monthly_partials(*partials: pd.DataFrame, group_keys: list = None) -> pd.DataFrame:
+    """
+    Fusionne plusieurs jeux d'agrégats partiels (sommes et effectifs additionnés, maximum conservé).
+    :param partials: DataFrames issus de compute_monthly_partials.
+    :param group_keys: Clés de regroupement (par défaut MONTHLY_GROUP_KEYS).
+    :return: Agrégats partiels fusionnés.
+    """
+    group_keys = group_keys or MONTHLY_GROUP_KEYS
+    frames = [p for p in partials if p is not None and not p.empty]
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+    merged = pd.concat(frames, ignore_index=True)
+    return merged.groupby(group_keys, observed=True).agg(PARTIALS_MERGE_AGG).reset_index()
+
+
+def finalize_measures(partials: pd.DataFrame) -> pd.DataFrame:
+    """
+    Dérive les mesures finales (avg_*, total_*, num_*, max_*) d'agrégats partiels, quel que soit le grain.
+    :param partials: Agrégats partiels (colonnes de PARTIALS_MERGE_AGG).
+    :return: DataFrame des mesures, aligné sur `partials`.
+    """
+    return pd.DataFrame({
+        'avg_temp_celsius': partials['temp_sum'] / partials['temp_count'].where(partials['temp_count'] > 0),
+        'total_precipitation_mm': partials['precipitation_sum'],
+        'num_rainy_days': partials['rainy_days_sum'].astype('int64'),
+        'max_wind_kph': partials['wind_max'],
+        'avg_humidity_percent': partials['humidity_sum'] / partials['humidity_count'].where(partials['humidity_count'] > 0),
+    }, index=partials.index)
+
+
+def finalize_monthly_summary(partials: pd.DataFrame) -> pd.DataFrame:
+    """
+    Dérive le résumé mensuel (colonnes avg_*, total_*, num_*, max_*) des agrégats partiels.
+    :param partials: Agrégats partiels par ville et par mois.
+    :return: DataFrame agrégé par mois et par ville.
+    """
+    monthly_summary = pd.concat([partials[MONTHLY_GROUP_KEYS], finalize_measures(partials)], axis=1)
+
+    # Attributs calendaires (month_name, month_start, quarter, season) par jointure sur la dimension calendrier
+    return add_calendar_attributes(monthly_summary)
+
+
+@instrumented('aggregate.monthly_summary')
+def create_monthly_weather_summary(df: pd.DataFrame, backend: str = None) -> pd.DataFrame:
     """
     Crée un résumé mensuel des données météorologiques par ville.
     :param df: DataFrame des données météorologiques unifiées.
+    :param backend: Moteur de l'agrégation : 'pandas' ou 'duckdb' (par défaut WEATHER_BACKEND, sinon pandas).
     :return: DataFrame agrégé par mois et par ville.
     """
     if df.empty:
@@ -42,28 +193,150 @@ def create_monthly_weather_summary(df: pd.DataFrame) -> pd.DataFrame:
 
     # Assurez-vous que 'date' est bien un datetime et qu'il y a les colonnes nécessaires
     df['date'] = pd.to_datetime(df['date'], errors='coerce')
-    df.dropna(subset=['date'], inplace=True)
-
-    # Extraire l'année et le mois
-    df['year'] = df['date'].dt.year
-    df['month'] = df['date'].dt.month
-
-    # Agrégation mensuelle
-    monthly_summary = df.groupby(['city', 'country', 'latitude', 'longitude', 'year', 'month']).agg(
-        avg_temp_celsius=('temp_celsius', 'mean'),
-        total_precipitation_mm=('precipitation_mm', 'sum'),
-        num_rainy_days=('is_rainy_day', 'sum'), # is_rainy_day est 1 pour pluie, 0 sinon
-        max_wind_kph=('wind_kph', 'max'),
-        avg_humidity_percent=('humidity_percent', 'mean')
-    ).reset_index()
-
-    # Convertir 'month' en nom de mois pour une meilleure lisibilité
-    monthly_summary['month_name'] = monthly_summary['month'].apply(lambda x: pd.to_datetime(f'2000-{x}-01').strftime('%B'))
-    
+
+    # Agrégation mensuelle via les agrégats partiels (même calcul que le mode incrémental)
+    if resolve_backend(backend) == 'duckdb':
+        partials = monthly_partials_with_duckdb(df)
+    else:
+        partials = compute_monthly_partials(df)
+    monthly_summary = finalize_monthly_summary(partials)
+
     print(f"Résumé mensuel créé. Taille : {monthly_summary.shape}")
-    print("Aperçu du résumé mensuel :\n", monthly_summary.head())
+    preview(monthly_summary, "Aperçu du résumé mensuel")
     return monthly_summary
 
+
+# --- Mise à jour incrémentale du résumé mensuel ---
+
+def _period(slice_key: str) -> str:
+    """
+    Mois 'AAAA-MM' d'une clé de tranche 'source|AAAA-MM-JJ'.
+    """
+    return slice_key.split('|', 1)[1][:7]
+
+
+def _load_json(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def load_monthly_partials(partials_path: str = MONTHLY_PARTIALS_PATH) -> pd.DataFrame:
+    """
+    Charge les agrégats partiels sauvegardés (un fichier par mois).
+    :param partials_path: Dossier des agrégats partiels.
+    :return: DataFrame des agrégats partiels (vide s'il n'en existe pas).
+    """
+    if not os.path.isdir(partials_path) or not any(name.startswith('period=') for name in os.listdir(partials_path)):
+        return pd.DataFrame()
+    df = pd.read_parquet(partials_path)
+    return df.drop(columns=['period'], errors='ignore')
+
+
+def _write_month_partials(partials: pd.DataFrame, periods: set, partials_path: str):
+    """
+    Réécrit uniquement les fichiers des mois touchés (et supprime ceux devenus vides).
+    """
+    period_of_row = (partials['year'].astype(str) + '-' + partials['month'].astype(int).map('{:02d}'.format)
+                     if not partials.empty else pd.Series(dtype=str))
+    for period in sorted(periods):
+        partition_dir = os.path.join(partials_path, f"period={period}")
+        month_partials = partials[period_of_row == period] if not partials.empty else partials
+        if month_partials.empty:
+            if os.path.isdir(partition_dir):
+                for name in os.listdir(partition_dir):
+                    os.remove(os.path.join(partition_dir, name))
+                os.rmdir(partition_dir)
+            continue
+        write_parquet(month_partials, os.path.join(partition_dir, "part-0.parquet"),
+                      sort_by=MODELED_SORT_COLUMNS, manifest=False)
+
+
+@instrumented('aggregate.monthly_incremental')
+def update_monthly_summary_incremental(dataset_path: str = TRANSFORMED_DATASET_PATH,
+                                       partials_path: str = MONTHLY_PARTIALS_PATH,
+                                       force_periods: set = None) -> pd.DataFrame:
+    """
+    Met à jour le résumé mensuel à partir du dataset partitionné produit par transform_incremental.
+    Les tranches (source, date) nouvelles sont lues seules et ajoutées aux agrégats partiels ;
+    les mois contenant une tranche modifiée ou supprimée sont recalculés à partir de leurs seules partitions.
+    Seuls les fichiers d'agrégats partiels des mois touchés sont réécrits.
+    :param dataset_path: Dossier du dataset transformé partitionné.
+    :param partials_path: Dossier des agrégats partiels mensuels.
+    :param force_periods: Mois 'AAAA-MM' à recalculer même si leurs tranches n'ont pas changé (ex. rattrapage).
+    :return: Résumé mensuel complet, dérivé des agrégats partiels.
+    """
+    print("\nMise à jour incrémentale du résumé mensuel...")
+    dataset_state = _load_json(os.path.join(dataset_path, DATASET_STATE_FILENAME))
+    state_path = os.path.join(partials_path, MODELING_STATE_FILENAME)
+    folded_state = _load_json(state_path)
+
+    new_slices = [key for key in dataset_state if key not in folded_state]
+    changed_slices = [key for key, fp in folded_state.items()
+                      if key in dataset_state and dataset_state[key] != fp]
+    removed_slices = [key for key in folded_state if key not in dataset_state]
+
+    # Mois à recalculer entièrement (une tranche déjà agrégée a changé) et tranches à simplement ajouter
+    recompute_periods = {_period(key) for key in changed_slices + removed_slices} | set(force_periods or ())
+    fold_slices = [key for key in new_slices if _period(key) not in recompute_periods]
+    print(f"Tranches nouvelles : {len(new_slices)}, modifiées : {len(changed_slices)}, "
+          f"supprimées : {len(removed_slices)}. Mois recalculés : {sorted(recompute_periods)}")
+
+    partials = load_monthly_partials(partials_path)
+    if not partials.empty and recompute_periods:
+        period_of_row = partials['year'].astype(str) + '-' + partials['month'].astype(int).map('{:02d}'.format)
+        partials = partials[~period_of_row.isin(recompute_periods)]
+
+    def _read_slices(slice_keys: list) -> pd.DataFrame:
+        if not slice_keys:
+            return pd.DataFrame()
+        dates = sorted({key.split('|', 1)[1] for key in slice_keys})
+        df = read_transformed_dataset(dataset_path, dates=dates)
+        keys = df['source'] + '|' + df['date'].dt.strftime('%Y-%m-%d')
+        return df[keys.isin(set(slice_keys)).to_numpy()]
+
+    recompute_slices = [key for key in dataset_state if _period(key) in recompute_periods]
+    delta_frame = _read_slices(fold_slices + recompute_slices)
+    delta_partials = compute_monthly_partials(delta_frame) if not delta_frame.empty else pd.DataFrame()
+    partials = merge_monthly_partials(partials, delta_partials)
+
+    touched_periods = recompute_periods | {_period(key) for key in fold_slices}
+    if touched_periods:
+        os.makedirs(partials_path, exist_ok=True)
+        _write_month_partials(partials, touched_periods, partials_path)
+        tmp_path = state_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(dataset_state, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, state_path)
+    print(f"Mois réécrits : {len(touched_periods)}")
+
+    if partials.empty:
+        return pd.DataFrame()
+    monthly_summary = finalize_monthly_summary(partials)
+    print(f"Résumé mensuel mis à jour. Taille : {monthly_summary.shape}")
+    return monthly_summary
+
+
+def modeled_partition_fingerprints(df: pd.DataFrame) -> dict:
+    """
+    Empreinte du contenu de chaque année du résumé mensuel, ajoutée au manifeste du fichier modélisé :
+    le tableau de bord s'en sert pour ne recharger que les années dont le contenu a changé.
+    Même empreinte que les tranches du dataset partitionné : somme des hachages de lignes et nombre de lignes.
+    :param df: DataFrame sauvegardé.
+    :return: Champs du manifeste (colonne de partition et empreintes).
+    """
+    grouped = pd.DataFrame({
+        'partition': df[MANIFEST_PARTITION_COLUMN].to_numpy(),
+        'hash': pd.util.hash_pandas_object(df, index=False).to_numpy(),
+    }).groupby('partition')['hash'].agg(['sum', 'size'])
+    return {
+        'partition_column': MANIFEST_PARTITION_COLUMN,
+        'partitions': {str(key): f"{int(row['sum'])}:{int(row['size'])}" for key, row in grouped.iterrows()},
+    }
+
+
+@instrumented('save.modeled')
 def save_modeled_data(df: pd.DataFrame, filename: str = "modeled_weather_data.parquet"):
     """
     Sauvegarde le DataFrame de données modélisées dans un fichier Parquet.
@@ -76,7 +349,9 @@ def save_modeled_data(df: pd.DataFrame, filename: str = "modeled_weather_data.pa
 
     output_path = os.path.join(PROCESSED_DATA_PATH, filename)
     try:
-        df.to_parquet(output_path, index=False)
+        # Écriture atomique, triée par ville et période, avec manifeste (version, lignes, schéma, empreintes)
+        write_parquet(df, output_path, sort_by=MODELED_SORT_COLUMNS,
+                      manifest_fields=modeled_partition_fingerprints(df))
         print(f"\nDonnées modélisées sauvegardées avec succès dans : {output_path}")
     except Exception as e:
         print(f"Erreur lors de la sauvegarde du fichier Parquet modélisé : {e}")
@@ -84,6 +359,14 @@ def save_modeled_data(df: pd.DataFrame, filename: str = "modeled_weather_data.pa
 if __name__ == "__main__":
     print("--- Démarrage de l'étape de modélisation des données ---")
 
+    # Mode incrémental : `python data_modeling.py --incremental` (dataset partitionné de transform_data.py --incremental)
+    if '--incremental' in sys.argv:
+        df_monthly_summary = update_monthly_summary_incremental()
+        if not df_monthly_summary.empty:
+            save_modeled_data(df_monthly_summary)
+        print("\n--- Fin de l'étape de modélisation des données ---")
+        sys.exit(0)
+
     # 1. Charger les données transformées
     df_transformed = load_transformed_data()
 
@@ -96,6 +379,10 @@ if __name__ == "__main__":
             save_modeled_data(df_monthly_summary)
         else:
             print("Le DataFrame de résumé mensuel est vide, aucune donnée modélisée sauvegardée.")
+
+        # 4. Construire les marts multi-grains (jour/semaine/mois/année x ville/pays)
+        from rollups import build_rollup_cube, save_rollup_marts
+        save_rollup_marts(build_rollup_cube(df_transformed))
     else:
         print("Le DataFrame transformé est vide, l'étape de modélisation est ignorée.")
 
@@ -1,10 +1,26 @@
 from dotenv import load_dotenv
+import numpy as np
 import pandas as pd
+import hashlib
+import importlib.util
 import json
 import os
-import requests
 from datetime import datetime
 
+from openweather_client import (
+    DEFAULT_API_KEY_CALLS_PER_MINUTE,
+    DEFAULT_MAX_ATTEMPTS,
+    DEFAULT_MAX_WORKERS,
+    DEFAULT_RATE_LIMIT_PER_SECOND,
+    OPENWEATHER_BASE_URL,
+    RequestScheduler,
+)
+from response_cache import DEFAULT_TTL_SECONDS, ResponseCache
+from city_index import CityIndex
+from schemas import SOURCE_SCHEMAS, source_read_dtypes
+from instrumentation import instrumented, preview
+from parquet_writer import read_manifest, write_parquet
+
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'))
 
 AIRFLOW_HOME = os.environ.get('AIRFLOW_HOME')
@@ -14,6 +30,18 @@ if not AIRFLOW_HOME:
 
 RAW_DATA_PATH = os.path.join(AIRFLOW_HOME, 'data', 'raw')
 PROCESSED_DATA_PATH = os.path.join(AIRFLOW_HOME, 'data', 'processed')
+OPENWEATHER_CACHE_PATH = os.path.join(AIRFLOW_HOME, 'data', 'cache', 'openweather')
+CITY_INDEX_PATH = os.path.join(PROCESSED_DATA_PATH, 'city_index.parquet')
+
+# Colonnes lues dans all_capitals_weather.json (celles du registre de schémas) et leurs types de lecture
+JSON_COLUMN_DTYPES = source_read_dtypes('json_initial')
+DEFAULT_JSON_CHUNK_SIZE = 50_000       # Enregistrements par morceau lors de la lecture en flux
+JSON_READ_BUFFER_SIZE = 1024 * 1024    # Caractères lus à chaque accès disque
+
+# Schéma du CSV historique et dossier du cache Parquet associé
+HISTORICAL_COLUMN_DTYPES = source_read_dtypes('historical_csv')
+HISTORICAL_DATE_COLUMNS = SOURCE_SCHEMAS['historical_csv']['date_columns']
+HISTORICAL_CACHE_PATH = os.path.join(AIRFLOW_HOME, 'data', 'cache', 'historical')
 
 # Assurez-vous que les dossiers existent
 os.makedirs(RAW_DATA_PATH, exist_ok=True)
@@ -22,10 +50,153 @@ os.makedirs(PROCESSED_DATA_PATH, exist_ok=True)
 
 # --- Fonctions d'Extraction ---
 
-def extract_json_data(file_name: str = "all_capitals_weather.json") -> pd.DataFrame:
+def _iter_json_records(json_file_path: str, buffer_size: int = JSON_READ_BUFFER_SIZE):
+    """
+    Parcourt les enregistrements d'un fichier JSON sans le charger entièrement en mémoire.
+    Accepte un tableau d'objets (`[{...}, {...}]`) ou du JSON délimité par lignes (NDJSON).
+    :param json_file_path: Chemin du fichier JSON.
+    :param buffer_size: Nombre de caractères lus à chaque accès disque.
+    :return: Générateur de dictionnaires (un par enregistrement).
+    """
+    decoder = json.JSONDecoder()
+    with open(json_file_path, 'r', encoding='utf-8') as f:
+        buffer = f.read(buffer_size)
+        pos = 0
+        eof = not buffer
+        in_array = None
+
+        while True:
+            # Avance jusqu'au prochain élément (espaces et virgules séparant les objets)
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos >= len(buffer):
+                if eof:
+                    return
+                buffer = f.read(buffer_size)
+                pos = 0
+                eof = not buffer
+                continue
+
+            if in_array is None:
+                in_array = buffer[pos] == '['
+                if in_array:
+                    pos += 1
+                continue
+            if in_array and buffer[pos] == ']':
+                return
+
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # Objet coupé par la fin du tampon : on complète le tampon et on réessaie
+                chunk = f.read(buffer_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+
+            yield record
+            pos = end
+            if pos > buffer_size:
+                buffer = buffer[pos:]
+                pos = 0
+
+
+def _records_to_frame(records: list, columns: dict) -> pd.DataFrame:
+    """
+    Construit un DataFrame typé à partir d'une liste d'enregistrements déjà projetés.
+    :param records: Liste de dictionnaires contenant uniquement les colonnes demandées.
+    :param columns: Dictionnaire {colonne: dtype} à appliquer.
+    :return: DataFrame typé.
+    """
+    df = pd.DataFrame.from_records(records, columns=list(columns.keys()))
+    for col, dtype in columns.items():
+        if dtype == 'datetime64[ns]':
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+        elif dtype == 'category':
+            df[col] = df[col].astype('category')
+        else:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(dtype)
+    return df
+
+
+def _concat_chunks(chunks) -> pd.DataFrame:
+    """
+    Assemble des morceaux typés au fil de leur lecture, sans les garder tous en mémoire sous forme de DataFrames.
+    Les colonnes catégorielles sont recodées dans un dictionnaire de catégories commun au fur et à mesure
+    (seuls les codes entiers sont conservés), ce qui évite tout passage par le type object.
+    :param chunks: Itérable de DataFrames de mêmes colonnes (générateur de lecture par morceaux).
+    :return: DataFrame complet, ou DataFrame vide s'il n'y a aucun morceau.
+    """
+    columns, pieces, categories = None, {}, {}
+    for chunk in chunks:
+        if columns is None:
+            columns = list(chunk.columns)
+            categories = {col: {} for col in columns if isinstance(chunk[col].dtype, pd.CategoricalDtype)}
+            pieces = {col: [] for col in columns}
+        for col in columns:
+            if col not in categories:
+                pieces[col].append(chunk[col].reset_index(drop=True))
+                continue
+            mapping = categories[col]
+            for value in chunk[col].cat.categories:
+                mapping.setdefault(value, len(mapping))
+            # Le dernier élément recode -1 (valeur manquante) en -1
+            recode = np.append(np.array([mapping[value] for value in chunk[col].cat.categories], dtype=np.int32), -1)
+            pieces[col].append(recode[chunk[col].cat.codes.to_numpy()])
+    if columns is None:
+        return pd.DataFrame()
+
+    data = {}
+    for col in columns:
+        col_pieces = pieces.pop(col)
+        if col in categories:
+            codes = np.concatenate(col_pieces) if col_pieces else np.array([], dtype=np.int32)
+            data[col] = pd.Categorical.from_codes(codes, categories=list(categories[col]))
+        else:
+            data[col] = pd.concat(col_pieces, ignore_index=True)
+    return pd.DataFrame(data, columns=columns)
+
+
+def iter_json_chunks(file_name: str = "all_capitals_weather.json",
+                     chunk_size: int = DEFAULT_JSON_CHUNK_SIZE,
+                     columns: dict = None):
+    """
+    Lit le fichier JSON des capitales en flux et produit des DataFrames de taille fixe.
+    Seules les colonnes utiles à la transformation sont conservées, avec des types explicites
+    (textes en catégories) : la mémoire maximale dépend de `chunk_size` et non de la taille du fichier.
+    :param file_name: Nom du fichier JSON dans le dossier data/raw.
+    :param chunk_size: Nombre d'enregistrements par morceau.
+    :param columns: Dictionnaire {colonne: dtype} à lire (par défaut JSON_COLUMN_DTYPES).
+    :return: Générateur de DataFrames.
+    """
+    columns = columns or JSON_COLUMN_DTYPES
+    json_file_path = os.path.join(RAW_DATA_PATH, file_name)
+
+    records = []
+    for record in _iter_json_records(json_file_path):
+        if not isinstance(record, dict):
+            continue
+        records.append({col: record.get(col) for col in columns})
+        if len(records) >= chunk_size:
+            yield _records_to_frame(records, columns)
+            records = []
+    if records:
+        yield _records_to_frame(records, columns)
+
+
+@instrumented('extract.json_initial')
+def extract_json_data(file_name: str = "all_capitals_weather.json",
+                      chunk_size: int = DEFAULT_JSON_CHUNK_SIZE, compact: bool = False) -> pd.DataFrame:
     """
     Extrait les données météorologiques actuelles des capitales à partir d'un fichier JSON local.
+    Le fichier est lu en flux par morceaux (voir iter_json_chunks) et seules les colonnes utiles
+    sont conservées, avec des types explicites.
     :param file_name: Nom du fichier JSON dans le dossier data/raw.
+    :param chunk_size: Nombre d'enregistrements lus par morceau.
+    :param compact: Lit les mesures en float32 (mode compact) au lieu de float64.
     :return: DataFrame pandas des données JSON.
     """
     json_file_path = os.path.join(RAW_DATA_PATH, file_name)
@@ -37,73 +208,181 @@ def extract_json_data(file_name: str = "all_capitals_weather.json") -> pd.DataFr
         return pd.DataFrame()
 
     try:
-        df = pd.read_json(json_file_path)
+        columns = source_read_dtypes('json_initial', compact)
+        # Métadonnées relevées avant la lecture : une modification pendant la lecture sera vue à l'exécution suivante
+        source_file = _source_file_stat(json_file_path, columns)
+        df = _concat_chunks(iter_json_chunks(file_name, chunk_size=chunk_size, columns=columns))
+        df.attrs['source_file'] = source_file
         print(f"Fichier JSON '{file_name}' lu avec succès. Nombre de lignes initiales : {len(df)}")
         return df
     except Exception as e:
         print(f"Erreur lors de la lecture du JSON '{file_name}' : {e}")
-        print("Vérifiez le format du JSON ou la quantité de mémoire disponible si le fichier est très grand.")
+        print("Vérifiez le format du JSON (tableau d'objets ou un objet par ligne).")
         return pd.DataFrame()
 
 
-def extract_openweather_data(city_coords: dict, api_key: str) -> pd.DataFrame:
+def _normalize_openweather_record(city_name: str, coords: dict, data: dict) -> dict:
+    """
+    Extrait et normalise les champs pertinents d'une réponse OpenWeather.
+    :param city_name: Nom de la ville interrogée.
+    :param coords: Dictionnaire {'lat': lat, 'lon': lon} de la ville.
+    :param data: Réponse JSON de l'API.
+    :return: Dictionnaire au format des colonnes extraites.
+    """
+    return {
+        'location_name': city_name,
+        'latitude': coords['lat'],
+        'longitude': coords['lon'],
+        'last_updated': pd.to_datetime(data['dt'], unit='s', utc=True).tz_convert(data.get('timezone')), # Convertir timestamp Unix en datetime, avec fuseau horaire
+        'temperature_celsius': data['main']['temp'],
+        'feels_like_celsius': data['main']['feels_like'],
+        'humidity': data['main']['humidity'],
+        'pressure_mb': data['main']['pressure'],
+        'wind_kph': data['wind']['speed'] * 3.6,  # Convertir m/s en km/h
+        'condition_text': data['weather'][0]['description'],
+        'cloud': data['clouds']['all'],
+        'visibility_km': data.get('visibility', 0) / 1000,  # Visibilité en km, gère l'absence
+        'precip_mm': data.get('rain', {}).get('1h', 0)  # Précipitations sur la dernière heure, gère l'absence
+    }
+
+
+@instrumented('extract.openweather_api')
+def extract_openweather_data(city_coords: dict, api_key: str,
+                             max_workers: int = DEFAULT_MAX_WORKERS,
+                             rate_limit_per_second: float = DEFAULT_RATE_LIMIT_PER_SECOND,
+                             base_url: str = OPENWEATHER_BASE_URL,
+                             api_key_calls_per_minute: float = DEFAULT_API_KEY_CALLS_PER_MINUTE,
+                             max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                             use_cache: bool = True,
+                             cache_ttl_seconds: float = DEFAULT_TTL_SECONDS) -> pd.DataFrame:
     """
     Extrait les données météorologiques actuelles de l'API OpenWeatherMap pour une liste de villes.
+    Les appels sont effectués en parallèle par un pool de threads partageant une session HTTP
+    (connexions keep-alive), sous un budget par clé API et un limiteur de débit par hôte.
+    Les réponses 429/5xx et les erreurs de connexion sont retentées (backoff exponentiel, Retry-After)
+    au cours de la même exécution ; les compteurs sont disponibles dans `df.attrs['openweather_stats']`.
+    Les réponses sont mises en cache sur disque (data/cache/openweather) : une observation encore fraîche
+    n'est pas redemandée, et les entrées périmées sont revalidées par requête conditionnelle.
     :param city_coords: Dictionnaire {nom_ville: {'lat': lat, 'lon': lon}} des villes à interroger.
     :param api_key: Clé API OpenWeatherMap.
+    :param max_workers: Nombre de requêtes simultanées (1 pour un mode séquentiel).
+    :param rate_limit_per_second: Nombre maximal de requêtes par seconde vers l'hôte de l'API.
+    :param base_url: URL de l'endpoint (permet de cibler un serveur HTTP de test local).
+    :param api_key_calls_per_minute: Budget d'appels par minute pour la clé API.
+    :param max_attempts: Nombre maximal de tentatives par ville.
+    :param use_cache: Active le cache disque des réponses.
+    :param cache_ttl_seconds: Durée de validité d'une réponse en cache (à partir de son observation, de son
+        téléchargement ou de sa dernière revalidation).
     :return: DataFrame pandas des données météorologiques actuelles.
     """
-    all_current_weather_data = []
-    base_url = "https://api.openweathermap.org/data/2.5/weather"
+    print(f"Extraction des données OpenWeather pour {len(city_coords)} villes "
+          f"({max_workers} requêtes simultanées, {rate_limit_per_second} req/s max)...")
 
-    print(f"Extraction des données OpenWeather pour {len(city_coords)} villes...")
+    if not city_coords:
+        return pd.DataFrame()
 
-    for city_name, coords in city_coords.items():
-        params = {
+    cache = ResponseCache(OPENWEATHER_CACHE_PATH, ttl_seconds=cache_ttl_seconds) if use_cache else None
+    scheduler = RequestScheduler(
+        api_key, base_url=base_url, max_workers=max_workers,
+        rate_limit_per_second=rate_limit_per_second,
+        api_key_calls_per_minute=api_key_calls_per_minute,
+        max_attempts=max_attempts,
+        cache=cache,
+    )
+    requests_by_city = {
+        city_name: {
             'lat': coords['lat'],
             'lon': coords['lon'],
             'appid': api_key,
             'units': 'metric'  # Températures en Celsius
         }
-        try:
-            response = requests.get(base_url, params=params)
-            response.raise_for_status()  # Lève une HTTPError pour les codes d'état d'erreur (4xx ou 5xx)
-            data = response.json()
-
-            # Extraction et normalisation des champs pertinents
-            extracted_data = {
-                'location_name': city_name,
-                'latitude': coords['lat'],
-                'longitude': coords['lon'],
-                'last_updated': pd.to_datetime(data['dt'], unit='s', utc=True).tz_convert(data.get('timezone')), # Convertir timestamp Unix en datetime, avec fuseau horaire
-                'temperature_celsius': data['main']['temp'],
-                'feels_like_celsius': data['main']['feels_like'],
-                'humidity': data['main']['humidity'],
-                'pressure_mb': data['main']['pressure'],
-                'wind_kph': data['wind']['speed'] * 3.6,  # Convertir m/s en km/h
-                'condition_text': data['weather'][0]['description'],
-                'cloud': data['clouds']['all'],
-                'visibility_km': data.get('visibility', 0) / 1000,  # Visibilité en km, gère l'absence
-                'precip_mm': data.get('rain', {}).get('1h', 0)  # Précipitations sur la dernière heure, gère l'absence
-            }
-            all_current_weather_data.append(extracted_data)
-            print(f"-> Données OpenWeather pour '{city_name}' extraites avec succès.")
-
-        except requests.exceptions.RequestException as e:
-            print(f"Erreur HTTP/Connexion lors de l'appel API OpenWeather pour '{city_name}': {e}")
-        except KeyError as e:
-            print(f"Erreur de clé dans la réponse OpenWeather pour '{city_name}': champ manquant '{e}'.")
-            print(f"Réponse API (partielle pour debug) : {data}")
-        except Exception as e:
-            print(f"Une erreur inattendue est survenue pour '{city_name}': {e}")
+        for city_name, coords in city_coords.items()
+    }
+
+    def _on_response(city_name, data):
+        extracted_data = _normalize_openweather_record(city_name, city_coords[city_name], data)
+        print(f"-> Données OpenWeather pour '{city_name}' extraites avec succès.")
+        return extracted_data
+
+    records = scheduler.run(requests_by_city, _on_response)
+
+    stats = scheduler.stats
+    print(f"Bilan OpenWeather : {stats['successes']}/{stats['requests']} villes extraites, "
+          f"{stats['attempts']} tentatives, {stats['retries']} reprises, {stats['drops']} abandons.")
+
+    df = pd.DataFrame(list(records.values()))
+    df.attrs['openweather_stats'] = dict(stats)
+    if cache is not None:
+        cache.save_index()
+        cache_report = cache.report()
+        print(f"Cache OpenWeather : taux de succès {cache_report['hit_rate']:.0%} "
+              f"({cache_report['hits']} servies, {cache_report['revalidated']} revalidées, "
+              f"{cache_report['misses']} téléchargées), {cache_report['bytes_saved']} octets économisés.")
+        df.attrs['openweather_cache_stats'] = cache_report
+    return df
+
 
-    return pd.DataFrame(all_current_weather_data)
+def _source_file_stat(file_path: str, dtypes: dict) -> dict:
+    """
+    Métadonnées du fichier brut lu (taille, date de modification, types de lecture), conservées dans
+    `df.attrs['source_file']` : la transformation incrémentale les compare à l'exécution précédente
+    et ne hache le contenu que si elles ont changé.
+    """
+    stat = os.stat(file_path)
+    dtypes_token = hashlib.sha1(json.dumps(dtypes, sort_keys=True).encode('utf-8')).hexdigest()[:8]
+    return {'path': os.path.abspath(file_path), 'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns, 'dtypes': dtypes_token}
 
 
-def extract_historical_data(file_name: str) -> pd.DataFrame:
+def _historical_sidecar_prefix(historical_file_path: str) -> str:
+    """
+    Préfixe des caches Parquet de la version actuelle d'un CSV historique (taille et date de modification).
+    """
+    stat = os.stat(historical_file_path)
+    return f"{os.path.basename(historical_file_path)}.{stat.st_size}-{stat.st_mtime_ns}."
+
+
+def _historical_sidecar_path(historical_file_path: str, dtypes: dict = None) -> str:
+    """
+    Chemin du cache Parquet d'un CSV historique, dérivé de sa taille, de sa date de modification et
+    des types de lecture : toute modification du CSV ou du schéma produit un nouveau nom, et donc une relecture.
+    """
+    dtypes = dtypes or HISTORICAL_COLUMN_DTYPES
+    dtypes_token = hashlib.sha1(json.dumps(dtypes, sort_keys=True).encode('utf-8')).hexdigest()[:8]
+    sidecar_name = f"{_historical_sidecar_prefix(historical_file_path)}{dtypes_token}.parquet"
+    return os.path.join(HISTORICAL_CACHE_PATH, sidecar_name)
+
+
+def _read_historical_csv(historical_file_path: str, engine: str, chunksize: int,
+                         dtypes: dict = None) -> pd.DataFrame:
+    """
+    Lit le CSV historique avec un schéma explicite (ville catégorielle, dates analysées à la lecture).
+    """
+    header = pd.read_csv(historical_file_path, nrows=0).columns
+    dtypes = {col: dtype for col, dtype in (dtypes or HISTORICAL_COLUMN_DTYPES).items() if col in header}
+    date_cols = [col for col in HISTORICAL_DATE_COLUMNS if col in header]
+
+    if chunksize:
+        # Le moteur pyarrow ne gère pas la lecture par morceaux : on utilise le moteur C
+        reader = pd.read_csv(historical_file_path, dtype=dtypes, parse_dates=date_cols, chunksize=chunksize)
+        return _concat_chunks(reader)
+    return pd.read_csv(historical_file_path, dtype=dtypes, parse_dates=date_cols, engine=engine)
+
+
+@instrumented('extract.historical_csv')
+def extract_historical_data(file_name: str, engine: str = None, chunksize: int = None,
+                            use_cache: bool = True, compact: bool = False) -> pd.DataFrame:
     """
     Extrait les données météorologiques historiques depuis un fichier CSV local.
+    Le CSV est lu avec un schéma explicite (ville catégorielle, mesures float64 ou float32 en mode compact,
+    dates analysées),
+    puis mis en cache au format Parquet : tant que la taille et la date de modification du CSV
+    sont inchangées, les exécutions suivantes relisent directement le Parquet.
     :param file_name: Nom du fichier CSV dans le dossier data/raw.
+    :param engine: Moteur de lecture pandas ('pyarrow' ou 'c'). Par défaut pyarrow s'il est installé.
+    :param chunksize: Si renseigné, lecture par morceaux de `chunksize` lignes (moteur C).
+    :param use_cache: Active le cache Parquet du CSV.
+    :param compact: Lit les mesures en float32 (mode compact) au lieu de float64.
     :return: DataFrame pandas des données historiques.
     """
     historical_file_path = os.path.join(RAW_DATA_PATH, file_name)
@@ -114,41 +393,112 @@ def extract_historical_data(file_name: str) -> pd.DataFrame:
               f"Veuillez vous assurer qu'il est bien placé dans '{RAW_DATA_PATH}'.")
         return pd.DataFrame()
 
+    dtypes = source_read_dtypes('historical_csv', compact)
+    source_file = _source_file_stat(historical_file_path, dtypes)
+    sidecar_path = _historical_sidecar_path(historical_file_path, dtypes) if use_cache else None
+    if sidecar_path and os.path.exists(sidecar_path):
+        try:
+            df_historical = pd.read_parquet(sidecar_path)
+            df_historical.attrs['source_file'] = source_file
+            print(f"Données historiques de '{file_name}' lues depuis le cache Parquet. Nombre de lignes : {len(df_historical)}")
+            return df_historical
+        except Exception as e:
+            print(f"Cache Parquet illisible pour '{file_name}', relecture du CSV : {e}")
+
+    if engine is None:
+        engine = 'pyarrow' if importlib.util.find_spec('pyarrow') is not None else 'c'
+
     try:
-        # Assurez-vous d'adapter ces paramètres à la structure réelle de votre CSV historique
-        df_historical = pd.read_csv(historical_file_path)
+        # Assurez-vous d'adapter HISTORICAL_COLUMN_DTYPES à la structure réelle de votre CSV historique
+        df_historical = _read_historical_csv(historical_file_path, engine, chunksize, dtypes)
+        df_historical.attrs['source_file'] = source_file
         print(f"Données historiques de '{file_name}' lues avec succès. Nombre de lignes : {len(df_historical)}")
-        return df_historical
     except Exception as e:
         print(f"Erreur lors de la lecture des données historiques '{file_name}': {e}")
         return pd.DataFrame()
 
+    if sidecar_path:
+        try:
+            os.makedirs(HISTORICAL_CACHE_PATH, exist_ok=True)
+            # Supprime les caches des versions précédentes du même fichier avant d'écrire le nouveau
+            # (ceux de la version actuelle lus avec d'autres types, ex. mode compact, sont conservés)
+            current_prefix = _historical_sidecar_prefix(historical_file_path)
+            for old_name in os.listdir(HISTORICAL_CACHE_PATH):
+                if not (old_name.startswith(f"{file_name}.") and old_name.endswith('.parquet')):
+                    continue
+                # Nom sans empreinte des types ('<prefixe>parquet') : ancien format, toujours obsolète
+                if not old_name.startswith(current_prefix) or old_name == f"{current_prefix}parquet":
+                    os.remove(os.path.join(HISTORICAL_CACHE_PATH, old_name))
+            # Ordre des lignes conservé : il détermine les premières occurrences lors de la transformation
+            write_parquet(df_historical, sidecar_path, sort_by=None, manifest=False)
+        except Exception as e:
+            print(f"Impossible d'écrire le cache Parquet de '{file_name}': {e}")
+
+    return df_historical
+
+
+def _city_index_fingerprint(df_json: pd.DataFrame) -> str:
+    """
+    Empreinte de la source de l'index des villes : métadonnées du fichier JSON lu (`df.attrs['source_file']`)
+    ou, à défaut (ex. DataFrame relu depuis un artefact), hachage des colonnes utilisées par l'index,
+    dans l'ordre des lignes (il détermine la première occurrence retenue).
+    """
+    source_file = df_json.attrs.get('source_file')
+    if source_file:
+        return 'file:' + hashlib.sha1(json.dumps(source_file, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    columns = [col for col in ['location_name', 'latitude', 'longitude', 'country'] if col in df_json.columns]
+    row_hashes = pd.util.hash_pandas_object(df_json[columns], index=False).to_numpy()
+    return 'content:' + hashlib.sha1(row_hashes.tobytes()).hexdigest()[:16]
+
 
-def get_selected_city_coords(df_json: pd.DataFrame, selected_city_names: list) -> dict:
+def build_city_index(df_json: pd.DataFrame, save_path: str = None) -> CityIndex:
+    """
+    Construit l'index nom de ville -> (lat, lon, pays) à partir des données JSON des capitales.
+    Si `save_path` est renseigné, l'index qui y est sauvegardé est relu tant que l'empreinte de la source
+    (enregistrée dans son manifeste) est inchangée ; sinon l'index est reconstruit puis sauvegardé.
+    :param df_json: DataFrame contenant toutes les données JSON des capitales.
+    :param save_path: Si renseigné, chemin Parquet de l'index persistant (ex. CITY_INDEX_PATH).
+    :return: Instance de CityIndex.
+    """
+    fingerprint = _city_index_fingerprint(df_json) if save_path else None
+    if save_path and os.path.exists(save_path):
+        manifest = read_manifest(save_path)
+        if manifest and manifest.get('source_fingerprint') == fingerprint:
+            try:
+                city_index = CityIndex.load(save_path)
+                print(f"Index des villes relu depuis {save_path} : {len(city_index)} noms distincts.")
+                return city_index
+            except Exception as e:
+                print(f"Index des villes illisible ({save_path}), reconstruction : {e}")
+
+    city_index = CityIndex.from_frame(df_json, name_col='location_name')
+    print(f"Index des villes construit : {len(city_index)} noms distincts.")
+    if save_path:
+        city_index.save(save_path, source_fingerprint=fingerprint)
+        print(f"Index des villes sauvegardé dans : {save_path}")
+    return city_index
+
+
+def get_selected_city_coords(df_json: pd.DataFrame, selected_city_names: list,
+                             city_index: CityIndex = None) -> dict:
     """
     Extrait les latitudes et longitudes pour les villes sélectionnées à partir du DataFrame JSON.
-    Gère les doublons potentiels et les noms de villes manquants.
+    La recherche passe par un index des noms normalisés (une seule jointure pour toute la liste).
+    Gère les doublons potentiels (première occurrence retenue) et signale les noms de villes manquants.
     :param df_json: DataFrame contenant toutes les données JSON des capitales.
     :param selected_city_names: Liste des noms de villes à extraire (ex: "Paris", "London").
+    :param city_index: Index déjà construit (ou chargé depuis le disque) à réutiliser.
     :return: Dictionnaire {nom_ville: {'lat': lat, 'lon': lon}} pour les villes trouvées.
     """
-    city_coords = {}
     print(f"\nRecherche des coordonnées pour les villes sélectionnées : {selected_city_names}")
-    for city_name in selected_city_names:
-        # Utilise .str.lower() pour une recherche insensible à la casse
-        # Utilise .str.strip() pour supprimer les espaces blancs en trop
-        # Utilise df_json['location_name'].astype(str) pour éviter les erreurs si la colonne contient des non-strings
-        city_data = df_json[df_json['location_name'].astype(str).str.lower().str.strip() == city_name.lower().strip()]
-
-        if not city_data.empty:
-            # Si plusieurs entrées pour la même ville (rare mais possible avec des homonymes), prenez la première
-            # Assurez-vous que latitude et longitude sont convertis en float pour l'API
-            lat = float(city_data['latitude'].iloc[0])
-            lon = float(city_data['longitude'].iloc[0])
-            city_coords[city_name] = {'lat': lat, 'lon': lon}
-            print(f"  - Coordonnées trouvées pour '{city_name}': Lat={lat}, Lon={lon}")
-        else:
-            print(f"  - Avertissement : Coordonnées non trouvées pour la ville '{city_name}' dans le dataset JSON.")
+    if city_index is None:
+        city_index = CityIndex.from_frame(df_json, name_col='location_name')
+
+    city_coords, unmatched = city_index.coords_for(selected_city_names)
+    for city_name, coords in city_coords.items():
+        print(f"  - Coordonnées trouvées pour '{city_name}': Lat={coords['lat']}, Lon={coords['lon']}")
+    if unmatched:
+        print(f"  - Avertissement : Coordonnées non trouvées dans le dataset JSON pour : {unmatched}")
     return city_coords
 
 
@@ -164,7 +514,7 @@ if __name__ == "__main__":
         print("Impossible de continuer les tests sans les données JSON initiales.")
         exit() # Quitte le script si l'extraction JSON échoue
 
-    print(f"Aperçu des données JSON brutes :\n{df_json_raw.head()}")
+    preview(df_json_raw, "Aperçu des données JSON brutes")
     print(f"Colonnes JSON brutes : {df_json_raw.columns.tolist()[:5]}...") # Affiche les 5 premières colonnes
 
 
@@ -177,7 +527,8 @@ if __name__ == "__main__":
         "Rome", "Madrid", "Mexico City", "Buenos Aires", "Cape Town",
         "New Delhi", "Singapore", "Oslo", "Washington"
     ]
-    city_coords_for_api = get_selected_city_coords(df_json_raw, target_cities)
+    city_index = build_city_index(df_json_raw, save_path=CITY_INDEX_PATH)
+    city_coords_for_api = get_selected_city_coords(df_json_raw, target_cities, city_index=city_index)
 
     # Assurez-vous d'avoir des coordonnées pour au moins quelques villes avant de faire des appels API
     if not city_coords_for_api:
@@ -191,7 +542,7 @@ if __name__ == "__main__":
 
         df_openweather = extract_openweather_data(city_coords_for_api, openweather_api_key)
         if not df_openweather.empty:
-            print(f"\nAperçu des données OpenWeather extraites :\n{df_openweather.head()}")
+            preview(df_openweather, "\nAperçu des données OpenWeather extraites")
             print(f"Colonnes OpenWeather : {df_openweather.columns.tolist()}")
         else:
             print("Aucune donnée OpenWeather n'a été extraite.")
@@ -216,7 +567,7 @@ if __name__ == "__main__":
 
     df_historical_test = extract_historical_data(temp_historical_file_name)
     if not df_historical_test.empty:
-        print(f"\nAperçu des données historiques extraites :\n{df_historical_test.head()}")
+        preview(df_historical_test, "\nAperçu des données historiques extraites")
         print(f"Colonnes historiques : {df_historical_test.columns.tolist()}")
     else:
         print("Aucune donnée historique n'a été extraite.")
@@ -0,0 +1,132 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from parquet_writer import write_parquet
+
+# Colonnes imputées par climatologie (precipitation_mm et uv_index sont complétées par 0 dans transform_data)
+IMPUTED_COLUMNS = [
+    'temp_celsius', 'feels_like_celsius', 'humidity_percent', 'pressure_mb', 'wind_kph',
+    'cloud_percent', 'visibility_km', 'latitude', 'longitude',
+]
+
+# Hiérarchie de repli : du groupe le plus précis au plus général (tuple vide = médiane globale)
+DEFAULT_FALLBACK_HIERARCHY = [
+    ('city', 'month'),
+    ('city',),
+    ('country', 'month'),
+    ('country',),
+    ('month',),
+    (),
+]
+
+CLIMATOLOGY_META_FILENAME = "climatology.json"
+
+
+def _level_name(keys: tuple) -> str:
+    return '_'.join(keys) if keys else 'global'
+
+
+def _with_month(df: pd.DataFrame, keys: tuple) -> pd.DataFrame:
+    """
+    Retourne les colonnes de regroupement d'un niveau, en dérivant 'month' de la date si besoin.
+    """
+    key_frame = {}
+    for key in keys:
+        key_frame[key] = df['date'].dt.month.to_numpy() if key == 'month' else df[key].astype(object).to_numpy()
+    return pd.DataFrame(key_frame, index=df.index)
+
+
+def build_climatology(df: pd.DataFrame, columns: list = None, hierarchy: list = None) -> dict:
+    """
+    Calcule les tables de climatologie (médianes) pour chaque niveau de la hiérarchie de repli.
+    :param df: DataFrame unifié (colonnes 'date', 'city', 'country' et mesures).
+    :param columns: Colonnes à imputer (par défaut IMPUTED_COLUMNS présentes dans df).
+    :param hierarchy: Liste de tuples de clés (par défaut DEFAULT_FALLBACK_HIERARCHY).
+    :return: Dictionnaire {nom du niveau: DataFrame des médianes indexé par les clés du niveau}.
+    """
+    columns = [col for col in (columns or IMPUTED_COLUMNS) if col in df.columns]
+    hierarchy = hierarchy if hierarchy is not None else DEFAULT_FALLBACK_HIERARCHY
+    tables = {}
+    for keys in hierarchy:
+        if keys:
+            grouped = pd.concat([_with_month(df, keys), df[columns]], axis=1)
+            tables[_level_name(keys)] = grouped.groupby(list(keys), observed=True)[columns].median()
+        else:
+            tables[_level_name(keys)] = df[columns].median().to_frame().T
+    return tables
+
+
+def save_climatology(tables: dict, climatology_path: str, hierarchy: list = None):
+    """
+    Sauvegarde les tables de climatologie (un Parquet par niveau) et la hiérarchie utilisée.
+    :param tables: Sortie de build_climatology.
+    :param climatology_path: Dossier de destination.
+    :param hierarchy: Hiérarchie associée aux tables.
+    """
+    hierarchy = hierarchy if hierarchy is not None else DEFAULT_FALLBACK_HIERARCHY
+    os.makedirs(climatology_path, exist_ok=True)
+    for name, table in tables.items():
+        write_parquet(table.reset_index(), os.path.join(climatology_path, f"{name}.parquet"),
+                      sort_by=None, manifest=False)
+    with open(os.path.join(climatology_path, CLIMATOLOGY_META_FILENAME), 'w') as f:
+        json.dump({'hierarchy': [list(keys) for keys in hierarchy]}, f)
+
+
+def load_climatology(climatology_path: str) -> tuple:
+    """
+    Charge les tables de climatologie sauvegardées.
+    :param climatology_path: Dossier des tables.
+    :return: Tuple (tables, hiérarchie), ou (None, None) si aucun artefact n'existe.
+    """
+    meta_path = os.path.join(climatology_path, CLIMATOLOGY_META_FILENAME)
+    if not os.path.exists(meta_path):
+        return None, None
+    with open(meta_path, 'r') as f:
+        hierarchy = [tuple(keys) for keys in json.load(f)['hierarchy']]
+    tables = {}
+    for keys in hierarchy:
+        table = pd.read_parquet(os.path.join(climatology_path, f"{_level_name(keys)}.parquet"))
+        tables[_level_name(keys)] = table.set_index(list(keys)) if keys else table
+    return tables, hierarchy
+
+
+def apply_climatology(df: pd.DataFrame, tables: dict, hierarchy: list = None, columns: list = None) -> dict:
+    """
+    Complète les valeurs manquantes de `df` (modifié sur place) à partir des tables de climatologie,
+    en descendant la hiérarchie de repli. Seules les lignes encore manquantes sont recherchées à chaque niveau.
+    :param df: DataFrame unifié.
+    :param tables: Tables de climatologie (build_climatology ou load_climatology).
+    :param hierarchy: Hiérarchie de repli (celle des tables par défaut).
+    :param columns: Colonnes à compléter (par défaut IMPUTED_COLUMNS présentes dans df).
+    :return: Dictionnaire {colonne: {niveau: nombre de valeurs complétées}}.
+    """
+    columns = [col for col in (columns or IMPUTED_COLUMNS) if col in df.columns]
+    hierarchy = hierarchy if hierarchy is not None else DEFAULT_FALLBACK_HIERARCHY
+    filled_counts = {}
+    for col in columns:
+        values = df[col].to_numpy(dtype='float64', copy=True)
+        counts = {}
+        for keys in hierarchy:
+            missing = np.isnan(values)
+            if not missing.any():
+                break
+            table = tables.get(_level_name(keys))
+            if table is None or col not in table.columns:
+                continue
+            if keys:
+                key_frame = _with_month(df.loc[missing], keys)
+                lookup_index = (pd.MultiIndex.from_frame(key_frame) if len(keys) > 1
+                                else pd.Index(key_frame[keys[0]]))
+                fill_values = table[col].reindex(lookup_index).to_numpy(dtype='float64')
+            else:
+                fill_values = np.full(int(missing.sum()), table[col].iloc[0], dtype='float64')
+            missing_positions = np.flatnonzero(missing)
+            found = ~np.isnan(fill_values)
+            values[missing_positions[found]] = fill_values[found]
+            counts[_level_name(keys)] = int(found.sum())
+        df[col] = values
+        filled_counts[col] = counts
+    return filled_counts
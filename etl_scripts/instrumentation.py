@@ -0,0 +1,221 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+try:
+    import resource  # Absent sous Windows : la mémoire crête n'est alors lue que dans /proc
+except ImportError:
+    resource = None
+
+METRICS_PATH = os.path.join(os.environ.get('AIRFLOW_HOME', '.'), 'data', 'metrics')
+
+# Variables d'environnement de configuration
+RUN_ID_ENV = 'WEATHER_RUN_ID'                    # Identifiant de l'exécution (nom du fichier de métriques)
+METRICS_ENABLED_ENV = 'WEATHER_METRICS'          # '0' pour désactiver l'écriture des métriques
+VERBOSE_PREVIEW_ENV = 'WEATHER_VERBOSE_PREVIEW'  # '1' pour afficher les aperçus de DataFrames (df.head())
+
+_lock = threading.Lock()
+_local = threading.local()
+_run_id = None
+
+
+# --- Configuration ---
+
+def set_run_id(run_id: str):
+    """
+    Fixe l'identifiant de l'exécution : toutes les étapes suivantes (y compris dans les processus enfants)
+    écrivent dans data/metrics/<run_id>.jsonl.
+    :param run_id: Identifiant de l'exécution (ex. date d'exécution Airflow).
+    """
+    global _run_id
+    _run_id = str(run_id)
+    os.environ[RUN_ID_ENV] = _run_id
+
+
+def get_run_id() -> str:
+    """
+    Identifiant de l'exécution courante (variable WEATHER_RUN_ID, sinon horodatage du premier appel).
+    """
+    global _run_id
+    if _run_id is None:
+        _run_id = os.environ.get(RUN_ID_ENV) or datetime.now().strftime('%Y%m%dT%H%M%S')
+        os.environ[RUN_ID_ENV] = _run_id
+    return _run_id
+
+
+def metrics_enabled() -> bool:
+    return os.environ.get(METRICS_ENABLED_ENV, '1') != '0'
+
+
+def verbose_preview_enabled() -> bool:
+    return os.environ.get(VERBOSE_PREVIEW_ENV, '0') not in ('', '0', 'false', 'False')
+
+
+def preview(df: pd.DataFrame, label: str, rows: int = 5):
+    """
+    Affiche un aperçu d'un DataFrame uniquement si WEATHER_VERBOSE_PREVIEW est activé.
+    :param df: DataFrame à afficher.
+    :param label: Titre de l'aperçu.
+    :param rows: Nombre de lignes affichées.
+    """
+    if verbose_preview_enabled():
+        print(f"{label} :\n{df.head(rows)}")
+
+
+# --- Mesures système (Linux : /proc ; ailleurs : resource si disponible) ---
+
+def _read_proc(path: str) -> dict:
+    values = {}
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                values[key.strip()] = value.strip()
+    except OSError:
+        pass
+    return values
+
+
+def _io_counters() -> tuple:
+    """
+    Octets lus et écrits par le processus (fichiers, sockets et console), ou (None, None) si indisponible.
+    """
+    io = _read_proc('/proc/self/io')
+    if 'rchar' not in io:
+        return None, None
+    return int(io['rchar']), int(io['wchar'])
+
+
+def _memory_mb() -> tuple:
+    """
+    Mémoire résidente actuelle et crête (Mo). La crête est celle depuis la dernière remise à zéro.
+    """
+    status = _read_proc('/proc/self/status')
+    if 'VmRSS' in status:
+        return int(status['VmRSS'].split()[0]) / 1024, int(status['VmHWM'].split()[0]) / 1024
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss est en octets sous macOS et en kilo-octets ailleurs
+        peak_mb = peak / (1024 * 1024) if os.uname().sysname == 'Darwin' else peak / 1024
+        return None, peak_mb
+    return None, None
+
+
+def _reset_peak_rss():
+    """
+    Remet à zéro la crête de mémoire résidente du processus (Linux >= 4.0), sans effet ailleurs.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def _write_record(record: dict):
+    if not metrics_enabled():
+        return
+    os.makedirs(METRICS_PATH, exist_ok=True)
+    path = os.path.join(METRICS_PATH, f"{record['run_id']}.jsonl")
+    line = json.dumps(record, ensure_ascii=False, default=str)
+    with _lock:
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+
+# --- Instrumentation des étapes ---
+
+@contextmanager
+def stage(name: str, rows_in: int = None, **fields):
+    """
+    Mesure une étape du pipeline et écrit une ligne JSON dans data/metrics/<run_id>.jsonl :
+    durée, lignes en entrée/sortie, mémoire résidente (actuelle et crête) et octets lus/écrits.
+    Les compteurs d'octets et la crête mémoire sont ceux du processus : pour des étapes imbriquées
+    ou exécutées dans des threads en parallèle, ils incluent le travail des étapes concurrentes.
+    :param name: Nom de l'étape (ex. 'extract.json_initial', 'transform.enrichment').
+    :param rows_in: Nombre de lignes en entrée.
+    :param fields: Champs supplémentaires ajoutés à l'enregistrement.
+    :return: Dictionnaire de l'enregistrement, à compléter dans le bloc (ex. record['rows_out'] = len(df)).
+    """
+    depth = getattr(_local, 'depth', 0)
+    if depth == 0:
+        _reset_peak_rss()
+    _local.depth = depth + 1
+
+    record = {
+        'run_id': get_run_id(),
+        'stage': name,
+        'started_at': datetime.now().isoformat(timespec='milliseconds'),
+        'pid': os.getpid(),
+        'rows_in': rows_in,
+        'rows_out': None,
+        **fields,
+    }
+    bytes_read_start, bytes_written_start = _io_counters()
+    start = time.perf_counter()
+    status = 'ok'
+    try:
+        yield record
+    except BaseException:
+        status = 'error'
+        raise
+    finally:
+        _local.depth = depth
+        bytes_read_end, bytes_written_end = _io_counters()
+        rss_mb, peak_rss_mb = _memory_mb()
+        record.update({
+            'status': status,
+            'wall_time_s': round(time.perf_counter() - start, 6),
+            'rss_mb': round(rss_mb, 1) if rss_mb is not None else None,
+            'peak_rss_mb': round(peak_rss_mb, 1) if peak_rss_mb is not None else None,
+            'bytes_read': bytes_read_end - bytes_read_start if bytes_read_start is not None else None,
+            'bytes_written': bytes_written_end - bytes_written_start if bytes_written_start is not None else None,
+        })
+        _write_record(record)
+
+
+def _count_rows(value) -> int:
+    if isinstance(value, pd.DataFrame):
+        return len(value)
+    if isinstance(value, dict) and value and all(isinstance(v, pd.DataFrame) for v in value.values()):
+        return sum(len(v) for v in value.values())
+    return None
+
+
+def instrumented(name: str):
+    """
+    Décorateur : mesure chaque appel de la fonction comme une étape `name` (voir stage).
+    Les lignes en entrée sont celles des DataFrames passés en argument, les lignes en sortie
+    celles du DataFrame (ou du dictionnaire de DataFrames) retourné.
+    :param name: Nom de l'étape.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            input_rows = [_count_rows(value) for value in list(args) + list(kwargs.values())]
+            input_rows = [rows for rows in input_rows if rows is not None]
+            with stage(name, rows_in=sum(input_rows) if input_rows else None) as record:
+                result = func(*args, **kwargs)
+                record['rows_out'] = _count_rows(result)
+                return result
+        return wrapper
+    return decorator
+
+
+def load_run_metrics(run_id: str = None, metrics_path: str = METRICS_PATH) -> pd.DataFrame:
+    """
+    Charge les métriques d'une exécution.
+    :param run_id: Identifiant de l'exécution (par défaut l'exécution courante).
+    :param metrics_path: Dossier des métriques.
+    :return: DataFrame (une ligne par étape mesurée), vide si aucune métrique n'existe.
+    """
+    path = os.path.join(metrics_path, f"{run_id or get_run_id()}.jsonl")
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    return pd.read_json(path, lines=True)
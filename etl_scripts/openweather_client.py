@@ -0,0 +1,331 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# --- Configuration du client OpenWeather ---
+OPENWEATHER_BASE_URL = "https://api.openweathermap.org/data/2.5/weather"
+DEFAULT_MAX_WORKERS = 8              # Nombre de requêtes simultanées
+DEFAULT_RATE_LIMIT_PER_SECOND = 10.0 # Débit maximal par hôte (requêtes/seconde)
+DEFAULT_TIMEOUT_SECONDS = 10
+DEFAULT_API_KEY_CALLS_PER_MINUTE = 600  # Budget d'appels par clé API (à adapter à l'abonnement)
+DEFAULT_MAX_ATTEMPTS = 5             # Tentatives maximales par ville (première tentative incluse)
+DEFAULT_BACKOFF_BASE_SECONDS = 1.0
+DEFAULT_BACKOFF_MAX_SECONDS = 60.0
+
+# Codes HTTP pour lesquels une nouvelle tentative a du sens (quota dépassé, erreurs serveur transitoires)
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Limiteur de débit à seau de jetons, partagé entre threads.
+    Le seau se remplit de `rate` jetons par seconde jusqu'à `capacity` ; chaque requête consomme un jeton.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        """
+        :param rate: Nombre de jetons ajoutés par seconde (débit soutenu).
+        :param capacity: Taille maximale du seau (rafale autorisée). Par défaut égale à `rate`.
+        """
+        if rate <= 0:
+            raise ValueError("Le débit du limiteur doit être strictement positif.")
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity is not None else max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def set_rate(self, rate: float, capacity: float = None):
+        """
+        Modifie le débit du seau sans le recréer : les jetons déjà consommés par les autres appelants
+        restent décomptés (le niveau est seulement plafonné à la nouvelle capacité).
+        :param rate: Nouveau débit (jetons par seconde).
+        :param capacity: Nouvelle taille maximale du seau. Par défaut égale à `rate`.
+        """
+        if rate <= 0:
+            raise ValueError("Le débit du limiteur doit être strictement positif.")
+        with self._lock:
+            self._refill()
+            self.rate = float(rate)
+            self.capacity = float(capacity) if capacity is not None else max(1.0, self.rate)
+            self._tokens = min(self._tokens, self.capacity)
+
+    def acquire(self, tokens: float = 1.0):
+        """
+        Bloque jusqu'à ce que `tokens` jetons soient disponibles, puis les consomme.
+        """
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait_seconds = (tokens - self._tokens) / self.rate
+            time.sleep(wait_seconds)
+
+
+_host_buckets = {}
+_api_key_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_host_rate_limiter(url: str, rate_limit_per_second: float = DEFAULT_RATE_LIMIT_PER_SECOND) -> TokenBucket:
+    """
+    Retourne le limiteur de débit associé à l'hôte de l'URL (un seul par hôte et par processus).
+    :param url: URL appelée.
+    :param rate_limit_per_second: Débit de l'hôte ; un limiteur existant est mis à jour sur place.
+    :return: Instance de TokenBucket partagée.
+    """
+    host = urlparse(url).netloc
+    with _buckets_lock:
+        bucket = _host_buckets.get(host)
+        if bucket is None:
+            bucket = TokenBucket(rate_limit_per_second)
+            _host_buckets[host] = bucket
+        elif bucket.rate != float(rate_limit_per_second):
+            bucket.set_rate(rate_limit_per_second)
+        return bucket
+
+
+def get_api_key_rate_limiter(api_key: str,
+                             calls_per_minute: float = DEFAULT_API_KEY_CALLS_PER_MINUTE) -> TokenBucket:
+    """
+    Retourne le seau de jetons associé à une clé API (budget d'appels partagé par tous les threads).
+    :param api_key: Clé API OpenWeatherMap.
+    :param calls_per_minute: Budget d'appels par minute ; un seau existant est mis à jour sur place.
+    :return: Instance de TokenBucket partagée.
+    """
+    rate = calls_per_minute / 60.0
+    capacity = max(1.0, rate * 10)  # Rafale de 10 secondes de budget
+    with _buckets_lock:
+        bucket = _api_key_buckets.get(api_key)
+        if bucket is None:
+            bucket = TokenBucket(rate, capacity=capacity)
+            _api_key_buckets[api_key] = bucket
+        elif bucket.rate != rate:
+            bucket.set_rate(rate, capacity=capacity)
+        return bucket
+
+
+def build_session(pool_size: int = DEFAULT_MAX_WORKERS) -> requests.Session:
+    """
+    Crée une session HTTP avec un pool de connexions keep-alive dimensionné pour le nombre de workers.
+    :param pool_size: Nombre maximal de connexions conservées par hôte.
+    :return: Session requests configurée.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(1, pool_size))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def fetch_current_weather(session: requests.Session, params: dict, base_url: str = OPENWEATHER_BASE_URL,
+                          rate_limiter: TokenBucket = None, timeout: float = DEFAULT_TIMEOUT_SECONDS,
+                          cache=None) -> dict:
+    """
+    Effectue un appel à l'endpoint météo actuelle en respectant le limiteur de débit.
+    Si un cache de réponses est fourni, une observation encore fraîche est servie sans appel réseau,
+    et une entrée périmée est revalidée par requête conditionnelle (ETag / If-Modified-Since).
+    :param session: Session HTTP partagée.
+    :param params: Paramètres de la requête (lat, lon, appid, units).
+    :param base_url: URL de l'endpoint (modifiable pour pointer vers un serveur de test local).
+    :param rate_limiter: Limiteur (ou liste de limiteurs) de débit à consulter avant l'envoi.
+    :param timeout: Délai maximal de la requête en secondes.
+    :param cache: Instance optionnelle de ResponseCache.
+    :return: Réponse JSON décodée.
+    """
+    headers = {}
+    cache_key, cache_entry = (None, None)
+    if cache is not None:
+        cache_key, cache_entry = cache.lookup(params)
+        if cache_entry is not None:
+            if cache.is_fresh(cache_entry):
+                data = cache.read(cache_key)
+                if data is not None:
+                    return data
+            headers = cache.conditional_headers(cache_entry)
+
+    limiters = rate_limiter if isinstance(rate_limiter, (list, tuple)) else [rate_limiter]
+    for limiter in limiters:
+        if limiter is not None:
+            limiter.acquire()
+    response = session.get(base_url, params=params, headers=headers, timeout=timeout)
+
+    if cache is not None and response.status_code == 304 and cache_entry is not None:
+        data = cache.read(cache_key, revalidated=True)
+        if data is not None:
+            return data
+        # Entrée illisible : on refait un appel inconditionnel
+        response = session.get(base_url, params=params, timeout=timeout)
+
+    response.raise_for_status()  # Lève une HTTPError pour les codes d'état d'erreur (4xx ou 5xx)
+    data = response.json()
+    if cache is not None:
+        cache.record_miss()
+        cache.store(cache_key, response.content, data,
+                    etag=response.headers.get('ETag'),
+                    last_modified=response.headers.get('Last-Modified'))
+    return data
+
+
+def parse_retry_after(value) -> float:
+    """
+    Convertit un en-tête Retry-After (secondes ou date HTTP) en nombre de secondes d'attente.
+    :param value: Valeur brute de l'en-tête (ou None).
+    :return: Délai en secondes, ou None si l'en-tête est absent ou illisible.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class RequestScheduler:
+    """
+    Ordonnanceur de requêtes OpenWeather : budget par clé API (seau de jetons), limite par hôte,
+    reprises avec backoff exponentiel et gigue, respect de Retry-After, et file de reprise
+    vidée au cours de la même exécution. Les compteurs sont exposés dans `stats`.
+    """
+
+    def __init__(self, api_key: str, base_url: str = OPENWEATHER_BASE_URL,
+                 max_workers: int = DEFAULT_MAX_WORKERS,
+                 rate_limit_per_second: float = DEFAULT_RATE_LIMIT_PER_SECOND,
+                 api_key_calls_per_minute: float = DEFAULT_API_KEY_CALLS_PER_MINUTE,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 backoff_base: float = DEFAULT_BACKOFF_BASE_SECONDS,
+                 backoff_max: float = DEFAULT_BACKOFF_MAX_SECONDS,
+                 seed: int = None,
+                 cache=None):
+        """
+        :param api_key: Clé API OpenWeatherMap.
+        :param base_url: URL de l'endpoint appelé.
+        :param max_workers: Nombre de requêtes simultanées.
+        :param rate_limit_per_second: Débit maximal vers l'hôte de l'API.
+        :param api_key_calls_per_minute: Budget d'appels par minute pour la clé API.
+        :param max_attempts: Nombre maximal de tentatives par requête.
+        :param backoff_base: Délai de base du backoff exponentiel (secondes).
+        :param backoff_max: Plafond du délai de backoff (secondes).
+        :param seed: Graine du générateur de gigue (pour des exécutions reproductibles).
+        :param cache: Instance optionnelle de ResponseCache partagée par les requêtes.
+        """
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_workers = max(1, max_workers)
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.cache = cache
+        self.rate_limiters = [
+            get_api_key_rate_limiter(api_key, api_key_calls_per_minute),
+            get_host_rate_limiter(base_url, rate_limit_per_second),
+        ]
+        self.stats = {'requests': 0, 'attempts': 0, 'retries': 0, 'successes': 0, 'drops': 0}
+        self._stats_lock = threading.Lock()
+        self._random = random.Random(seed)
+
+    def _count(self, counter: str):
+        with self._stats_lock:
+            self.stats[counter] += 1
+
+    def backoff_delay(self, attempt: int, retry_after: float = None) -> float:
+        """
+        Calcule le délai avant la prochaine tentative (backoff exponentiel à gigue complète).
+        Un Retry-After fourni par le serveur sert de borne inférieure.
+        :param attempt: Numéro de la tentative qui vient d'échouer (à partir de 1).
+        :param retry_after: Délai imposé par le serveur, en secondes.
+        :return: Délai d'attente en secondes.
+        """
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        delay = self._random.uniform(0, ceiling)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def _attempt(self, session, key, params: dict, not_before: float, on_response):
+        """
+        Exécute une tentative. Retourne ('ok', enregistrement), ('retry', retry_after) ou ('drop', None).
+        """
+        wait_seconds = not_before - time.monotonic()
+        if wait_seconds > 0:
+            time.sleep(wait_seconds)
+        self._count('attempts')
+        data = None
+        try:
+            data = fetch_current_weather(session, params, base_url=self.base_url, rate_limiter=self.rate_limiters,
+                                         cache=self.cache)
+            return 'ok', on_response(key, data)
+        except requests.exceptions.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            if status in RETRYABLE_STATUS_CODES:
+                print(f"Réponse HTTP {status} pour '{key}', nouvelle tentative programmée.")
+                return 'retry', parse_retry_after(e.response.headers.get('Retry-After'))
+            print(f"Erreur HTTP non récupérable lors de l'appel API OpenWeather pour '{key}': {e}")
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            print(f"Erreur de connexion pour '{key}', nouvelle tentative programmée : {e}")
+            return 'retry', None
+        except requests.exceptions.RequestException as e:
+            print(f"Erreur HTTP/Connexion lors de l'appel API OpenWeather pour '{key}': {e}")
+        except KeyError as e:
+            print(f"Erreur de clé dans la réponse OpenWeather pour '{key}': champ manquant '{e}'.")
+            print(f"Réponse API (partielle pour debug) : {data}")
+        except Exception as e:
+            print(f"Une erreur inattendue est survenue pour '{key}': {e}")
+        return 'drop', None
+
+    def run(self, requests_by_key: dict, on_response) -> dict:
+        """
+        Exécute toutes les requêtes, puis vide la file de reprise par vagues successives
+        jusqu'à succès ou épuisement des tentatives.
+        :param requests_by_key: Dictionnaire {clé: paramètres de requête}, ex. {nom_ville: {'lat': .., 'lon': ..}}.
+        :param on_response: Fonction (clé, réponse JSON) -> enregistrement, appelée pour chaque succès.
+        :return: Dictionnaire {clé: enregistrement} des requêtes réussies, dans l'ordre d'entrée.
+        """
+        # File de travail : (clé, paramètres, numéro de tentative, instant au plus tôt)
+        pending = [(key, params, 1, 0.0) for key, params in requests_by_key.items()]
+        results = {}
+        with self._stats_lock:
+            self.stats['requests'] += len(pending)
+
+        with build_session(pool_size=self.max_workers) as session:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                while pending:
+                    wave = pending
+                    pending = []
+                    outcomes = executor.map(
+                        lambda item: self._attempt(session, item[0], item[1], item[3], on_response), wave
+                    )
+                    for (key, params, attempt, _), (status, payload) in zip(wave, outcomes):
+                        if status == 'ok':
+                            results[key] = payload
+                            self._count('successes')
+                        elif status == 'retry' and attempt < self.max_attempts:
+                            self._count('retries')
+                            not_before = time.monotonic() + self.backoff_delay(attempt, payload)
+                            pending.append((key, params, attempt + 1, not_before))
+                        else:
+                            if status == 'retry':
+                                print(f"Abandon de '{key}' après {attempt} tentatives.")
+                            self._count('drops')
+                    if pending:
+                        print(f"File de reprise : {len(pending)} requête(s) à retenter.")
+
+        return {key: results[key] for key in requests_by_key if key in results}
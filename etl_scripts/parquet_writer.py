@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Variables d'environnement de configuration (valeurs par défaut de write_parquet)
+COMPRESSION_ENV = 'WEATHER_PARQUET_COMPRESSION'        # Codec : 'zstd', 'snappy', 'gzip', 'none'...
+COMPRESSION_LEVEL_ENV = 'WEATHER_PARQUET_COMPRESSION_LEVEL'
+ROW_GROUP_SIZE_ENV = 'WEATHER_PARQUET_ROW_GROUP_SIZE'  # Lignes par row group
+
+DEFAULT_COMPRESSION = 'zstd'
+DEFAULT_ROW_GROUP_SIZE = 100_000
+# Tri par défaut : les lignes d'une même ville sont contiguës, ce qui resserre les statistiques
+# min/max des row groups et permet d'ignorer ceux qui sont hors filtre à la lecture
+DEFAULT_SORT_COLUMNS = ['city', 'date']
+
+# Manifeste écrit à côté du fichier : version, nombre de lignes, empreinte du schéma
+MANIFEST_SUFFIX = '.manifest.json'
+
+# Lecture de secours du masque de création de fichiers (os.umask le modifie le temps de la lecture)
+_UMASK_LOCK = threading.Lock()
+
+
+def manifest_path(output_path: str) -> str:
+    return output_path + MANIFEST_SUFFIX
+
+
+def read_manifest(output_path: str) -> dict:
+    """
+    Manifeste d'un fichier écrit par write_parquet, ou None s'il n'existe pas.
+    """
+    path = manifest_path(output_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def schema_hash(schema: pa.Schema) -> str:
+    """
+    Empreinte d'un schéma Arrow (noms, types et nullabilité des colonnes, hors métadonnées).
+    """
+    return hashlib.sha256(schema.remove_metadata().to_string().encode('utf-8')).hexdigest()[:16]
+
+
+def _process_umask() -> int:
+    """
+    Masque de création de fichiers du processus, lu dans /proc/self/status (Linux) sans le modifier.
+    À défaut, il est lu avec os.umask sous verrou.
+    """
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('Umask:'):
+                    return int(line.split()[1], 8)
+    except OSError:
+        pass
+    with _UMASK_LOCK:
+        umask = os.umask(0o022)
+        os.umask(umask)
+    return umask
+
+
+def _temp_path(output_path: str) -> str:
+    """
+    Crée un fichier temporaire unique et caché ('.' en préfixe, ignoré par les lecteurs de datasets Parquet)
+    dans le dossier de destination, pour que le renommage final reste atomique et que deux écritures
+    concurrentes de la même sortie n'utilisent jamais le même fichier temporaire.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(output_path) or '.',
+                                    prefix=f".{os.path.basename(output_path)}.", suffix='.tmp')
+    try:
+        # mkstemp crée le fichier en 0600 : on lui donne les droits qu'aurait produits open()
+        os.fchmod(fd, 0o666 & ~_process_umask())
+    finally:
+        os.close(fd)
+    return tmp_path
+
+
+def _default_compression() -> tuple:
+    codec = os.environ.get(COMPRESSION_ENV, DEFAULT_COMPRESSION)
+    level = os.environ.get(COMPRESSION_LEVEL_ENV)
+    return (None if codec.lower() == 'none' else codec), (int(level) if level else None)
+
+
+def write_parquet(df: pd.DataFrame, output_path: str, sort_by: list = DEFAULT_SORT_COLUMNS,
+                  compression: str = None, compression_level: int = None, use_dictionary=True,
+                  row_group_size: int = None, manifest: bool = True, manifest_fields: dict = None) -> dict:
+    """
+    Écrit un DataFrame en Parquet de façon atomique : le fichier est écrit sous un nom temporaire unique
+    et caché puis renommé, si bien qu'un lecteur voit toujours soit l'ancienne version complète, soit la nouvelle.
+    :param df: DataFrame à écrire (l'index n'est pas écrit).
+    :param output_path: Fichier de destination.
+    :param sort_by: Colonnes de tri (celles absentes de df sont ignorées ; None pour garder l'ordre des lignes).
+    :param compression: Codec (par défaut WEATHER_PARQUET_COMPRESSION, sinon zstd).
+    :param compression_level: Niveau de compression du codec (par défaut WEATHER_PARQUET_COMPRESSION_LEVEL).
+    :param use_dictionary: Encodage dictionnaire : True, False ou liste de colonnes.
+    :param row_group_size: Lignes par row group (par défaut WEATHER_PARQUET_ROW_GROUP_SIZE, sinon 100 000).
+    :param manifest: Écrit le manifeste à côté du fichier (à désactiver dans un dataset partitionné,
+        où un fichier JSON serait pris pour une partition).
+    :param manifest_fields: Champs supplémentaires du manifeste.
+    :return: Manifeste de l'écriture (même s'il n'est pas écrit sur disque).
+    """
+    sort_columns = [col for col in (sort_by or []) if col in df.columns]
+    if sort_columns:
+        df = df.sort_values(sort_columns, kind='stable')
+    default_codec, default_level = _default_compression()
+    codec = compression if compression is not None else default_codec
+    level = compression_level if compression_level is not None else default_level
+    row_group_size = row_group_size or int(os.environ.get(ROW_GROUP_SIZE_ENV, DEFAULT_ROW_GROUP_SIZE))
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    tmp_path = _temp_path(output_path)
+    try:
+        pq.write_table(table, tmp_path, compression=codec, compression_level=level,
+                       use_dictionary=use_dictionary, row_group_size=row_group_size, write_statistics=True)
+        os.replace(tmp_path, output_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    previous = read_manifest(output_path) if manifest else None
+    record = {
+        'version': (previous or {}).get('version', 0) + 1,
+        'written_at': pd.Timestamp.now().isoformat(timespec='seconds'),
+        'rows': table.num_rows,
+        'row_groups': -(-table.num_rows // row_group_size) if table.num_rows else 0,
+        'schema_hash': schema_hash(table.schema),
+        'columns': table.schema.names,
+        'sort_by': sort_columns,
+        'compression': codec,
+        **(manifest_fields or {}),
+    }
+    if manifest:
+        # Le manifeste est écrit après le fichier : une nouvelle version signale des données complètes
+        tmp_manifest = _temp_path(manifest_path(output_path))
+        try:
+            with open(tmp_manifest, 'w') as f:
+                json.dump(record, f, indent=1)
+            os.replace(tmp_manifest, manifest_path(output_path))
+        except Exception:
+            if os.path.exists(tmp_manifest):
+                os.remove(tmp_manifest)
+            raise
+    return record
@@ -0,0 +1,329 @@
+import json
+import os
+import shutil
+import sys
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from extract_data import (
+    AIRFLOW_HOME,
+    CITY_INDEX_PATH,
+    build_city_index,
+    extract_historical_data,
+    extract_json_data,
+    extract_openweather_data,
+    get_selected_city_coords,
+)
+from openweather_client import DEFAULT_API_KEY_CALLS_PER_MINUTE, DEFAULT_RATE_LIMIT_PER_SECOND
+from transform_data import clean_and_transform_data, load_data
+from data_modeling import PROCESSED_DATA_PATH, create_monthly_weather_summary, save_modeled_data
+from rollups import build_rollup_cube, save_rollup_marts
+from instrumentation import set_run_id, stage
+
+# Artefacts intermédiaires d'une exécution : data/artifacts/<date d'exécution>/<nom>.arrow
+ARTIFACTS_PATH = os.path.join(AIRFLOW_HOME, 'data', 'artifacts')
+# Nombre de jours d'artefacts conservés avant la date d'exécution (prune_artifacts)
+ARTIFACTS_RETENTION_DAYS_ENV = 'WEATHER_ARTIFACTS_RETENTION_DAYS'
+DEFAULT_ARTIFACTS_RETENTION_DAYS = 7
+
+JSON_SOURCE_FILE = "all_capitals_weather.json"
+HISTORICAL_SOURCE_FILE = "historical_test.csv"
+
+# Villes interrogées sur l'API OpenWeather (mêmes villes que les blocs de test des scripts)
+DEFAULT_TARGET_CITIES = [
+    "London", "New York", "Tokyo", "Paris", "Berlin", "Sydney",
+    "Rio de Janeiro", "Cairo", "Moscow", "Dubai", "Beijing",
+    "Rome", "Madrid", "Mexico City", "Buenos Aires", "Cape Town",
+    "New Delhi", "Singapore", "Oslo", "Washington"
+]
+
+# Noms des artefacts produits par chaque étape
+SOURCE_ARTIFACTS = ['json_initial', 'openweather_api', 'historical_csv']
+TRANSFORMED_ARTIFACT = 'transformed'
+
+# Découpage de l'extraction en lots (tâches mappées du DAG)
+DEFAULT_CITIES_PER_SHARD = 5
+SHARD_PLAN_FILENAME = '_shards.json'
+
+
+# --- Artefacts Arrow ---
+
+def artifact_path(run_date: str, name: str, artifacts_path: str = ARTIFACTS_PATH) -> str:
+    """
+    Chemin d'un artefact pour une date d'exécution (ex. data/artifacts/2024-05-01/transformed.arrow).
+    """
+    return os.path.join(artifacts_path, run_date, f"{name}.arrow")
+
+
+def write_artifact(df: pd.DataFrame, run_date: str, name: str, artifacts_path: str = ARTIFACTS_PATH) -> str:
+    """
+    Écrit un DataFrame au format Arrow IPC non compressé (lisible par projection mémoire).
+    L'écriture passe par un fichier temporaire : un artefact présent est toujours complet.
+    :param df: DataFrame à persister.
+    :param run_date: Date d'exécution (clé de l'exécution, ex. '{{ ds }}' dans Airflow).
+    :param name: Nom de l'artefact.
+    :param artifacts_path: Dossier racine des artefacts.
+    :return: Chemin de l'artefact écrit.
+    """
+    path = artifact_path(run_date, name, artifacts_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with stage(f'artifact.write.{name}', rows_in=len(df)) as record:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        tmp_path = path + ".tmp"
+        feather.write_feather(table, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, path)
+        record['rows_out'] = table.num_rows
+    print(f"Artefact '{name}' écrit : {len(df)} lignes -> {path}")
+    return path
+
+
+def read_artifact(run_date: str, name: str, artifacts_path: str = ARTIFACTS_PATH) -> pd.DataFrame:
+    """
+    Lit un artefact par projection mémoire (pas de copie du fichier en mémoire avant conversion).
+    :param run_date: Date d'exécution.
+    :param name: Nom de l'artefact.
+    :param artifacts_path: Dossier racine des artefacts.
+    :return: DataFrame, ou None si l'artefact n'existe pas.
+    """
+    path = artifact_path(run_date, name, artifacts_path)
+    if not os.path.exists(path):
+        return None
+    with stage(f'artifact.read.{name}') as record:
+        with pa.memory_map(path, 'r') as source:
+            table = pa.ipc.open_file(source).read_all()
+        df = table.to_pandas()
+        record['rows_out'] = len(df)
+    print(f"Artefact '{name}' lu : {table.num_rows} lignes <- {path}")
+    return df
+
+
+def _artifact_exists(run_date: str, name: str, artifacts_path: str) -> bool:
+    return os.path.exists(artifact_path(run_date, name, artifacts_path))
+
+
+# --- Étapes du pipeline (appelées directement par le DAG) ---
+
+def plan_extract_shards(run_date: str, target_cities: list = None, shard_size: int = DEFAULT_CITIES_PER_SHARD,
+                        artifacts_path: str = ARTIFACTS_PATH) -> list:
+    """
+    Découpe l'extraction en lots indépendants (un lot par source locale, un lot par tranche de villes
+    pour l'API OpenWeather). Le JSON des capitales, qui sert de référence des coordonnées, est extrait ici.
+    Le plan est sauvegardé avec les artefacts pour que l'étape de regroupement retrouve les lots.
+    :param run_date: Date d'exécution.
+    :param target_cities: Villes interrogées sur l'API OpenWeather (par défaut DEFAULT_TARGET_CITIES).
+    :param shard_size: Nombre de villes par lot OpenWeather.
+    :param artifacts_path: Dossier racine des artefacts.
+    :return: Liste de dictionnaires (arguments de run_extract_shard, un par lot).
+    """
+    set_run_id(run_date)
+    target_cities = target_cities or DEFAULT_TARGET_CITIES
+
+    df_json = read_artifact(run_date, 'json_initial', artifacts_path)
+    if df_json is None:
+        df_json = extract_json_data(JSON_SOURCE_FILE)
+        if df_json.empty:
+            raise ValueError(f"Aucune donnée extraite de {JSON_SOURCE_FILE}, impossible de continuer.")
+        write_artifact(df_json, run_date, 'json_initial', artifacts_path)
+
+    city_index = build_city_index(df_json, save_path=CITY_INDEX_PATH)
+    city_coords = get_selected_city_coords(df_json, target_cities, city_index=city_index)
+
+    shards = [{'run_date': run_date, 'source': 'historical_csv', 'shard_id': 0, 'city_coords': {}, 'shard_count': 1}]
+    city_names = list(city_coords)
+    shard_starts = range(0, len(city_names), shard_size)
+    for shard_id, start in enumerate(shard_starts):
+        shard_cities = city_names[start:start + shard_size]
+        shards.append({
+            'run_date': run_date,
+            'source': 'openweather_api',
+            'shard_id': shard_id,
+            'city_coords': {name: city_coords[name] for name in shard_cities},
+            'shard_count': len(shard_starts),
+        })
+
+    plan_path = os.path.join(artifacts_path, run_date, SHARD_PLAN_FILENAME)
+    with open(plan_path + ".tmp", 'w') as f:
+        json.dump(shards, f, indent=1)
+    os.replace(plan_path + ".tmp", plan_path)
+    print(f"Plan d'extraction : {len(shards)} lots ({len(city_names)} villes, {shard_size} villes par lot).")
+    return shards
+
+
+def _shard_artifact_name(source: str, shard_id: int) -> str:
+    return f"{source}.part-{shard_id:03d}"
+
+
+def run_extract_shard(run_date: str, source: str, shard_id: int, city_coords: dict = None,
+                      shard_count: int = 1, api_key: str = None, artifacts_path: str = ARTIFACTS_PATH) -> str:
+    """
+    Extrait un lot du plan et le persiste comme artefact partiel (tâche mappée du DAG).
+    Un lot déjà extrait pour `run_date` n'est pas ré-extrait (relance de tâche).
+    Les lots OpenWeather pouvant s'exécuter en parallèle dans des processus distincts (un seau de jetons
+    par processus), chacun ne dispose que de 1/`shard_count` du budget de la clé API et du débit de l'hôte.
+    :param run_date: Date d'exécution.
+    :param source: Source du lot ('openweather_api' ou 'historical_csv').
+    :param shard_id: Numéro du lot dans sa source.
+    :param city_coords: Coordonnées des villes du lot (lots OpenWeather).
+    :param shard_count: Nombre de lots de la source dans le plan.
+    :param api_key: Clé API OpenWeather (par défaut la variable d'environnement OPENWEATHER_API_KEY).
+    :param artifacts_path: Dossier racine des artefacts.
+    :return: Chemin de l'artefact partiel.
+    """
+    set_run_id(run_date)
+    name = _shard_artifact_name(source, shard_id)
+    if _artifact_exists(run_date, name, artifacts_path):
+        print(f"Lot '{name}' déjà extrait pour {run_date}, extraction ignorée.")
+        return artifact_path(run_date, name, artifacts_path)
+
+    if source == 'historical_csv':
+        df_shard = extract_historical_data(HISTORICAL_SOURCE_FILE)
+    elif source == 'openweather_api':
+        api_key = api_key or os.getenv("OPENWEATHER_API_KEY")
+        if city_coords and api_key:
+            shard_count = max(1, int(shard_count))
+            df_shard = extract_openweather_data(
+                city_coords, api_key,
+                rate_limit_per_second=DEFAULT_RATE_LIMIT_PER_SECOND / shard_count,
+                api_key_calls_per_minute=DEFAULT_API_KEY_CALLS_PER_MINUTE / shard_count,
+            )
+        else:
+            print(f"Clé API ou coordonnées manquantes : aucune donnée OpenWeather extraite pour le lot {shard_id}.")
+            df_shard = pd.DataFrame()
+    else:
+        raise ValueError(f"Source de lot inconnue : {source}")
+    return write_artifact(df_shard, run_date, name, artifacts_path)
+
+
+def combine_extract_shards(run_date: str, artifacts_path: str = ARTIFACTS_PATH) -> dict:
+    """
+    Regroupe les artefacts partiels de chaque source en un artefact par source (étape de regroupement).
+    :param run_date: Date d'exécution.
+    :param artifacts_path: Dossier racine des artefacts.
+    :return: Dictionnaire {source: chemin de l'artefact}.
+    """
+    set_run_id(run_date)
+    with open(os.path.join(artifacts_path, run_date, SHARD_PLAN_FILENAME), 'r') as f:
+        shards = json.load(f)
+
+    for source in SOURCE_ARTIFACTS:
+        names = [_shard_artifact_name(source, shard['shard_id']) for shard in shards if shard['source'] == source]
+        if not names:
+            if not _artifact_exists(run_date, source, artifacts_path):
+                write_artifact(pd.DataFrame(), run_date, source, artifacts_path)
+            continue
+        parts = [read_artifact(run_date, name, artifacts_path) for name in names]
+        missing = [name for name, part in zip(names, parts) if part is None]
+        if missing:
+            raise FileNotFoundError(f"Lots d'extraction manquants pour {run_date} : {missing}.")
+        parts = [part for part in parts if not part.empty]
+        write_artifact(pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(),
+                       run_date, source, artifacts_path)
+
+    return {name: artifact_path(run_date, name, artifacts_path) for name in SOURCE_ARTIFACTS}
+
+
+def run_extract(run_date: str, target_cities: list = None, api_key: str = None,
+                shard_size: int = DEFAULT_CITIES_PER_SHARD, artifacts_path: str = ARTIFACTS_PATH) -> dict:
+    """
+    Exécute toute l'extraction dans le processus courant (plan, lots puis regroupement).
+    Le DAG exécute les mêmes étapes, les lots étant répartis entre les workers.
+    :param run_date: Date d'exécution.
+    :param target_cities: Villes interrogées sur l'API OpenWeather (par défaut DEFAULT_TARGET_CITIES).
+    :param api_key: Clé API OpenWeather (par défaut la variable d'environnement OPENWEATHER_API_KEY).
+    :param shard_size: Nombre de villes par lot OpenWeather.
+    :param artifacts_path: Dossier racine des artefacts.
+    :return: Dictionnaire {source: chemin de l'artefact}.
+    """
+    for shard in plan_extract_shards(run_date, target_cities, shard_size, artifacts_path):
+        # Lots exécutés l'un après l'autre dans ce processus : ils partagent les mêmes seaux, sans division du budget
+        run_extract_shard(api_key=api_key, artifacts_path=artifacts_path, **{**shard, 'shard_count': 1})
+    return combine_extract_shards(run_date, artifacts_path)
+
+
+def run_transform(run_date: str, compact: bool = False, artifacts_path: str = ARTIFACTS_PATH) -> str:
+    """
+    Unifie les sources extraites pour `run_date` (lues depuis leurs artefacts) et persiste le résultat.
+    :param run_date: Date d'exécution.
+    :param compact: Représentation compacte (catégories, float32).
+    :param artifacts_path: Dossier racine des artefacts.
+    :return: Chemin de l'artefact transformé.
+    """
+    set_run_id(run_date)
+    frames = {name: read_artifact(run_date, name, artifacts_path) for name in SOURCE_ARTIFACTS}
+    missing = [name for name, df in frames.items() if df is None]
+    if missing:
+        raise FileNotFoundError(f"Artefacts d'extraction manquants pour {run_date} : {missing}. "
+                                "Exécutez d'abord l'étape d'extraction.")
+
+    df_transformed = clean_and_transform_data(
+        df_json=frames['json_initial'],
+        df_openweather=frames['openweather_api'],
+        df_historical=frames['historical_csv'],
+        compact=compact,
+    )
+    if df_transformed.empty:
+        raise ValueError(f"Le DataFrame transformé est vide pour {run_date}.")
+    load_data(df_transformed)
+    return write_artifact(df_transformed, run_date, TRANSFORMED_ARTIFACT, artifacts_path)
+
+
+def run_modeling(run_date: str, artifacts_path: str = ARTIFACTS_PATH) -> str:
+    """
+    Construit le résumé mensuel et les marts multi-grains à partir de l'artefact transformé.
+    :param run_date: Date d'exécution.
+    :param artifacts_path: Dossier racine des artefacts.
+    :return: Chemin du fichier modélisé.
+    """
+    set_run_id(run_date)
+    df_transformed = read_artifact(run_date, TRANSFORMED_ARTIFACT, artifacts_path)
+    if df_transformed is None:
+        raise FileNotFoundError(f"Artefact transformé manquant pour {run_date}. "
+                                "Exécutez d'abord l'étape de transformation.")
+
+    df_monthly_summary = create_monthly_weather_summary(df_transformed)
+    if df_monthly_summary.empty:
+        raise ValueError(f"Le résumé mensuel est vide pour {run_date}.")
+    save_modeled_data(df_monthly_summary)
+    save_rollup_marts(build_rollup_cube(df_transformed))
+    return os.path.join(PROCESSED_DATA_PATH, 'modeled_weather_data.parquet')
+
+
+def prune_artifacts(run_date: str, keep_days: int = None, artifacts_path: str = ARTIFACTS_PATH) -> list:
+    """
+    Supprime les dossiers d'artefacts des exécutions antérieures de plus de `keep_days` jours à `run_date`.
+    Les dossiers dont le nom n'est pas une date (AAAA-MM-JJ) et ceux des exécutions postérieures sont conservés.
+    :param run_date: Date d'exécution.
+    :param keep_days: Jours conservés (par défaut WEATHER_ARTIFACTS_RETENTION_DAYS, sinon 7).
+    :param artifacts_path: Dossier racine des artefacts.
+    :return: Liste des dates d'exécution supprimées.
+    """
+    if keep_days is None:
+        keep_days = int(os.environ.get(ARTIFACTS_RETENTION_DAYS_ENV, DEFAULT_ARTIFACTS_RETENTION_DAYS))
+    if not os.path.isdir(artifacts_path):
+        return []
+    cutoff = pd.Timestamp(run_date) - pd.Timedelta(days=keep_days)
+    removed = []
+    for name in sorted(os.listdir(artifacts_path)):
+        run_dir = os.path.join(artifacts_path, name)
+        try:
+            run_day = pd.to_datetime(name, format='%Y-%m-%d')
+        except ValueError:
+            continue
+        if os.path.isdir(run_dir) and run_day < cutoff:
+            shutil.rmtree(run_dir, ignore_errors=True)
+            removed.append(name)
+    print(f"{len(removed)} dossier(s) d'artefacts antérieur(s) au {cutoff.strftime('%Y-%m-%d')} supprimé(s).")
+    return removed
+
+
+# --- Exécution locale : `python pipeline.py 2024-05-01` ---
+if __name__ == "__main__":
+    run_date = sys.argv[1] if len(sys.argv) > 1 else pd.Timestamp.today().strftime('%Y-%m-%d')
+    print(f"--- Démarrage du pipeline pour {run_date} ---")
+    run_extract(run_date)
+    run_transform(run_date)
+    run_modeling(run_date)
+    prune_artifacts(run_date)
+    print(f"\n--- Fin du pipeline pour {run_date} ---")
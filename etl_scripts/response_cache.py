@@ -0,0 +1,209 @@
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+# --- Configuration du cache de réponses ---
+DEFAULT_TTL_SECONDS = 600              # OpenWeather rafraîchit ses observations environ toutes les 10 minutes
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024   # Taille maximale du cache sur disque (LRU au-delà)
+INDEX_FILENAME = "index.json"
+INDEX_LOCK_FILENAME = "index.lock"
+
+
+class ResponseCache:
+    """
+    Cache disque des réponses OpenWeather, indexé par (lat, lon, units).
+    Une entrée est considérée fraîche pendant `ttl_seconds` à partir du plus récent de : l'horodatage `dt`
+    de l'observation renvoyé par l'API, la date de téléchargement de la réponse et celle de sa dernière
+    revalidation. Une observation déjà ancienne au moment du téléchargement (l'API n'en a pas de plus récente)
+    n'est donc pas redemandée lors d'une nouvelle exécution rapprochée.
+    Au-delà, la requête est revalidée avec ETag / If-Modified-Since lorsque le serveur les fournit.
+    La taille est plafonnée avec une éviction LRU.
+    Plusieurs processus (lots d'extraction parallèles) peuvent partager le même dossier : l'index est fusionné
+    avec celui du disque, sous verrou de fichier, à chaque sauvegarde.
+    """
+
+    def __init__(self, cache_dir: str, ttl_seconds: float = DEFAULT_TTL_SECONDS, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        :param cache_dir: Dossier de stockage des réponses et de l'index.
+        :param ttl_seconds: Durée de validité d'une entrée (voir is_fresh).
+        :param max_bytes: Taille maximale cumulée des réponses conservées.
+        """
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'bytes_saved': 0}
+        self._lock = threading.Lock()
+        self._evicted = set()  # Clés évincées depuis le chargement (à ne pas réintroduire lors de la fusion)
+        os.makedirs(cache_dir, exist_ok=True)
+        self._index = self._load_index()
+
+    # --- Index et fichiers ---
+
+    def _index_path(self) -> str:
+        return os.path.join(self.cache_dir, INDEX_FILENAME)
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self._index_path(), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_index(self):
+        """
+        Écrit l'index sur disque (à appeler en fin d'exécution).
+        Sous verrou exclusif du fichier index.lock, l'index du disque est relu et fusionné avec celui
+        du processus (pour une même clé, l'entrée la plus récemment utilisée l'emporte), le plafond
+        de taille est appliqué à l'ensemble, puis l'index est remplacé de façon atomique.
+        """
+        with self._lock, open(os.path.join(self.cache_dir, INDEX_LOCK_FILENAME), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                merged = {key: entry for key, entry in self._load_index().items() if key not in self._evicted}
+                for key, entry in self._index.items():
+                    if key not in merged or entry.get('last_access', 0) >= merged[key].get('last_access', 0):
+                        merged[key] = entry
+                self._index = merged
+                self._evict_locked()
+                self._evicted.clear()
+                fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.index.', suffix='.tmp')
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(self._index, f)
+                os.replace(tmp_path, self._index_path())
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def make_key(lat, lon, units: str = 'metric') -> str:
+        """
+        Calcule la clé de cache d'une requête (coordonnées arrondies à 4 décimales).
+        """
+        raw_key = f"{float(lat):.4f},{float(lon):.4f},{units}"
+        return hashlib.sha1(raw_key.encode('utf-8')).hexdigest()
+
+    # --- Lecture / écriture ---
+
+    def lookup(self, params: dict):
+        """
+        Recherche l'entrée correspondant aux paramètres de requête.
+        :param params: Paramètres de la requête (lat, lon, units).
+        :return: Tuple (clé, métadonnées de l'entrée ou None).
+        """
+        key = self.make_key(params['lat'], params['lon'], params.get('units', 'metric'))
+        with self._lock:
+            entry = self._index.get(key)
+        if entry is not None and not os.path.exists(self._entry_path(key)):
+            entry = None
+        return key, entry
+
+    def is_fresh(self, entry: dict) -> bool:
+        """
+        Indique si l'observation en cache est encore valide d'après le plus récent de son horodatage `dt`,
+        de sa date de téléchargement (`stored_at`) et de sa dernière revalidation (réponse 304).
+        """
+        timestamps = [value for value in (entry.get('dt'), entry.get('stored_at'), entry.get('validated_at'))
+                      if value is not None]
+        return bool(timestamps) and time.time() < max(timestamps) + self.ttl_seconds
+
+    def conditional_headers(self, entry: dict) -> dict:
+        """
+        Construit les en-têtes de revalidation (If-None-Match / If-Modified-Since) pour une entrée.
+        """
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def read(self, key: str, revalidated: bool = False) -> dict:
+        """
+        Lit la réponse en cache, met à jour l'ordre LRU et les statistiques.
+        Une entrée revalidée redevient fraîche pour `ttl_seconds` à partir de maintenant.
+        :param key: Clé de l'entrée.
+        :param revalidated: True si le serveur a confirmé l'entrée (réponse 304).
+        :return: Réponse JSON décodée, ou None si le fichier est illisible.
+        """
+        try:
+            with open(self._entry_path(key), 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is not None:
+                entry['last_access'] = time.time()
+                if revalidated:
+                    entry['validated_at'] = entry['last_access']
+                self.stats['bytes_saved'] += entry.get('size', 0)
+            self.stats['revalidated' if revalidated else 'hits'] += 1
+        return data
+
+    def store(self, key: str, body: bytes, data: dict, etag: str = None, last_modified: str = None):
+        """
+        Enregistre une réponse et applique le plafond de taille (éviction LRU).
+        :param key: Clé de l'entrée.
+        :param body: Corps brut de la réponse HTTP.
+        :param data: Réponse JSON décodée (pour lire `dt`).
+        :param etag: En-tête ETag renvoyé par le serveur.
+        :param last_modified: En-tête Last-Modified renvoyé par le serveur.
+        """
+        tmp_path = self._entry_path(key) + f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, self._entry_path(key))
+        with self._lock:
+            now = time.time()
+            self._index[key] = {
+                'dt': data.get('dt'),
+                'stored_at': now,
+                'etag': etag,
+                'last_modified': last_modified,
+                'size': len(body),
+                'last_access': now,
+            }
+            self._evicted.discard(key)
+            self.stats['stores'] += 1
+            self._evict_locked()
+
+    def record_miss(self):
+        with self._lock:
+            self.stats['misses'] += 1
+
+    def _evict_locked(self):
+        total_bytes = sum(entry.get('size', 0) for entry in self._index.values())
+        if total_bytes <= self.max_bytes:
+            return
+        for key, entry in sorted(self._index.items(), key=lambda item: item[1].get('last_access', 0)):
+            if total_bytes <= self.max_bytes:
+                break
+            total_bytes -= entry.get('size', 0)
+            del self._index[key]
+            self._evicted.add(key)
+            try:
+                os.remove(self._entry_path(key))
+            except OSError:
+                pass
+            self.stats['evictions'] += 1
+
+    # --- Statistiques ---
+
+    def report(self) -> dict:
+        """
+        Retourne les statistiques du cache, taux de succès inclus.
+        :return: Dictionnaire des compteurs, de `hit_rate` et de la taille actuelle du cache.
+        """
+        with self._lock:
+            report = dict(self.stats)
+            lookups = report['hits'] + report['revalidated'] + report['misses']
+            report['hit_rate'] = (report['hits'] + report['revalidated']) / lookups if lookups else 0.0
+            report['entries'] = len(self._index)
+            report['cache_bytes'] = sum(entry.get('size', 0) for entry in self._index.values())
+        return report
@@ -0,0 +1,120 @@
+import os
+
+import pandas as pd
+
+from instrumentation import instrumented
+from parquet_writer import write_parquet
+from data_modeling import PARTIALS_MERGE_AGG, PROCESSED_DATA_PATH, finalize_measures, partial_measures
+
+MARTS_PATH = os.path.join(PROCESSED_DATA_PATH, 'marts')
+
+# Treillis des grains : temps (jour -> semaine, jour -> mois -> année) x espace (ville -> pays)
+TIME_GRAINS = ['day', 'week', 'month', 'year']
+# Grain dont chaque grain temporel est dérivé : une semaine peut chevaucher deux mois ou deux années,
+# les mois et les années ne peuvent donc pas être obtenus à partir des semaines
+TIME_GRAIN_PARENTS = {'week': 'day', 'month': 'day', 'year': 'month'}
+SPATIAL_GRAINS = {
+    'city': ['city', 'country'],
+    'country': ['country'],
+}
+
+
+def _period_start(dates: pd.Series, time_grain: str) -> pd.Series:
+    """
+    Début de la période contenant chaque date (semaine ISO commençant le lundi).
+    """
+    if time_grain == 'day':
+        return dates
+    if time_grain == 'week':
+        return dates - pd.to_timedelta(dates.dt.weekday, unit='D')
+    if time_grain == 'month':
+        return dates.dt.to_period('M').dt.start_time
+    if time_grain == 'year':
+        return dates.dt.to_period('Y').dt.start_time
+    raise ValueError(f"Grain temporel inconnu : {time_grain}")
+
+
+def _rollup(partials: pd.DataFrame, keys: list) -> pd.DataFrame:
+    return partials.groupby(keys, observed=True).agg(PARTIALS_MERGE_AGG).reset_index()
+
+
+@instrumented('aggregate.rollup_cube')
+def build_rollup_cube(df: pd.DataFrame) -> dict:
+    """
+    Calcule tous les grains du treillis en une seule passe sur les données quotidiennes :
+    les agrégats partiels (ville, jour) sont calculés une fois, puis chaque grain plus grossier
+    est obtenu en fusionnant les partiels de son grain parent (TIME_GRAIN_PARENTS).
+    :param df: DataFrame des données météorologiques unifiées.
+    :return: Dictionnaire {(grain temporel, grain spatial): DataFrame du mart}.
+    """
+    df = df.dropna(subset=['date'])
+    if df.empty:
+        return {}
+
+    # Seule passe sur les lignes brutes : grain (ville, jour)
+    day_partials = pd.concat([
+        pd.DataFrame({
+            'city': df['city'],
+            'country': df['country'],
+            'period_start': df['date'].dt.floor('D'),
+        }, index=df.index),
+        partial_measures(df),
+    ], axis=1)
+    city_partials = {'day': _rollup(day_partials, SPATIAL_GRAINS['city'] + ['period_start'])}
+
+    cube_partials = {}
+    for time_grain in TIME_GRAINS:
+        if time_grain != 'day':
+            parent = city_partials[TIME_GRAIN_PARENTS[time_grain]]
+            city_partials[time_grain] = _rollup(
+                parent.assign(period_start=_period_start(parent['period_start'], time_grain)),
+                SPATIAL_GRAINS['city'] + ['period_start'],
+            )
+        cube_partials[(time_grain, 'city')] = city_partials[time_grain]
+        cube_partials[(time_grain, 'country')] = _rollup(city_partials[time_grain],
+                                                         SPATIAL_GRAINS['country'] + ['period_start'])
+
+    cube = {}
+    for (time_grain, spatial_grain), partials in cube_partials.items():
+        keys = partials[SPATIAL_GRAINS[spatial_grain] + ['period_start']]
+        cube[(time_grain, spatial_grain)] = pd.concat([keys, finalize_measures(partials)], axis=1)
+    return cube
+
+
+def _compact_mart(mart: pd.DataFrame) -> pd.DataFrame:
+    """
+    Types compacts pour un mart : dimensions en catégories, mesures en float32, compteurs en int32.
+    """
+    compact = mart.copy()
+    for col in ['city', 'country']:
+        if col in compact.columns:
+            compact[col] = compact[col].astype('category')
+    for col in ['avg_temp_celsius', 'total_precipitation_mm', 'max_wind_kph', 'avg_humidity_percent']:
+        compact[col] = compact[col].astype('float32')
+    compact['num_rainy_days'] = compact['num_rainy_days'].astype('int32')
+    return compact
+
+
+def mart_path(time_grain: str, spatial_grain: str, marts_path: str = MARTS_PATH) -> str:
+    """
+    Chemin du fichier Parquet d'un grain du treillis (ex. marts/weather_week_city.parquet).
+    """
+    return os.path.join(marts_path, f"weather_{time_grain}_{spatial_grain}.parquet")
+
+
+@instrumented('save.marts')
+def save_rollup_marts(cube: dict, marts_path: str = MARTS_PATH) -> list:
+    """
+    Sauvegarde chaque grain du treillis dans son propre fichier Parquet compact.
+    :param cube: Sortie de build_rollup_cube.
+    :param marts_path: Dossier de destination.
+    :return: Liste des chemins écrits.
+    """
+    os.makedirs(marts_path, exist_ok=True)
+    written = []
+    for (time_grain, spatial_grain), mart in cube.items():
+        output_path = mart_path(time_grain, spatial_grain, marts_path)
+        write_parquet(_compact_mart(mart), output_path, sort_by=['city', 'country', 'period_start'])
+        written.append(output_path)
+        print(f"Mart '{time_grain} x {spatial_grain}' sauvegardé : {len(mart)} lignes -> {output_path}")
+    return written
@@ -0,0 +1,328 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# --- Schéma unifié (ordre final des colonnes et types cibles) ---
+UNIFIED_DTYPES = {
+    'city': 'object',
+    'date': 'datetime64[ns]',
+    'source': 'object',
+    'country': 'object',
+    'latitude': 'float64',
+    'longitude': 'float64',
+    'temp_celsius': 'float64',
+    'feels_like_celsius': 'float64',
+    'humidity_percent': 'float64',
+    'pressure_mb': 'float64',
+    'wind_kph': 'float64',
+    'precipitation_mm': 'float64',
+    'cloud_percent': 'float64',
+    'visibility_km': 'float64',
+    'uv_index': 'float64',
+    'weather_condition': 'object',
+}
+UNIFIED_COLUMNS = list(UNIFIED_DTYPES.keys())
+NUMERIC_COLUMNS = [col for col, dtype in UNIFIED_DTYPES.items() if dtype == 'float64']
+# Mesures lues en float32 en mode compact (les coordonnées restent en float64)
+MEASURE_COLUMNS = [col for col in NUMERIC_COLUMNS if col not in ('latitude', 'longitude')]
+COMPACT_MEASURE_DTYPE = 'float32'
+
+# --- Conversions d'unités disponibles pour les sources ---
+UNIT_CONVERSIONS = {
+    'm/s->km/h': lambda values: values * 3.6,
+    'm->km': lambda values: values / 1000,
+    'fahrenheit->celsius': lambda values: (values - 32) * 5 / 9,
+}
+
+# --- Registre déclaratif des sources ---
+# Pour chaque source :
+#   columns     : {colonne source: colonne unifiée}
+#   conversions : {colonne unifiée: nom de conversion dans UNIT_CONVERSIONS}
+#   defaults    : {colonne unifiée: valeur utilisée quand la source ne fournit pas la colonne}
+#   read_dtypes : types appliqués à la lecture du fichier brut (extract_data) ; les mesures restent en float64
+#                 et ne sont lues en float32 qu'en mode compact (voir source_read_dtypes)
+SOURCE_SCHEMAS = {
+    'json_initial': {
+        'label': 'JSON',
+        'columns': {
+            'location_name': 'city',
+            'country': 'country',
+            'last_updated': 'date',
+            'temperature_celsius': 'temp_celsius',
+            'feels_like_celsius': 'feels_like_celsius',
+            'humidity': 'humidity_percent',
+            'pressure_mb': 'pressure_mb',
+            'wind_kph': 'wind_kph',
+            'precip_mm': 'precipitation_mm',
+            'cloud': 'cloud_percent',
+            'visibility_km': 'visibility_km',
+            'uv_index': 'uv_index',
+            'condition_text': 'weather_condition',
+            'latitude': 'latitude',
+            'longitude': 'longitude',
+        },
+        'conversions': {},
+        'defaults': {},
+        'read_dtypes': {
+            'location_name': 'category',
+            'country': 'category',
+            'last_updated': 'datetime64[ns]',
+            'temperature_celsius': 'float64',
+            'feels_like_celsius': 'float64',
+            'humidity': 'float64',
+            'pressure_mb': 'float64',
+            'wind_kph': 'float64',
+            'precip_mm': 'float64',
+            'cloud': 'float64',
+            'visibility_km': 'float64',
+            'uv_index': 'float64',
+            'condition_text': 'category',
+            'latitude': 'float64',
+            'longitude': 'float64',
+        },
+    },
+    'openweather_api': {
+        'label': 'OpenWeather',
+        # Le vent (m/s -> km/h) et la visibilité (m -> km) sont déjà convertis par l'extracteur
+        'columns': {
+            'location_name': 'city',
+            'last_updated': 'date',
+            'temperature_celsius': 'temp_celsius',
+            'feels_like_celsius': 'feels_like_celsius',
+            'humidity': 'humidity_percent',
+            'pressure_mb': 'pressure_mb',
+            'wind_kph': 'wind_kph',
+            'precip_mm': 'precipitation_mm',
+            'cloud': 'cloud_percent',
+            'visibility_km': 'visibility_km',
+            'condition_text': 'weather_condition',
+            'latitude': 'latitude',
+            'longitude': 'longitude',
+        },
+        'conversions': {},
+        'defaults': {'uv_index': 0.0},  # L'endpoint météo actuelle ne fournit pas l'indice UV
+        'read_dtypes': {},
+    },
+    'historical_csv': {
+        'label': 'Historique',
+        'columns': {
+            'Date': 'date',
+            'City': 'city',
+            'Temperature_Celsius': 'temp_celsius',
+            'Precipitation_mm': 'precipitation_mm',
+        },
+        'conversions': {},
+        'defaults': {'uv_index': 0.0},
+        'read_dtypes': {
+            'City': 'category',
+            'Temperature_Celsius': 'float64',
+            'Precipitation_mm': 'float64',
+        },
+        'date_columns': ['Date'],
+    },
+}
+
+
+def source_read_dtypes(source: str, compact: bool = False) -> dict:
+    """
+    Types de lecture d'une source brute : ceux du registre, avec les mesures en float32 en mode compact.
+    Hors mode compact, les valeurs lues sont celles du fichier (pas d'arrondi float32 élargi ensuite en float64).
+    :param source: Clé de SOURCE_SCHEMAS.
+    :param compact: Lecture compacte des mesures (float32).
+    :return: Dictionnaire {colonne source: dtype}.
+    """
+    schema = SOURCE_SCHEMAS[source]
+    if not compact:
+        return dict(schema['read_dtypes'])
+    return {
+        col: COMPACT_MEASURE_DTYPE if schema['columns'].get(col) in MEASURE_COLUMNS else dtype
+        for col, dtype in schema['read_dtypes'].items()
+    }
+
+
+def _source_values(df: pd.DataFrame, src_col: str, target_col: str, conversion: str, valid: np.ndarray):
+    """
+    Extrait les valeurs d'une colonne source au type de la colonne unifiée (lignes valides uniquement).
+    """
+    series = df[src_col]
+    if UNIFIED_DTYPES[target_col] == 'float64':
+        values = pd.to_numeric(series, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)[valid]
+        if conversion:
+            values = UNIT_CONVERSIONS[conversion](values)
+        return values
+    values = series.to_numpy(dtype=object)[valid]
+    return values
+
+
+def _parse_dates(series: pd.Series) -> np.ndarray:
+    """
+    Convertit une colonne de dates au jour près (datetime64[ns] sans fuseau, heure locale conservée).
+    """
+    dates = pd.to_datetime(series, errors='coerce')
+    if getattr(dates.dt, 'tz', None) is not None:
+        dates = dates.dt.tz_localize(None)
+    return dates.dt.floor('D').to_numpy(dtype='datetime64[ns]')
+
+
+def project_sources(frames: dict) -> pd.DataFrame:
+    """
+    Projette chaque source dans la disposition unifiée en une seule passe.
+    Les colonnes du résultat sont préallouées pour le total des lignes valides, puis chaque source
+    remplit sa plage : pas de copie par colonne ni de concaténation de DataFrames fragmentés.
+    :param frames: Dictionnaire ordonné {nom de source (clé de SOURCE_SCHEMAS): DataFrame brut}.
+    :return: DataFrame au schéma UNIFIED_COLUMNS (lignes sans date valide écartées).
+    """
+    plans = []
+    for source, df in frames.items():
+        schema = SOURCE_SCHEMAS[source]
+        label = schema['label']
+        print(f"Traitement du DataFrame {label}...")
+        if df is None or df.empty:
+            print(f"DataFrame {label} d'entrée est vide. Aucune transformation effectuée pour {label}.")
+            continue
+
+        mapping = {src: dst for src, dst in schema['columns'].items() if src in df.columns}
+        missing_cols = [src for src in schema['columns'] if src not in df.columns]
+        if missing_cols:
+            print(f"AVERTISSEMENT : Colonnes {label} attendues mais manquantes dans le DataFrame source : {missing_cols}")
+        date_col = next((src for src, dst in mapping.items() if dst == 'date'), None)
+        if date_col is None:
+            print(f"Aucune colonne de date trouvée pour {label}. Aucune transformation effectuée.")
+            continue
+
+        dates = _parse_dates(df[date_col])
+        valid = ~np.isnat(dates)
+        plans.append((source, df, mapping, dates[valid], valid, int(valid.sum())))
+        print(f"DataFrame {label} projeté : {int(valid.sum())} lignes, colonnes : {list(mapping.values())}")
+
+    total_rows = sum(plan[-1] for plan in plans)
+
+    # Préallocation de la disposition unifiée
+    columns = {}
+    for col, dtype in UNIFIED_DTYPES.items():
+        if dtype == 'float64':
+            columns[col] = np.full(total_rows, np.nan, dtype='float64')
+        elif dtype == 'datetime64[ns]':
+            columns[col] = np.full(total_rows, np.datetime64('NaT'), dtype='datetime64[ns]')
+        else:
+            columns[col] = np.full(total_rows, None, dtype=object)
+
+    offset = 0
+    for source, df, mapping, dates, valid, n_rows in plans:
+        schema = SOURCE_SCHEMAS[source]
+        rows = slice(offset, offset + n_rows)
+        columns['date'][rows] = dates
+        columns['source'][rows] = source
+        for src_col, target_col in mapping.items():
+            if target_col == 'date':
+                continue
+            columns[target_col][rows] = _source_values(
+                df, src_col, target_col, schema['conversions'].get(target_col), valid
+            )
+        for target_col, default in schema['defaults'].items():
+            if target_col not in mapping.values():
+                columns[target_col][rows] = default
+        offset += n_rows
+
+    return pd.DataFrame(columns, columns=UNIFIED_COLUMNS)
+
+
+# --- Représentation compacte du DataFrame unifié ---
+COMPACT_DTYPES = {
+    'city': 'category',
+    'source': 'category',
+    'country': 'category',
+    'weather_condition': 'category',
+    'latitude': 'float64',
+    'longitude': 'float64',
+    'temp_celsius': 'float64',
+    'feels_like_celsius': 'float64',
+    'humidity_percent': 'float64',
+    'pressure_mb': 'float64',
+    'wind_kph': 'float64',
+    'precipitation_mm': 'float64',
+    'cloud_percent': 'float64',
+    'visibility_km': 'float64',
+    'uv_index': 'float64',
+    'is_rainy_day': 'int8',
+}
+# Disposition historique (chaînes Python, float64, int64), utilisée comme référence du rapport mémoire
+LEGACY_DTYPES = {
+    col: ('object' if dtype == 'category' else 'int64' if dtype == 'int8' else 'float64')
+    for col, dtype in COMPACT_DTYPES.items()
+}
+
+
+def load_category_dictionary(path: str) -> dict:
+    """
+    Charge le dictionnaire partagé des catégories ({colonne: [valeurs]}).
+    :param path: Chemin du fichier JSON.
+    :return: Dictionnaire (contenant au moins les sources connues).
+    """
+    dictionary = {'source': list(SOURCE_SCHEMAS.keys())}
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            dictionary.update(json.load(f))
+    return dictionary
+
+
+def save_category_dictionary(dictionary: dict, path: str):
+    """
+    Sauvegarde le dictionnaire partagé des catégories.
+    :param dictionary: Dictionnaire {colonne: [valeurs]}.
+    :param path: Chemin du fichier JSON.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(dictionary, f, indent=1, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def compact_frame(df: pd.DataFrame, category_dictionary: dict = None) -> pd.DataFrame:
+    """
+    Convertit le DataFrame unifié en représentation compacte : catégories, float32 et int8.
+    Si un dictionnaire de catégories est fourni, les nouvelles valeurs y sont ajoutées à la fin :
+    l'ordre (et donc les codes) des valeurs existantes reste stable d'une exécution à l'autre,
+    et toutes les partitions partagent le même dictionnaire.
+    :param df: DataFrame unifié.
+    :param category_dictionary: Dictionnaire {colonne: [valeurs]} mis à jour sur place.
+    :return: DataFrame compact (nouvel objet).
+    """
+    compact = {}
+    for col in df.columns:
+        dtype = COMPACT_DTYPES.get(col)
+        if dtype is None:
+            compact[col] = df[col]
+        elif dtype == 'category':
+            values = df[col].astype(object)
+            if category_dictionary is not None:
+                known = category_dictionary.setdefault(col, [])
+                known_set = set(known)
+                known.extend(sorted(str(v) for v in values.dropna().unique() if str(v) not in known_set))
+                categories = known
+            else:
+                categories = sorted(values.dropna().unique())
+            compact[col] = pd.Categorical(values, categories=categories)
+        else:
+            compact[col] = df[col].astype(dtype)
+    return pd.DataFrame(compact, index=df.index)
+
+
+def memory_report(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compare l'empreinte mémoire du DataFrame avec la disposition historique (chaînes, float64, int64).
+    :param df: DataFrame unifié (compact ou non).
+    :return: DataFrame par colonne (octets actuels, octets historiques, ratio), avec une ligne TOTAL.
+    """
+    legacy_dtypes = {col: dtype for col, dtype in LEGACY_DTYPES.items() if col in df.columns}
+    legacy = df.astype(legacy_dtypes)
+    report = pd.DataFrame({
+        'dtype': df.dtypes.astype(str),
+        'bytes': df.memory_usage(deep=True, index=False),
+        'legacy_bytes': legacy.memory_usage(deep=True, index=False),
+    })
+    report.loc['TOTAL'] = ['', report['bytes'].sum(), report['legacy_bytes'].sum()]
+    report['ratio'] = report['bytes'] / report['legacy_bytes']
+    return report
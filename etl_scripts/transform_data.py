@@ -1,8 +1,31 @@
 import pandas as pd
-import numpy as np
+import json
 import os
+import shutil
+import sys
 from datetime import datetime
 
+from backends import resolve_backend, unify_with_duckdb
+from city_index import CityIndex
+from imputation import (
+    DEFAULT_FALLBACK_HIERARCHY,
+    apply_climatology,
+    build_climatology,
+    load_climatology,
+    save_climatology,
+)
+from instrumentation import instrumented, preview, stage, verbose_preview_enabled
+from parquet_writer import write_parquet
+from schemas import (
+    NUMERIC_COLUMNS,
+    SOURCE_SCHEMAS,
+    compact_frame,
+    load_category_dictionary,
+    memory_report,
+    project_sources,
+    save_category_dictionary,
+)
+
 # --- Configuration des chemins ---
 AIRFLOW_HOME = os.environ.get('AIRFLOW_HOME')
 if not AIRFLOW_HOME:
@@ -10,212 +33,86 @@ if not AIRFLOW_HOME:
 
 RAW_DATA_PATH = os.path.join(AIRFLOW_HOME, 'data', 'raw')
 PROCESSED_DATA_PATH = os.path.join(AIRFLOW_HOME, 'data', 'processed')
+TRANSFORMED_DATASET_PATH = os.path.join(PROCESSED_DATA_PATH, 'transformed_weather_dataset')
+DATASET_STATE_FILENAME = '_slices.json'
+SOURCE_STATE_FILENAME = '_inputs.json'
+# Sources relues en entier à chaque exécution : une tranche absente de l'entrée a disparu de la source
+SNAPSHOT_SOURCES = ('json_initial', 'historical_csv')
+CATEGORY_DICTIONARY_PATH = os.path.join(PROCESSED_DATA_PATH, 'category_dictionary.json')
+CLIMATOLOGY_PATH = os.path.join(PROCESSED_DATA_PATH, 'climatology')
 
 os.makedirs(PROCESSED_DATA_PATH, exist_ok=True)
 
 
-def clean_and_transform_data(df_json: pd.DataFrame, df_openweather: pd.DataFrame, df_historical: pd.DataFrame) -> pd.DataFrame:
+@instrumented('transform.merge')
+def _project_sources(df_json: pd.DataFrame, df_openweather: pd.DataFrame, df_historical: pd.DataFrame,
+                     sources: list = None) -> pd.DataFrame:
     """
-    Nettoie, transforme et unifie les données météorologiques provenant de différentes sources.
-    :param df_json: DataFrame des données extraites du JSON initial.
-    :param df_openweather: DataFrame des données extraites de l'API OpenWeather.
-    :param df_historical: DataFrame des données historiques extraites (CSV).
-    :return: DataFrame unifié et nettoyé.
+    Étapes 1 à 4 : projette les trois sources dans la disposition unifiée en une seule passe,
+    d'après le registre déclaratif SOURCE_SCHEMAS (mapping, types, conversions, valeurs par défaut).
+    :param sources: Sources à projeter (toutes par défaut).
+    :return: DataFrame unifié non nettoyé (colonne 'source' renseignée).
     """
-    print("\n--- Début de la transformation des données ---")
-
-    # --- 1. Traitement du DataFrame JSON initial ---
-    print("Traitement du DataFrame JSON...")
-    json_cols_mapping = {
-        'location_name': 'city',
-        'country': 'country',
-        'last_updated': 'date',
-        'temperature_celsius': 'temp_celsius',
-        'feels_like_celsius': 'feels_like_celsius',
-        'humidity': 'humidity_percent',
-        'pressure_mb': 'pressure_mb',
-        'wind_kph': 'wind_kph',
-        'precip_mm': 'precipitation_mm',
-        'cloud': 'cloud_percent',
-        'visibility_km': 'visibility_km',
-        'uv_index': 'uv_index',
-        'condition_text': 'weather_condition',
-        'latitude': 'latitude',
-        'longitude': 'longitude',
-    }
-
-    df_json_transformed = pd.DataFrame() # Initialiser comme vide par sécurité
-
-    if not df_json.empty:
-        # S'assurer que toutes les colonnes à mapper existent avant de les sélectionner
-        cols_to_select_json = [col for col in json_cols_mapping.keys() if col in df_json.columns]
-
-        # Avertissement si des colonnes sont manquantes
-        missing_json_cols = [col for col in json_cols_mapping.keys() if col not in df_json.columns]
-        if missing_json_cols:
-            print(f"AVERTISSEMENT : Colonnes JSON attendues mais manquantes dans le DataFrame source : {missing_json_cols}")
-            print("Vérifiez le fichier 'all_capitals_weather.json' pour ces colonnes.")
-
-        if cols_to_select_json: # Ne procéder que si nous avons des colonnes à sélectionner
-            # Filtrer le mapping pour ne garder que les colonnes qui existent
-            effective_json_mapping = {k: v for k, v in json_cols_mapping.items() if k in df_json.columns}
-            
-            df_json_transformed = df_json[list(effective_json_mapping.keys())].rename(columns=effective_json_mapping)
-            df_json_transformed['source'] = 'json_initial'
-            df_json_transformed['date'] = pd.to_datetime(df_json_transformed['date'], errors='coerce').dt.floor('D')
-            df_json_transformed.dropna(subset=['date'], inplace=True)
-            print(f"DataFrame JSON transformé. Colonnes: {df_json_transformed.columns.tolist()}")
-        else:
-            print("Aucune colonne pertinente trouvée dans le DataFrame JSON ou DataFrame JSON vide. Aucune transformation JSON effectuée.")
-    else:
-        print("DataFrame JSON d'entrée est vide. Aucune transformation effectuée pour JSON.")
-
-
-    # --- 2. Traitement du DataFrame OpenWeather API (Données en temps réel) ---
-    print("Traitement du DataFrame OpenWeather...")
-    df_openweather_transformed = pd.DataFrame() # Initialiser comme vide par sécurité
-
-    if not df_openweather.empty:
-        openweather_cols_mapping = {
-            'location_name': 'city',
-            'last_updated': 'date',
-            'temperature_celsius': 'temp_celsius',
-            'feels_like_celsius': 'feels_like_celsius',
-            'humidity': 'humidity_percent',
-            'pressure_mb': 'pressure_mb',
-            'wind_kph': 'wind_kph',
-            'precip_mm': 'precipitation_mm',
-            'cloud': 'cloud_percent',
-            'visibility_km': 'visibility_km',
-            'condition_text': 'weather_condition',
-            'latitude': 'latitude',
-            'longitude': 'longitude',
-        }
-        
-        cols_to_select = [col for col in openweather_cols_mapping.keys() if col in df_openweather.columns]
-        
-        missing_ow_cols = [col for col in openweather_cols_mapping.keys() if col not in df_openweather.columns]
-        if missing_ow_cols:
-            print(f"AVERTISSEMENT : Colonnes OpenWeather attendues mais manquantes dans le DataFrame source : {missing_ow_cols}")
-
-        if cols_to_select:
-            df_openweather_transformed = df_openweather[cols_to_select].rename(columns=openweather_cols_mapping)
-            df_openweather_transformed['source'] = 'openweather_api'
-
-            df_openweather_transformed['date'] = pd.to_datetime(df_openweather_transformed['date'], errors='coerce')
-            df_openweather_transformed['date'] = df_openweather_transformed['date'].dt.floor('D')
-            
-            df_openweather_transformed.dropna(subset=['date'], inplace=True)
-            
-            print(f"DataFrame OpenWeather transformé. Colonnes: {df_openweather_transformed.columns.tolist()}")
-        else:
-            print("Aucune colonne pertinente trouvée dans le DataFrame OpenWeather ou DataFrame OpenWeather vide. Aucune transformation OpenWeather effectuée.")
-    else:
-        print("DataFrame OpenWeather d'entrée est vide. Aucune transformation effectuée pour OpenWeather.")
-
-
-    # --- 3. Traitement du DataFrame Historique (CSV) ---
-    print("Traitement du DataFrame Historique...")
-    historical_cols_mapping = {
-        'Date': 'date',
-        'City': 'city',
-        'Temperature_Celsius': 'temp_celsius',
-        'Precipitation_mm': 'precipitation_mm'
+    frames = {
+        'json_initial': df_json,
+        'openweather_api': df_openweather,
+        'historical_csv': df_historical,
     }
-    missing_cols_hist = [col for col in historical_cols_mapping.keys() if col not in df_historical.columns]
-    if missing_cols_hist:
-        print(f"AVERTISSEMENT : Colonnes historiques manquantes dans le DataFrame historique : {missing_cols_hist}")
-        print("Cela signifie que le mapping 'historical_cols_mapping' doit être ajusté pour correspondre à vos vraies données historiques.")
-        historical_cols_mapping = {k: v for k, v in historical_cols_mapping.items() if k in df_historical.columns}
-
-    df_historical_transformed = pd.DataFrame() # Initialiser comme vide
-
-    if not df_historical.empty and historical_cols_mapping:
-        df_historical_transformed = df_historical[list(historical_cols_mapping.keys())].rename(columns=historical_cols_mapping)
-        df_historical_transformed['source'] = 'historical_csv'
-        df_historical_transformed['date'] = pd.to_datetime(df_historical_transformed['date'], errors='coerce').dt.floor('D')
-        df_historical_transformed.dropna(subset=['date'], inplace=True)
-
-        common_cols = [
-            'city', 'date', 'temp_celsius', 'precipitation_mm',
-            'feels_like_celsius', 'humidity_percent', 'pressure_mb', 'wind_kph',
-            'cloud_percent', 'visibility_km', 'uv_index', 'weather_condition',
-            'latitude', 'longitude', 'country'
-        ]
-        for col in common_cols:
-            if col not in df_historical_transformed.columns:
-                df_historical_transformed[col] = np.nan
-        print(f"DataFrame Historique transformé. Colonnes: {df_historical_transformed.columns.tolist()}")
-    else:
-        print("DataFrame Historique d'entrée est vide ou pas de colonnes mappées. Aucune transformation effectuée pour l'historique.")
-
+    return project_sources({source: df for source, df in frames.items() if sources is None or source in sources})
 
-    # --- 4. Fusion des DataFrames ---
-    print("Fusion des DataFrames...")
 
-    all_dfs = [df for df in [df_json_transformed, df_openweather_transformed, df_historical_transformed] if not df.empty]
-    
-    if not all_dfs:
-        print("Aucun DataFrame à fusionner après transformation. Le DataFrame unifié sera vide.")
+def _unify_sources(df_unified: pd.DataFrame, df_city_reference: pd.DataFrame = None,
+                   compact: bool = False, climatology: tuple = None,
+                   imputation_hierarchy: list = None) -> pd.DataFrame:
+    """
+    Étapes 5 à 7 : enrichit, nettoie et calcule les indicateurs sur le DataFrame projeté.
+    :param df_unified: DataFrame issu de _project_sources.
+    :param df_city_reference: Lignes servant de référence pour l'enrichissement
+                              (par défaut les lignes 'json_initial' de df_unified).
+    :param compact: Si True, retourne la représentation compacte (voir schemas.compact_frame).
+    :param climatology: Tuple (tables, hiérarchie) de imputation.load_climatology à réutiliser.
+                        Si None, les tables sont recalculées sur df_unified et sauvegardées.
+    :param imputation_hierarchy: Hiérarchie de repli utilisée si les tables sont recalculées.
+    :return: DataFrame unifié et nettoyé.
+    """
+    if df_unified.empty:
+        print("Aucune donnée après projection des sources. Le DataFrame unifié sera vide.")
         return pd.DataFrame()
 
-    common_columns_set = set()
-    for df in all_dfs:
-        common_columns_set.update(df.columns)
-
-    for i, df in enumerate(all_dfs):
-        for col in common_columns_set:
-            if col not in df.columns:
-                all_dfs[i][col] = np.nan
-        all_dfs[i] = all_dfs[i].reindex(columns=list(common_columns_set))
-
-
-    final_columns_order = [
-        'city', 'date', 'source', 'country', 'latitude', 'longitude',
-        'temp_celsius', 'feels_like_celsius', 'humidity_percent',
-        'pressure_mb', 'wind_kph', 'precipitation_mm', 'cloud_percent',
-        'visibility_km', 'uv_index', 'weather_condition'
-    ]
-    final_columns_effective_order = [col for col in final_columns_order if col in common_columns_set]
-    for col in common_columns_set:
-        if col not in final_columns_effective_order:
-            final_columns_effective_order.append(col)
-
-
-    df_unified = pd.concat(all_dfs, ignore_index=True)
-    df_unified = df_unified[final_columns_effective_order]
+    if df_city_reference is None:
+        df_city_reference = df_unified[df_unified['source'] == 'json_initial']
 
     # --- 5. Enrichissement des données : Ajouter le pays et les coordonnées manquantes ---
     print("Enrichissement : Ajout des infos de pays et coordonnées manquantes...")
-    city_info_from_json = df_json_transformed[['city', 'country', 'latitude', 'longitude']].drop_duplicates(subset=['city'])
-    df_unified = pd.merge(df_unified, city_info_from_json, on='city', how='left', suffixes=('', '_json'))
-
-    df_unified['country'] = df_unified['country'].combine_first(df_unified['country_json'])
-    df_unified['latitude'] = df_unified['latitude'].combine_first(df_unified['latitude_json'])
-    df_unified['longitude'] = df_unified['longitude'].combine_first(df_unified['longitude_json'])
-
-    df_unified = df_unified.drop(columns=['country_json', 'latitude_json', 'longitude_json'], errors='ignore')
+    with stage('transform.enrichment', rows_in=len(df_unified)) as record:
+        # Index nom de ville normalisé -> (pays, lat, lon) ; seules les valeurs manquantes sont complétées,
+        # par code de ville, sans fusion ni copie du DataFrame unifié
+        city_index = CityIndex.from_frame(df_city_reference, name_col='city')
+        filled_counts = city_index.fill_missing(df_unified, name_col='city')
+        record['rows_out'] = len(df_unified)
+        record['values_filled'] = sum(filled_counts.values())
 
     # --- 6. Nettoyage final et typage ---
     print("Nettoyage final et conversion des types...")
     df_unified.dropna(subset=['city', 'date'], inplace=True)
 
-    df_unified['date'] = pd.to_datetime(df_unified['date'], errors='coerce')
-    
-    numeric_cols = [
-        'temp_celsius', 'feels_like_celsius', 'humidity_percent',
-        'pressure_mb', 'wind_kph', 'precipitation_mm', 'cloud_percent',
-        'visibility_km', 'uv_index', 'latitude', 'longitude'
-    ]
-    for col in numeric_cols:
-        df_unified[col] = pd.to_numeric(df_unified[col], errors='coerce')
-        if col in ['precipitation_mm', 'uv_index']:
-            df_unified[col] = df_unified[col].fillna(0)
+    # Imputation par climatologie (ville, mois) avec repli hiérarchique, au lieu d'une médiane globale.
+    # Les types sont déjà fixés par la projection (schemas.UNIFIED_DTYPES).
+    with stage('transform.imputation', rows_in=len(df_unified), rebuilt_climatology=climatology is None) as record:
+        if climatology is None:
+            hierarchy = imputation_hierarchy if imputation_hierarchy is not None else DEFAULT_FALLBACK_HIERARCHY
+            tables = build_climatology(df_unified, hierarchy=hierarchy)
+            save_climatology(tables, CLIMATOLOGY_PATH, hierarchy)
+            print(f"Tables de climatologie recalculées et sauvegardées dans : {CLIMATOLOGY_PATH}")
         else:
-            if not df_unified[col].isnull().all():
-                df_unified[col] = df_unified[col].fillna(df_unified[col].median())
-            else:
-                df_unified[col] = df_unified[col].fillna(0)
+            tables, hierarchy = climatology
+        filled_counts = apply_climatology(df_unified, tables, hierarchy)
+        record['rows_out'] = len(df_unified)
+        record['values_filled'] = sum(sum(counts.values()) for counts in filled_counts.values())
+
+    # Précipitations et UV absents = 0 ; colonnes sans aucune valeur de référence = 0 comme auparavant
+    for col in NUMERIC_COLUMNS:
+        df_unified[col] = df_unified[col].fillna(0)
 
     df_unified['weather_condition'] = df_unified['weather_condition'].fillna('unknown').astype(str)
     df_unified['city'] = df_unified['city'].astype(str)
@@ -226,11 +123,285 @@ def clean_and_transform_data(df_json: pd.DataFrame, df_openweather: pd.DataFrame
     print("Calcul d'indicateurs supplémentaires...")
     df_unified['is_rainy_day'] = (df_unified['precipitation_mm'] > 0.1).astype(int)
 
+    if compact:
+        # Catégories à dictionnaire partagé et stable, float32 et int8 (conservés par Parquet)
+        category_dictionary = load_category_dictionary(CATEGORY_DICTIONARY_PATH)
+        df_unified = compact_frame(df_unified, category_dictionary)
+        save_category_dictionary(category_dictionary, CATEGORY_DICTIONARY_PATH)
+
     print(f"Transformation terminée. Taille du DataFrame unifié : {df_unified.shape}")
-    print(f"Aperçu du DataFrame unifié :\n{df_unified.head()}")
+    preview(df_unified, "Aperçu du DataFrame unifié")
     return df_unified
 
+
+def clean_and_transform_data(df_json: pd.DataFrame, df_openweather: pd.DataFrame, df_historical: pd.DataFrame,
+                             compact: bool = False, imputation_hierarchy: list = None,
+                             backend: str = None) -> pd.DataFrame:
+    """
+    Nettoie, transforme et unifie les données météorologiques provenant de différentes sources.
+    :param df_json: DataFrame des données extraites du JSON initial.
+    :param df_openweather: DataFrame des données extraites de l'API OpenWeather.
+    :param df_historical: DataFrame des données historiques extraites (CSV).
+    :param compact: Si True, colonnes texte en catégories (dictionnaire partagé), mesures en float32
+                    et indicateurs en int8.
+    :param imputation_hierarchy: Hiérarchie de repli de l'imputation, ex. [('city', 'month'), ('city',), ()].
+                                 Les tables de climatologie sont recalculées et sauvegardées.
+    :param backend: Moteur des étapes 5 à 7 : 'pandas' ou 'duckdb' (multithreadé, débordement sur disque).
+                    Par défaut la variable d'environnement WEATHER_BACKEND, sinon pandas.
+    :return: DataFrame unifié et nettoyé.
+    """
+    print("\n--- Début de la transformation des données ---")
+    df_projected = _project_sources(df_json, df_openweather, df_historical)
+    if resolve_backend(backend) == 'duckdb' and not df_projected.empty:
+        print("Étapes 5 à 7 exécutées par DuckDB...")
+        df_unified = unify_with_duckdb(df_projected, CLIMATOLOGY_PATH, imputation_hierarchy)
+        if compact:
+            category_dictionary = load_category_dictionary(CATEGORY_DICTIONARY_PATH)
+            df_unified = compact_frame(df_unified, category_dictionary)
+            save_category_dictionary(category_dictionary, CATEGORY_DICTIONARY_PATH)
+        print(f"Transformation terminée. Taille du DataFrame unifié : {df_unified.shape}")
+        return df_unified
+    return _unify_sources(df_projected, compact=compact, imputation_hierarchy=imputation_hierarchy)
+
+# --- Transformation incrémentale par partitions (date, source) ---
+
+def _slice_key(source: str, date) -> str:
+    """
+    Clé texte d'une partition : 'source|AAAA-MM-JJ'.
+    """
+    return f"{source}|{pd.Timestamp(date).strftime('%Y-%m-%d')}"
+
+
+def _slice_fingerprints(df: pd.DataFrame) -> dict:
+    """
+    Calcule une empreinte par tranche (source, date) d'un DataFrame projeté.
+    L'empreinte combine la somme des hachages de lignes et le nombre de lignes :
+    elle ne dépend pas de l'ordre des lignes dans la tranche.
+    :param df: DataFrame projeté (colonnes 'source' et 'date' présentes).
+    :return: Dictionnaire {clé de tranche: empreinte}.
+    """
+    if df.empty:
+        return {}
+    row_hashes = pd.util.hash_pandas_object(df, index=False)
+    grouped = pd.DataFrame({
+        'source': df['source'].to_numpy(),
+        'date': df['date'].to_numpy(),
+        'hash': row_hashes.to_numpy(),
+    }).groupby(['source', 'date'], sort=False)['hash'].agg(['sum', 'size'])
+    return {
+        _slice_key(source, date): f"{int(row['sum'])}:{int(row['size'])}"
+        for (source, date), row in grouped.iterrows()
+    }
+
+
+def _source_fingerprint(df: pd.DataFrame, previous: dict = None) -> dict:
+    """
+    Empreinte d'un DataFrame source brut : métadonnées du fichier lu (`df.attrs['source_file']`,
+    taille et date de modification) et empreinte du contenu (colonnes, somme des hachages de lignes,
+    nombre de lignes, indépendante de l'ordre des lignes).
+    Le contenu n'est haché que si les métadonnées diffèrent de l'empreinte précédente ;
+    une source sans fichier (API) est toujours hachée.
+    :param df: DataFrame source brut.
+    :param previous: Empreinte enregistrée à l'exécution précédente (ou None).
+    :return: Dictionnaire {'stat', 'content'}, ou None si la source est vide.
+    """
+    if df is None or df.empty:
+        return None
+    stat = df.attrs.get('source_file')
+    if stat is not None and isinstance(previous, dict) and previous.get('stat') == stat:
+        return previous
+    row_hashes = pd.util.hash_pandas_object(df, index=False)
+    return {'stat': stat, 'content': f"{','.join(map(str, df.columns))}:{int(row_hashes.sum())}:{len(df)}"}
+
+
+def _remove_slices(dataset_path: str, slice_keys) -> list:
+    """
+    Supprime du dataset les partitions des tranches données (et les dossiers de date devenus vides).
+    :param dataset_path: Dossier racine du dataset.
+    :param slice_keys: Clés 'source|AAAA-MM-JJ' à supprimer.
+    :return: Liste des clés supprimées.
+    """
+    removed = []
+    for key in sorted(slice_keys):
+        source, date = key.split('|', 1)
+        date_dir = os.path.join(dataset_path, f"date={date}")
+        shutil.rmtree(os.path.join(date_dir, f"source={source}"), ignore_errors=True)
+        if os.path.isdir(date_dir) and not os.listdir(date_dir):
+            os.rmdir(date_dir)
+        removed.append(key)
+    return removed
+
+
+def _city_reference(df_json: pd.DataFrame) -> pd.DataFrame:
+    """
+    Lignes de référence de l'enrichissement lues directement dans le JSON brut (sans projection complète) :
+    mêmes lignes et mêmes colonnes que les lignes 'json_initial' projetées.
+    """
+    if df_json is None or df_json.empty:
+        return pd.DataFrame(columns=['city', 'country', 'latitude', 'longitude'])
+    mapping = {src: dst for src, dst in SOURCE_SCHEMAS['json_initial']['columns'].items()
+               if dst in ('city', 'country', 'latitude', 'longitude', 'date') and src in df_json.columns}
+    df_reference = df_json[list(mapping)].rename(columns=mapping)
+    if 'date' in df_reference.columns:
+        df_reference = df_reference[pd.to_datetime(df_reference['date'], errors='coerce').notna().to_numpy()]
+    return df_reference
+
+
+def _load_dataset_state(dataset_path: str, filename: str = DATASET_STATE_FILENAME) -> dict:
+    state_path = os.path.join(dataset_path, filename)
+    if not os.path.exists(state_path):
+        return {}
+    with open(state_path, 'r') as f:
+        return json.load(f)
+
+
+def _save_dataset_state(dataset_path: str, state: dict, filename: str = DATASET_STATE_FILENAME):
+    state_path = os.path.join(dataset_path, filename)
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, state_path)
+
+
+@instrumented('save.partitions')
+def write_partitions(df: pd.DataFrame, dataset_path: str = TRANSFORMED_DATASET_PATH) -> list:
+    """
+    Écrit le DataFrame unifié dans un dataset Parquet partitionné (date=AAAA-MM-JJ/source=...).
+    Chaque tranche présente dans `df` remplace entièrement la partition correspondante.
+    :param df: DataFrame unifié (sortie de clean_and_transform_data).
+    :param dataset_path: Dossier racine du dataset.
+    :return: Liste des clés de tranches écrites.
+    """
+    written = []
+    for (date, source), df_slice in df.groupby([df['date'].dt.strftime('%Y-%m-%d'), 'source'], sort=True):
+        partition_dir = os.path.join(dataset_path, f"date={date}", f"source={source}")
+        # Pas de manifeste par partition : l'état du dataset (_slices.json) en tient lieu
+        write_parquet(df_slice.drop(columns=['date', 'source']), os.path.join(partition_dir, "part-0.parquet"),
+                      manifest=False)
+        written.append(_slice_key(source, date))
+    return written
+
+
+def read_transformed_dataset(dataset_path: str = TRANSFORMED_DATASET_PATH, dates: list = None,
+                             sources: list = None, columns: list = None) -> pd.DataFrame:
+    """
+    Lit le dataset partitionné, en ne lisant que les partitions demandées.
+    :param dataset_path: Dossier racine du dataset.
+    :param dates: Liste optionnelle de dates (seules ces partitions sont lues).
+    :param sources: Liste optionnelle de sources.
+    :param columns: Colonnes à lire (toutes par défaut).
+    :return: DataFrame au schéma de clean_and_transform_data.
+    """
+    if not os.path.isdir(dataset_path):
+        return pd.DataFrame()
+    filters = []
+    if dates is not None:
+        filters.append(('date', 'in', [pd.Timestamp(d).strftime('%Y-%m-%d') for d in dates]))
+    if sources is not None:
+        filters.append(('source', 'in', list(sources)))
+    df = pd.read_parquet(dataset_path, columns=columns, filters=filters or None, partitioning='hive')
+    if 'date' in df.columns:
+        df['date'] = pd.to_datetime(df['date'].astype(str))
+    if 'source' in df.columns:
+        df['source'] = df['source'].astype(str)
+    # Remet les colonnes de partition à leur place dans le schéma unifié
+    leading_cols = [col for col in ['city', 'date', 'source'] if col in df.columns]
+    return df[leading_cols + [col for col in df.columns if col not in leading_cols]]
+
+
+def transform_incremental(df_json: pd.DataFrame, df_openweather: pd.DataFrame, df_historical: pd.DataFrame,
+                          dataset_path: str = TRANSFORMED_DATASET_PATH, compact: bool = False) -> pd.DataFrame:
+    """
+    Transformation incrémentale : seules les tranches (source, date) nouvelles ou modifiées depuis
+    la dernière exécution sont transformées, puis écrites dans le dataset partitionné.
+    Une empreinte par source brute (`_inputs.json`) permet d'abord d'écarter, sans les projeter,
+    les sources dont l'entrée n'a pas changé (le contenu n'est haché que si la taille ou la date
+    de modification du fichier ont changé) ; les empreintes des tranches des autres sources
+    sont comparées à celles conservées dans `_slices.json` à la racine du dataset.
+    Pour les sources relues en entier (SNAPSHOT_SOURCES), les tranches qui ont disparu de l'entrée
+    sont supprimées du dataset et de l'état. Les tranches OpenWeather ne sont jamais supprimées
+    (chaque exécution n'apporte que de nouvelles observations), et une source vide ou absente
+    est considérée comme indisponible : ses partitions existantes sont conservées.
+    Les valeurs manquantes sont complétées avec les tables de climatologie déjà sauvegardées
+    (aucune relecture de l'historique) ; elles ne sont calculées que si elles n'existent pas encore.
+    :param df_json: DataFrame des données extraites du JSON initial.
+    :param df_openweather: DataFrame des données extraites de l'API OpenWeather.
+    :param df_historical: DataFrame des données historiques extraites (CSV).
+    :param dataset_path: Dossier racine du dataset partitionné.
+    :param compact: Écrit les partitions en représentation compacte (à garder constant pour un même dataset).
+    :return: DataFrame unifié des seules tranches transformées (vide si rien n'a changé).
+    """
+    print("\n--- Début de la transformation incrémentale ---")
+    source_state = _load_dataset_state(dataset_path, SOURCE_STATE_FILENAME)
+    source_fingerprints = {
+        'json_initial': _source_fingerprint(df_json, source_state.get('json_initial')),
+        'openweather_api': _source_fingerprint(df_openweather, source_state.get('openweather_api')),
+        'historical_csv': _source_fingerprint(df_historical, source_state.get('historical_csv')),
+    }
+    changed_sources = [source for source, fp in source_fingerprints.items()
+                       if fp is not None and not (isinstance(source_state.get(source), dict)
+                                                  and source_state[source].get('content') == fp['content'])]
+    # Contenu inchangé mais fichier touché : seules les métadonnées sont mises à jour
+    touched_sources = [source for source, fp in source_fingerprints.items()
+                       if fp is not None and source not in changed_sources and source_state.get(source) != fp]
+    if touched_sources:
+        source_state.update({source: source_fingerprints[source] for source in touched_sources})
+        _save_dataset_state(dataset_path, source_state, SOURCE_STATE_FILENAME)
+    print(f"Sources nouvelles ou modifiées : {changed_sources or 'aucune'}")
+    if not changed_sources:
+        print("Aucune tranche à transformer, le dataset est à jour.")
+        return pd.DataFrame()
+
+    df_projected = _project_sources(df_json, df_openweather, df_historical, sources=changed_sources)
+    if 'json_initial' in changed_sources:
+        df_city_reference = df_projected[df_projected['source'] == 'json_initial']
+    else:
+        df_city_reference = _city_reference(df_json)
+
+    state = _load_dataset_state(dataset_path)
+    fingerprints = _slice_fingerprints(df_projected)
+    changed_fingerprints = {key: fp for key, fp in fingerprints.items() if state.get(key) != fp}
+
+    print(f"Tranches (source, date) nouvelles ou modifiées : {len(changed_fingerprints)}")
+    df_changed = pd.DataFrame()
+    if changed_fingerprints:
+        climatology = load_climatology(CLIMATOLOGY_PATH)
+        if climatology[0] is None:
+            climatology = None
+
+        slice_keys = df_projected['source'] + '|' + df_projected['date'].dt.strftime('%Y-%m-%d')
+        df_changed = _unify_sources(
+            df_projected[slice_keys.isin(changed_fingerprints.keys()).to_numpy()],
+            df_city_reference=df_city_reference,
+            compact=compact,
+            climatology=climatology,
+        )
+    else:
+        print("Aucune tranche à transformer, le dataset est à jour.")
+
+    os.makedirs(dataset_path, exist_ok=True)
+    vanished = [key for key in state
+                if key.split('|', 1)[0] in SNAPSHOT_SOURCES and key.split('|', 1)[0] in changed_sources
+                and key not in fingerprints]
+    if vanished:
+        for key in _remove_slices(dataset_path, vanished):
+            del state[key]
+        print(f"{len(vanished)} tranche(s) disparue(s) des sources supprimée(s) du dataset.")
+    if not df_changed.empty:
+        written = write_partitions(df_changed, dataset_path)
+        state.update(changed_fingerprints)
+        print(f"{len(written)} partition(s) écrite(s) dans : {dataset_path}")
+        df_changed.attrs['changed_slices'] = written
+    if vanished or not df_changed.empty:
+        _save_dataset_state(dataset_path, state)
+    # L'empreinte d'une source n'est enregistrée qu'une fois ses tranches écrites
+    source_state.update({source: source_fingerprints[source] for source in changed_sources})
+    _save_dataset_state(dataset_path, source_state, SOURCE_STATE_FILENAME)
+    return df_changed
+
+
 # --- Nouvelle fonction de chargement ---
+@instrumented('save.transformed')
 def load_data(df: pd.DataFrame, filename: str = "transformed_weather_data.parquet"):
     """
     Charge le DataFrame transformé dans un fichier Parquet dans le dossier processed.
@@ -243,7 +414,8 @@ def load_data(df: pd.DataFrame, filename: str = "transformed_weather_data.parque
 
     output_path = os.path.join(PROCESSED_DATA_PATH, filename)
     try:
-        df.to_parquet(output_path, index=False)
+        # Écriture atomique, triée par (ville, date), avec manifeste (version, lignes, schéma)
+        write_parquet(df, output_path)
         print(f"\nDonnées transformées chargées avec succès dans : {output_path}")
         print(f"Nombre de lignes chargées : {len(df)}")
     except Exception as e:
@@ -257,7 +429,8 @@ if __name__ == "__main__":
     from extract_data import extract_json_data, extract_openweather_data, extract_historical_data, get_selected_city_coords, RAW_DATA_PATH
 
     print("\n[TEST PREP] Chargement des données brutes pour la transformation...")
-    df_json_raw_test = extract_json_data("all_capitals_weather.json")
+    # En mode compact (`--compact`), les mesures sont lues directement en float32
+    df_json_raw_test = extract_json_data("all_capitals_weather.json", compact='--compact' in sys.argv)
 
     test_target_cities = [
         "London", "New York", "Tokyo", "Paris", "Berlin", "Sydney",
@@ -287,26 +460,41 @@ if __name__ == "__main__":
             f.write("2023-01-03,Tokyo,10.0,0.0\n")
             f.write("2023-01-03,Paris,7.5,2.1\n")
         print(f"Fichier de test historique '{temp_historical_file_name}' créé avec succès.")
-    df_historical_test = extract_historical_data(temp_historical_file_name)
-
-
+    df_historical_test = extract_historical_data(temp_historical_file_name, compact='--compact' in sys.argv)
+
+    # Mode incrémental : `python transform_data.py --incremental`
+    if '--incremental' in sys.argv:
+        df_changed = transform_incremental(
+            df_json=df_json_raw_test,
+            df_openweather=df_openweather_test,
+            df_historical=df_historical_test,
+            compact='--compact' in sys.argv
+        )
+        print(f"\n[TEST RESULTATS] Lignes transformées lors de cette exécution : {len(df_changed)}")
+        print("\n--- Fin des tests de transformation ---")
+        sys.exit(0)
+
+    # Représentation compacte : `python transform_data.py --compact`
     df_transformed = clean_and_transform_data(
         df_json=df_json_raw_test,
         df_openweather=df_openweather_test,
-        df_historical=df_historical_test
+        df_historical=df_historical_test,
+        compact='--compact' in sys.argv
     )
 
     if not df_transformed.empty:
         print("\n[TEST RESULTATS] DataFrame final après transformation :")
         print(f"Forme (lignes, colonnes): {df_transformed.shape}")
-        print("Types de données des colonnes principales :")
-        print(df_transformed[['city', 'date', 'temp_celsius', 'precipitation_mm', 'is_rainy_day', 'source']].info())
-        print("\nQuelques lignes du DataFrame transformé :")
-        print(df_transformed.head())
-        print("\nStatistiques descriptives pour les colonnes numériques :")
-        print(df_transformed.describe())
+        if verbose_preview_enabled():
+            print("Types de données des colonnes principales :")
+            print(df_transformed[['city', 'date', 'temp_celsius', 'precipitation_mm', 'is_rainy_day', 'source']].info())
+            preview(df_transformed, "\nQuelques lignes du DataFrame transformé")
+            print("\nStatistiques descriptives pour les colonnes numériques :")
+            print(df_transformed.describe())
         print(f"\nNombre de valeurs uniques par ville : {df_transformed['city'].nunique()}")
         print(f"Sources de données présentes : {df_transformed['source'].unique()}")
+        print("\nRapport mémoire (disposition actuelle vs chaînes/float64/int64) :")
+        print(memory_report(df_transformed))
 
         if 'city' not in df_transformed.columns or \
            'date' not in df_transformed.columns or \
@@ -0,0 +1,61 @@
+import os
+import sys
+import tempfile
+
+import pandas as pd
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Les scripts ETL lisent AIRFLOW_HOME à l'import : les tests utilisent un dossier temporaire dédié
+os.environ.setdefault('AIRFLOW_HOME', tempfile.mkdtemp(prefix='weather_tests_'))
+os.environ.setdefault('WEATHER_METRICS', '0')
+sys.path[:0] = [os.path.join(PROJECT_ROOT, 'etl_scripts'), PROJECT_ROOT]
+
+
+@pytest.fixture
+def weather_sources():
+    """
+    Petit jeu de sources brutes (JSON des capitales, OpenWeather vide, CSV historique).
+    """
+    df_json = pd.DataFrame({
+        'location_name': ['Paris', 'Oslo', 'Paris', 'Lima', 'Oslo', 'Paris'],
+        'country': ['France', 'Norway', 'France', 'Peru', None, 'France'],
+        'last_updated': pd.to_datetime(['2024-01-15 10:00', '2024-01-15 11:00', '2024-02-03 09:30',
+                                        '2024-02-03 12:00', '2024-02-04 08:00', '2024-03-01 14:00']),
+        'temperature_celsius': [5.0, -3.5, None, 21.25, -1.0, 9.5],
+        'feels_like_celsius': [3.0, -7.0, 4.0, 22.0, -4.5, 8.0],
+        'humidity': [80.0, 70.0, 75.0, None, 65.0, 60.0],
+        'pressure_mb': [1012.0, 1003.0, 1018.0, 1010.0, 999.0, 1021.0],
+        'wind_kph': [12.0, 30.0, 8.0, 5.0, None, 14.0],
+        'precip_mm': [0.0, 1.2, 0.3, 0.0, 2.5, None],
+        'cloud': [50.0, 100.0, 25.0, 0.0, 75.0, 10.0],
+        'visibility_km': [10.0, 4.0, 10.0, 10.0, 2.0, 10.0],
+        'uv_index': [1.0, 0.0, 2.0, 9.0, 0.0, 3.0],
+        'condition_text': ['Cloudy', 'Light snow', 'Sunny', 'Sunny', None, 'Partly cloudy'],
+        'latitude': [48.87, 59.91, 48.87, -12.05, 59.91, 48.87],
+        'longitude': [2.33, 10.75, 2.33, -77.05, 10.75, 2.33],
+    })
+    df_historical = pd.DataFrame({
+        'Date': pd.to_datetime(['2024-01-20', '2024-01-21', '2024-02-10']),
+        'City': ['Paris', 'Oslo', 'Lima'],
+        'Temperature_Celsius': [4.0, None, 23.0],
+        'Precipitation_mm': [0.0, 3.0, 0.5],
+    })
+    return df_json, pd.DataFrame(), df_historical
+
+
+@pytest.fixture
+def compact_modeled_path(weather_sources, tmp_path, monkeypatch):
+    """
+    Fichier modélisé issu du mode compact (transform_data --compact puis data_modeling) :
+    les colonnes texte y sont encodées en dictionnaire.
+    """
+    import data_modeling
+    from transform_data import clean_and_transform_data
+
+    df_transformed = clean_and_transform_data(*weather_sources, compact=True)
+    df_monthly = data_modeling.create_monthly_weather_summary(df_transformed)
+    monkeypatch.setattr(data_modeling, 'PROCESSED_DATA_PATH', str(tmp_path))
+    data_modeling.save_modeled_data(df_monthly)
+    return str(tmp_path / 'modeled_weather_data.parquet')
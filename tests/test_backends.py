@@ -0,0 +1,19 @@
+import importlib.util
+
+import pytest
+
+from backends import compare_backends
+
+
+def test_pandas_and_duckdb_backends_are_equivalent(weather_sources):
+    pytest.importorskip('duckdb')
+    report = compare_backends(*weather_sources)
+    assert report['errors'] == []
+    assert report['transform'] is True and report['monthly_summary'] is True
+
+
+def test_compare_backends_without_duckdb_returns_none(weather_sources, monkeypatch):
+    find_spec = importlib.util.find_spec
+    monkeypatch.setattr(importlib.util, 'find_spec',
+                        lambda name, *args: None if name == 'duckdb' else find_spec(name, *args))
+    assert compare_backends(*weather_sources) is None
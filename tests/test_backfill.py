@@ -0,0 +1,19 @@
+import os
+
+from backfill import _clear_day_partitions
+
+
+def test_clear_day_partitions_keeps_openweather_partitions(tmp_path):
+    for source in ['json_initial', 'historical_csv', 'openweather_api']:
+        partition_dir = tmp_path / 'date=2024-05-01' / f'source={source}'
+        partition_dir.mkdir(parents=True)
+        (partition_dir / 'part-0.parquet').write_bytes(b'')
+    (tmp_path / 'date=2024-05-02' / 'source=historical_csv').mkdir(parents=True)
+
+    _clear_day_partitions('2024-05-01', str(tmp_path))
+    _clear_day_partitions('2024-05-02', str(tmp_path))
+
+    assert os.listdir(tmp_path / 'date=2024-05-01') == ['source=openweather_api']
+    assert (tmp_path / 'date=2024-05-01' / 'source=openweather_api' / 'part-0.parquet').exists()
+    # Un jour sans autre source est supprimé entièrement
+    assert not (tmp_path / 'date=2024-05-02').exists()
@@ -0,0 +1,15 @@
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from dashboard_data import ModeledDataLoader
+
+
+def test_loader_filters_dictionary_encoded_compact_output(compact_modeled_path):
+    assert pa.types.is_dictionary(ds.dataset(compact_modeled_path).schema.field('city').type)
+
+    loader = ModeledDataLoader(compact_modeled_path)
+    df = loader.load(['Paris', 'Lima'], [2024])
+
+    assert set(df['city'].astype(str)) == {'Paris', 'Lima'}
+    assert set(df['year']) == {2024}
+    assert loader.load([], [2024]).empty
@@ -0,0 +1,21 @@
+import pandas as pd
+
+from data_export import export_selection
+from transform_data import clean_and_transform_data, write_partitions
+
+
+def test_export_from_dictionary_encoded_outputs(compact_modeled_path, weather_sources, tmp_path):
+    # Résumé mensuel compact (fichier unique)
+    output_path, rows = export_selection(compact_modeled_path, 'csv', ['Paris', 'Oslo'], [2024],
+                                         output_dir=str(tmp_path))
+    df_monthly = pd.read_csv(output_path)
+    assert rows == len(df_monthly) > 0
+    assert set(df_monthly['city']) == {'Paris', 'Oslo'}
+
+    # Données quotidiennes compactes (dataset partitionné)
+    dataset_path = str(tmp_path / 'transformed_weather_dataset')
+    write_partitions(clean_and_transform_data(*weather_sources, compact=True), dataset_path)
+    output_path, rows = export_selection(dataset_path, 'parquet', ['Lima'], [2024], output_dir=str(tmp_path))
+    df_daily = pd.read_parquet(output_path)
+    assert rows == len(df_daily) == 2
+    assert set(df_daily['city'].astype(str)) == {'Lima'}
@@ -0,0 +1,38 @@
+import os
+
+from extract_data import HISTORICAL_CACHE_PATH, RAW_DATA_PATH, build_city_index, extract_historical_data
+from parquet_writer import read_manifest
+
+
+def test_historical_measures_stay_float64_unless_compact():
+    file_name = 'historical_dtypes_test.csv'
+    with open(os.path.join(RAW_DATA_PATH, file_name), 'w') as f:
+        f.write("Date,City,Temperature_Celsius,Precipitation_mm\n2024-01-01,Paris,27.6,0.1\n2024-01-02,Oslo,-3.3,1.7\n")
+
+    # Deux lectures : la seconde passe par le cache Parquet
+    for _ in range(2):
+        df = extract_historical_data(file_name)
+        assert df['Temperature_Celsius'].dtype == 'float64'
+        assert df['Temperature_Celsius'].tolist() == [27.6, -3.3]
+
+    df_compact = extract_historical_data(file_name, compact=True)
+    assert df_compact['Temperature_Celsius'].dtype == 'float32'
+    # Un cache par type de lecture pour la version actuelle du fichier
+    assert len([name for name in os.listdir(HISTORICAL_CACHE_PATH) if name.startswith(f"{file_name}.")]) == 2
+
+
+def test_persisted_city_index_is_reused_until_the_source_changes(weather_sources, tmp_path):
+    df_json = weather_sources[0]
+    index_path = str(tmp_path / 'city_index.parquet')
+
+    build_city_index(df_json, save_path=index_path)
+    version = read_manifest(index_path)['version']
+    # Source inchangée : l'index sauvegardé est relu, sans réécriture
+    city_index = build_city_index(df_json, save_path=index_path)
+    assert read_manifest(index_path)['version'] == version
+    assert city_index.coords_for(['paris'])[0] == {'paris': {'lat': 48.87, 'lon': 2.33}}
+
+    df_json.loc[0, 'latitude'] = 48.85
+    city_index = build_city_index(df_json, save_path=index_path)
+    assert read_manifest(index_path)['version'] == version + 1
+    assert city_index.coords_for(['Paris'])[0] == {'Paris': {'lat': 48.85, 'lon': 2.33}}
@@ -0,0 +1,84 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from openweather_client import RequestScheduler, get_api_key_rate_limiter, get_host_rate_limiter
+
+RETRY_AFTER_SECONDS = 1
+
+
+@pytest.fixture
+def stub_server():
+    """
+    Serveur OpenWeather local dont les réponses successives sont scriptées par latitude :
+    liste de (code HTTP, en-têtes), la dernière réponse étant répétée. Les instants d'arrivée
+    des requêtes sont enregistrés par latitude.
+    """
+    scripts, calls = {}, {}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            lat = parse_qs(urlparse(self.path).query)['lat'][0]
+            with lock:
+                arrivals = calls.setdefault(lat, [])
+                arrivals.append(time.monotonic())
+                script = scripts[lat]
+                status, headers = script[min(len(arrivals), len(script)) - 1]
+            body = json.dumps({'name': lat, 'dt': int(time.time())}).encode() if status == 200 else b'{}'
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/data/2.5/weather", scripts, calls
+    server.shutdown()
+
+
+def test_scheduler_retries_honours_retry_after_and_drops(stub_server):
+    base_url, scripts, calls = stub_server
+    scripts['1.0'] = [(429, {'Retry-After': str(RETRY_AFTER_SECONDS)}), (200, {})]
+    scripts['2.0'] = [(503, {}), (502, {}), (200, {})]
+    scripts['3.0'] = [(500, {})]
+    requests_by_key = {f"city_{lat}": {'lat': lat, 'lon': 0.0} for lat in ['1.0', '2.0', '3.0']}
+
+    scheduler = RequestScheduler('test-key', base_url=base_url, max_workers=3, rate_limit_per_second=1000,
+                                 api_key_calls_per_minute=60_000, max_attempts=3,
+                                 backoff_base=0.01, backoff_max=0.05, seed=0)
+    results = scheduler.run(requests_by_key, lambda key, data: data['name'])
+
+    assert results == {'city_1.0': '1.0', 'city_2.0': '2.0'}
+    assert len(calls['1.0']) == 2 and len(calls['2.0']) == 3 and len(calls['3.0']) == 3
+    # 1 reprise (429) + 2 reprises (503, 502) + 2 reprises avant abandon (500)
+    assert scheduler.stats == {'requests': 3, 'attempts': 8, 'retries': 5, 'successes': 2, 'drops': 1}
+    # Le backoff (au plus 0,05 s) est relevé au délai Retry-After imposé par le serveur
+    assert calls['1.0'][1] - calls['1.0'][0] >= RETRY_AFTER_SECONDS - 0.05
+    assert calls['2.0'][1] - calls['2.0'][0] < RETRY_AFTER_SECONDS
+
+
+def test_rate_change_keeps_shared_bucket_state():
+    host_bucket = get_host_rate_limiter('http://rate-test.local/weather', rate_limit_per_second=5)
+    key_bucket = get_api_key_rate_limiter('rate-test-key', calls_per_minute=600)
+    for _ in range(5):
+        host_bucket.acquire()
+    key_bucket.acquire(50)
+
+    # Un autre appelant demande un autre débit : même seau, débit mis à jour, jetons consommés conservés
+    assert get_host_rate_limiter('http://rate-test.local/other', rate_limit_per_second=20) is host_bucket
+    assert host_bucket.rate == 20.0 and host_bucket._tokens < 1
+    assert get_api_key_rate_limiter('rate-test-key', calls_per_minute=1200) is key_bucket
+    assert key_bucket.rate == 20.0 and key_bucket._tokens < 100
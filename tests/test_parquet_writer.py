@@ -0,0 +1,31 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from parquet_writer import read_manifest, write_parquet
+
+
+def test_concurrent_writes_use_unique_hidden_temp_files(tmp_path):
+    output_path = str(tmp_path / 'weather.parquet')
+    frames = [pd.DataFrame({'city': ['Paris', 'Oslo'] * 500, 'value': range(i, i + 1000)}) for i in range(8)]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        records = list(executor.map(lambda df: write_parquet(df, output_path, sort_by=None), frames))
+
+    assert sorted(os.listdir(tmp_path)) == ['weather.parquet', 'weather.parquet.manifest.json']
+    df = pd.read_parquet(output_path)
+    assert len(df) == 1000 and df['value'].min() in {frame['value'].min() for frame in frames}
+    assert read_manifest(output_path)['rows'] == 1000
+    assert all(record['rows'] == 1000 for record in records)
+
+
+def test_written_files_get_the_mode_of_open_without_changing_the_umask(tmp_path):
+    output_path = str(tmp_path / 'weather.parquet')
+    previous_umask = os.umask(0o027)
+    try:
+        write_parquet(pd.DataFrame({'city': ['Paris'], 'value': [1]}), output_path, sort_by=None)
+        assert os.umask(0o027) == 0o027
+    finally:
+        os.umask(previous_umask)
+    assert os.stat(output_path).st_mode & 0o777 == 0o640
@@ -0,0 +1,33 @@
+import os
+
+import pandas as pd
+
+import pipeline
+
+
+def test_parallel_openweather_shards_split_the_api_budget(weather_sources, tmp_path, monkeypatch):
+    df_json = weather_sources[0]
+    pipeline.write_artifact(df_json, '2024-05-01', 'json_initial', str(tmp_path))
+    shards = pipeline.plan_extract_shards('2024-05-01', ['Paris', 'Oslo', 'Lima'], shard_size=1,
+                                          artifacts_path=str(tmp_path))
+    openweather_shards = [shard for shard in shards if shard['source'] == 'openweather_api']
+    assert len(openweather_shards) == 3 and all(shard['shard_count'] == 3 for shard in openweather_shards)
+
+    budgets = []
+    monkeypatch.setattr(pipeline, 'extract_openweather_data',
+                        lambda city_coords, api_key, **kwargs: budgets.append(kwargs) or df_json.iloc[0:0])
+    pipeline.run_extract_shard(api_key='test-key', artifacts_path=str(tmp_path), **openweather_shards[0])
+    assert budgets == [{
+        'rate_limit_per_second': pipeline.DEFAULT_RATE_LIMIT_PER_SECOND / 3,
+        'api_key_calls_per_minute': pipeline.DEFAULT_API_KEY_CALLS_PER_MINUTE / 3,
+    }]
+
+
+def test_prune_artifacts_keeps_recent_runs(tmp_path):
+    for run_date in ['2024-04-20', '2024-04-24', '2024-05-01', '2024-05-02']:
+        pipeline.write_artifact(pd.DataFrame({'value': [1]}), run_date, 'transformed', str(tmp_path))
+    (tmp_path / 'notes').mkdir()
+
+    removed = pipeline.prune_artifacts('2024-05-01', keep_days=7, artifacts_path=str(tmp_path))
+    assert removed == ['2024-04-20']
+    assert sorted(os.listdir(tmp_path)) == ['2024-04-24', '2024-05-01', '2024-05-02', 'notes']
@@ -0,0 +1,50 @@
+import json
+import os
+import time
+
+from response_cache import ResponseCache
+
+
+def test_download_and_revalidation_refresh_freshness(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl_seconds=600)
+    params = {'lat': 48.85, 'lon': 2.35, 'units': 'metric'}
+    key, _ = cache.lookup(params)
+    observation = {'name': 'Paris', 'dt': int(time.time()) - 3600}
+    cache.store(key, json.dumps(observation).encode(), observation, etag='"v1"')
+
+    # Observation déjà ancienne au téléchargement : fraîche pendant le TTL à partir du téléchargement
+    _, entry = cache.lookup(params)
+    assert cache.is_fresh(entry)
+
+    # Téléchargée il y a une heure : périmée
+    entry['stored_at'] -= 3600
+    assert not cache.is_fresh(entry)
+
+    # Réponse 304 : l'observation est confirmée et redevient fraîche pour toute la durée du TTL
+    assert cache.read(key, revalidated=True) == observation
+    _, entry = cache.lookup(params)
+    assert cache.is_fresh(entry)
+
+    # La date de revalidation est conservée d'une exécution à l'autre
+    cache.save_index()
+    _, entry = ResponseCache(str(tmp_path), ttl_seconds=600).lookup(params)
+    assert cache.is_fresh(entry)
+
+
+def test_save_index_merges_entries_of_concurrent_shards(tmp_path):
+    # Deux lots d'extraction (un cache chacun) chargent le même index puis le sauvegardent tour à tour
+    shard_caches = [ResponseCache(str(tmp_path)), ResponseCache(str(tmp_path))]
+    keys = []
+    for lat, cache in zip([48.85, 59.91], shard_caches):
+        key, _ = cache.lookup({'lat': lat, 'lon': 2.35})
+        observation = {'dt': int(time.time())}
+        cache.store(key, json.dumps(observation).encode(), observation)
+        keys.append(key)
+    for cache in shard_caches:
+        cache.save_index()
+
+    reloaded = ResponseCache(str(tmp_path))
+    assert all(reloaded.lookup({'lat': lat, 'lon': 2.35})[1] is not None for lat in [48.85, 59.91])
+    with open(tmp_path / 'index.json') as f:
+        assert set(json.load(f)) == set(keys)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
@@ -0,0 +1,38 @@
+import pandas as pd
+
+from rollups import build_rollup_cube
+
+
+def test_month_and_year_rollups_split_weeks_crossing_boundaries():
+    # Deux semaines ISO à cheval sur un changement de mois puis d'année
+    dates = pd.concat([
+        pd.Series(pd.date_range('2024-01-29', '2024-02-04', freq='D')),
+        pd.Series(pd.date_range('2024-12-30', '2025-01-05', freq='D')),
+    ], ignore_index=True)
+    df = pd.DataFrame({
+        'city': 'Oslo',
+        'country': 'Norway',
+        'date': dates,
+        'temp_celsius': range(len(dates)),
+        'precipitation_mm': 1.0,
+        'is_rainy_day': 1,
+        'wind_kph': 10.0,
+        'humidity_percent': 50.0,
+    })
+
+    cube = build_rollup_cube(df)
+
+    week = cube[('week', 'city')].set_index('period_start')
+    assert list(week.index) == [pd.Timestamp('2024-01-29'), pd.Timestamp('2024-12-30')]
+    assert list(week['num_rainy_days']) == [7, 7]
+
+    month = cube[('month', 'city')].set_index('period_start')
+    expected_month = df.groupby(df['date'].dt.to_period('M').dt.start_time)
+    assert list(month.index) == list(expected_month.size().index)
+    assert list(month['num_rainy_days']) == [3, 4, 2, 5]
+    assert list(month['avg_temp_celsius']) == list(expected_month['temp_celsius'].mean())
+
+    year = cube[('year', 'country')].set_index('period_start')
+    assert list(year.index) == [pd.Timestamp('2024-01-01'), pd.Timestamp('2025-01-01')]
+    assert list(year['num_rainy_days']) == [9, 5]
+    assert list(year['total_precipitation_mm']) == [9.0, 5.0]
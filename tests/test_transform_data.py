@@ -0,0 +1,42 @@
+import os
+
+from transform_data import (
+    DATASET_STATE_FILENAME,
+    _load_dataset_state,
+    _source_fingerprint,
+    transform_incremental,
+)
+
+
+def test_source_fingerprint_skips_hashing_when_file_metadata_is_unchanged(weather_sources):
+    _, _, df_historical = weather_sources
+    df_historical.attrs['source_file'] = {'path': '/raw/historical.csv', 'size': 120, 'mtime_ns': 1}
+
+    fingerprint = _source_fingerprint(df_historical)
+    assert fingerprint['stat'] == df_historical.attrs['source_file']
+    # Métadonnées identiques : l'empreinte précédente est reprise telle quelle, sans hacher le contenu
+    previous = {'stat': dict(df_historical.attrs['source_file']), 'content': 'contenu-precedent'}
+    assert _source_fingerprint(df_historical, previous) is previous
+    # Fichier touché : le contenu est haché de nouveau (il est ici inchangé)
+    df_historical.attrs['source_file'] = {**df_historical.attrs['source_file'], 'mtime_ns': 2}
+    assert _source_fingerprint(df_historical, fingerprint)['content'] == fingerprint['content']
+
+
+def test_slices_that_disappear_from_a_snapshot_source_are_removed(weather_sources, tmp_path):
+    df_json, df_openweather, df_historical = weather_sources
+    dataset_path = str(tmp_path / 'dataset')
+    df_historical.attrs['source_file'] = {'path': '/raw/historical.csv', 'size': 120, 'mtime_ns': 1}
+    transform_incremental(df_json, df_openweather, df_historical, dataset_path=dataset_path)
+    assert 'historical_csv|2024-02-10' in _load_dataset_state(dataset_path, DATASET_STATE_FILENAME)
+
+    # Le CSV historique ne contient plus le 2024-02-10
+    df_historical = df_historical[df_historical['Date'] != '2024-02-10'].copy()
+    df_historical.attrs['source_file'] = {'path': '/raw/historical.csv', 'size': 90, 'mtime_ns': 2}
+    transform_incremental(df_json, df_openweather, df_historical, dataset_path=dataset_path)
+
+    state = _load_dataset_state(dataset_path, DATASET_STATE_FILENAME)
+    assert 'historical_csv|2024-02-10' not in state
+    assert 'historical_csv|2024-01-20' in state
+    assert not os.path.exists(os.path.join(dataset_path, 'date=2024-02-10'))
+    # Les tranches JSON des autres dates sont conservées
+    assert os.path.isdir(os.path.join(dataset_path, 'date=2024-02-03', 'source=json_initial'))